@@ -0,0 +1,237 @@
+"""
+async_backend.py
+Async data access built on mysql.connector.aio, for screens that run several
+independent queries at once - the Dashboard tab refreshes all of its panels
+together over one event loop instead of one after another.
+
+The event loop runs on its own background thread. The GUI hands it
+coroutines with submit(), and the callbacks come back through the same
+results queue the QueryWorkers use, so they run on the Tk thread in
+poll_results. Without a results queue (headless mode, for scripts and
+benchmarks) run() just blocks for the answer, and session() gives plain
+blocking connection and cursor objects on top of the async ones, so the
+existing CRUD code - TablePager, PendingChanges, SchemaCache - works the
+same without Tk.
+"""
+
+import asyncio
+import concurrent.futures
+import inspect
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+import mysql.connector
+
+# asyncio support is only in newer Connector/Python versions
+try:
+    import mysql.connector.aio as aio
+except ImportError:
+    aio = None
+
+
+class AsyncPool:
+    """A few aio connections shared by every coroutine on the loop, opened as they're needed"""
+    
+    def __init__(self, connect_args, pool_size=5):
+        self.connect_args = connect_args
+        self.pool_size = pool_size
+        self.idle = []  # connected and free
+        self.available = None  # asyncio.Semaphore, made on the loop the first time it's needed
+        self.opened = 0
+    
+    async def checkout(self):
+        """Gets a free connection, waiting for one when pool_size are already busy"""
+        if self.available is None:
+            self.available = asyncio.Semaphore(self.pool_size)
+        await self.available.acquire()
+        try:
+            if self.idle:
+                conn = self.idle.pop()
+                if not await conn.is_connected():
+                    await conn.reconnect(attempts=3, delay=1)
+                return conn
+            conn = await aio.connect(**self.connect_args)
+            self.opened += 1
+            return conn
+        except BaseException:
+            self.available.release()
+            raise
+    
+    async def checkin(self, conn):
+        """Gives a connection back, dropping it if it's broken"""
+        try:
+            # Same cleanup as ConnectionPool.checkin - nothing left over for the next user
+            await conn.consume_results()
+            if conn.in_transaction:
+                await conn.rollback()
+            self.idle.append(conn)
+        except mysql.connector.Error:
+            self.opened -= 1
+        finally:
+            self.available.release()
+    
+    @asynccontextmanager
+    async def connection(self):
+        """async with pool.connection() as conn: ... - always gives the connection back"""
+        conn = await self.checkout()
+        try:
+            yield conn
+        finally:
+            await self.checkin(conn)
+    
+    async def close(self):
+        while self.idle:
+            conn = self.idle.pop()
+            try:
+                await conn.close()
+            except mysql.connector.Error:
+                pass  # already gone
+            self.opened -= 1
+
+
+class BlockingProxy:
+    """
+    Lets ordinary code on another thread use an aio connection or cursor - async methods
+    block until the loop has run them, and cursor() hands back a wrapped cursor.
+    """
+    
+    def __init__(self, target, loop):
+        self.target = target
+        self.loop = loop
+    
+    def __getattr__(self, name):
+        value = getattr(self.target, name)
+        if not inspect.iscoroutinefunction(value):
+            return value  # description, rowcount, with_rows... are plain attributes
+        
+        def call(*args, **kwargs):
+            result = asyncio.run_coroutine_threadsafe(value(*args, **kwargs), self.loop).result()
+            return BlockingProxy(result, self.loop) if name == 'cursor' else result
+        return call
+
+
+class AsyncBackend:
+    """An event loop on a background thread plus an AsyncPool"""
+    
+    def __init__(self, connect_args, results=None, pool_size=5, profiler=None):
+        if aio is None:
+            raise RuntimeError("The async backend needs a newer mysql-connector-python (with mysql.connector.aio)")
+        self.pool = AsyncPool(connect_args, pool_size)
+        self.results = results  # the GUI's callback queue - None when running headless
+        self.profiler = profiler
+        
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="async-db", daemon=True)
+        self.thread.start()
+    
+    def submit(self, coro, on_done=None, on_error=None):
+        """
+        Schedules a coroutine on the loop and returns its future.
+        on_done(result) or on_error(exception) is queued for the Tk thread (called straight away when headless).
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        
+        def finished(future):
+            if future.cancelled():
+                return
+            error = future.exception()
+            callback, arg = (on_error, error) if error is not None else (on_done, future.result())
+            if callback is None:
+                return
+            if self.results is None:
+                callback(arg)
+            else:
+                self.results.put((callback, (arg,)))
+        
+        future.add_done_callback(finished)
+        return future
+    
+    def run(self, coro, timeout=None):
+        """Blocks until the coroutine is done and returns its result - for headless use, never on the loop thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+    
+    async def query(self, sql, params=(), source="Async query", max_rows=None):
+        """
+        Runs one statement on a pooled connection.
+        Returns (columns, rows) when it gives back rows, otherwise commits and returns (None, rowcount).
+        """
+        stats = self.profiler.start(source, sql) if self.profiler else None
+        async with self.pool.connection() as conn:
+            cursor = await conn.cursor()
+            try:
+                started = time.perf_counter()
+                await cursor.execute(sql, params)
+                if stats:
+                    stats.execute_time = time.perf_counter() - started
+                
+                started = time.perf_counter()
+                if cursor.with_rows:
+                    columns = [col[0] for col in cursor.description]
+                    rows = await cursor.fetchall() if max_rows is None else await cursor.fetchmany(max_rows)
+                    result = (columns, rows)
+                else:
+                    await conn.commit()
+                    result = (None, cursor.rowcount)
+                if stats:
+                    stats.fetch_time = time.perf_counter() - started
+                    stats.rows = len(result[1]) if result[0] is not None else max(result[1], 0)
+            except Exception as e:
+                if stats:
+                    stats.error = str(e)
+                raise
+            finally:
+                await cursor.close()
+                if stats:
+                    self.profiler.add(stats)
+        return result
+    
+    async def gather(self, queries, max_rows=None):
+        """
+        Runs {name: (sql, params)} all at once, each on its own pooled connection.
+        Returns {name: (result or the error it raised, seconds it took)}.
+        """
+        async def timed(name, sql, params):
+            started = time.perf_counter()
+            try:
+                result = await self.query(sql, params, name, max_rows)
+            except mysql.connector.Error as e:
+                result = e
+            return name, result, time.perf_counter() - started
+        
+        done = await asyncio.gather(*(timed(name, sql, params) for name, (sql, params) in queries.items()))
+        return {name: (result, elapsed) for name, result, elapsed in done}
+    
+    @contextmanager
+    def session(self):
+        """
+        with backend.session() as (conn, cursor): ... - blocking versions of a pooled aio connection
+        and cursor, for driving the sync CRUD code from scripts without Tk.
+        """
+        conn = self.run(self.pool.checkout())
+        try:
+            blocking = BlockingProxy(conn, self.loop)
+            cursor = blocking.cursor()
+            try:
+                yield blocking, cursor
+            finally:
+                cursor.close()
+        finally:
+            self.run(self.pool.checkin(conn))
+    
+    def stop(self):
+        """Cancels whatever is still running, closes the connections and stops the loop"""
+        async def shutdown():
+            for task in asyncio.all_tasks():
+                if task is not asyncio.current_task():
+                    task.cancel()
+            await self.pool.close()
+        
+        try:
+            self.run(shutdown(), timeout=5)
+        except (concurrent.futures.TimeoutError, mysql.connector.Error):
+            pass  # the server is gone or stuck, the connections die with the process
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        if not self.loop.is_running():
+            self.loop.close()
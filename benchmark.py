@@ -0,0 +1,574 @@
+"""
+benchmark.py
+Times the app's main database paths without the GUI, so a change that makes
+connecting, browsing or editing slower shows up as a number instead of a
+feeling.
+
+It builds a throwaway clothing store database - customers, products, orders
+and order_items, with --rows orders - then runs the same code the GUI's
+workers run (TableGateway, TablePager, ResultCache, the SQL tab's streaming
+fetch) over and over and reports latency percentiles, rows per second and
+peak memory for each step. Results can be saved as a JSON baseline and later
+runs compared against it.
+
+    python benchmark.py --rows 10000 --save baseline.json        # SQLite stand-in, no server needed
+    python benchmark.py --rows 10000 --compare baseline.json
+    python benchmark.py --mysql --user root --rows 1000000       # scratch database on a real server
+    python benchmark.py --spawn-mysqld --rows 100000             # throwaway mysqld/mariadbd in a temp dir
+
+The SQLite stand-in (fake_connector.py) measures the app's own overhead;
+use --latency to add a round trip per statement. Only a real server says
+anything about query plans and network cost.
+"""
+
+import argparse
+import datetime
+import decimal
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import mysql.connector
+
+from connection_pool import ConnectionPool
+from fake_connector import FakeServer
+from result_cache import ResultCache
+from statement_cache import StatementCache
+from table_gateway import TableGateway
+
+# resource is Unix only - on Windows there's no peak RSS, the rest still works
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# (table, [(column, MySQL type, SQLite type)], primary key, extra DDL lines)
+SCHEMA = [
+    ('customers', [
+        ('customer_id', "INT NOT NULL AUTO_INCREMENT", "INTEGER"),
+        ('first_name', "VARCHAR(50) NOT NULL", "varchar(50) NOT NULL"),
+        ('last_name', "VARCHAR(50) NOT NULL", "varchar(50) NOT NULL"),
+        ('email', "VARCHAR(100)", "varchar(100)"),
+        ('city', "VARCHAR(50)", "varchar(50)"),
+        ('joined', "DATE", "date"),
+    ], ['customer_id'], []),
+    ('products', [
+        ('product_id', "INT NOT NULL AUTO_INCREMENT", "INTEGER"),
+        ('name', "VARCHAR(100) NOT NULL", "varchar(100) NOT NULL"),
+        ('category', "VARCHAR(30)", "varchar(30)"),
+        ('size', "VARCHAR(5)", "varchar(5)"),
+        ('price', "DECIMAL(10,2)", "decimal(10,2)"),
+        ('stock', "INT", "int"),
+    ], ['product_id'], ["KEY idx_category (category)"]),
+    ('orders', [
+        ('order_id', "INT NOT NULL AUTO_INCREMENT", "INTEGER"),
+        ('customer_id', "INT NOT NULL", "int NOT NULL"),
+        ('order_date', "DATETIME", "datetime"),
+        ('status', "VARCHAR(20)", "varchar(20)"),
+        ('total', "DECIMAL(10,2)", "decimal(10,2)"),
+    ], ['order_id'], ["KEY idx_order_date (order_date)",
+                      "FOREIGN KEY (customer_id) REFERENCES customers (customer_id)"]),
+    ('order_items', [
+        ('order_id', "INT NOT NULL", "int NOT NULL"),
+        ('line_no', "INT NOT NULL", "int NOT NULL"),
+        ('product_id', "INT NOT NULL", "int NOT NULL"),
+        ('quantity', "INT", "int"),
+        ('price', "DECIMAL(10,2)", "decimal(10,2)"),
+    ], ['order_id', 'line_no'], ["FOREIGN KEY (order_id) REFERENCES orders (order_id)",
+                                 "FOREIGN KEY (product_id) REFERENCES products (product_id)"]),
+]
+
+FIRST_NAMES = ["Ann", "Ben", "Cara", "Dev", "Ema", "Farid", "Gia", "Hugo", "Ines", "Jon", "Kai", "Lena"]
+LAST_NAMES = ["Lee", "Khan", "Smith", "Rossi", "Nguyen", "Garcia", "Brown", "Silva", "Novak", "Ali"]
+CITIES = ["Waterloo", "Toronto", "Ottawa", "Montreal", "Calgary", "Vancouver", "Halifax"]
+CATEGORIES = ["Shirts", "Pants", "Dresses", "Jackets", "Shoes", "Hats", "Socks"]
+SIZES = ["XS", "S", "M", "L", "XL"]
+STATUSES = ["pending", "paid", "shipped", "delivered", "returned"]
+
+BULK_KEY_BASE = 1_000_000_000  # rows the write steps add, well clear of the seeded ones
+
+
+def table_sizes(rows):
+    """Rows per table for --rows orders"""
+    return {
+        'customers': max(rows // 10, 100),
+        'products': max(rows // 100, 50),
+        'orders': rows,
+        'order_items': rows,
+    }
+
+
+def create_statements(dialect):
+    """CREATE TABLEs for 'mysql' or 'sqlite'"""
+    statements = []
+    for table, columns, key, extras in SCHEMA:
+        lines = [f"{name} {mysql_type if dialect == 'mysql' else sqlite_type}" for name, mysql_type, sqlite_type in columns]
+        indexes = []
+        if dialect == 'sqlite' and len(key) == 1 and columns[0][2] == "INTEGER":
+            lines[0] += " PRIMARY KEY"  # SQLite's auto_increment is an INTEGER PRIMARY KEY
+        else:
+            lines.append(f"PRIMARY KEY ({', '.join(key)})")
+        for extra in extras:
+            if extra.startswith("KEY ") and dialect == 'sqlite':
+                name, _, cols = extra[4:].partition(" ")
+                indexes.append(f"CREATE INDEX {name} ON {table} {cols}")
+            else:
+                lines.append(extra)
+        engine = " ENGINE=InnoDB" if dialect == 'mysql' else ""
+        statements.append(f"CREATE TABLE {table} (\n    " + ",\n    ".join(lines) + f"\n){engine}")
+        statements.extend(indexes)
+    return statements
+
+
+def generate_rows(table, count, sizes, rng):
+    """Deterministic rows for one table, as tuples in column order"""
+    start = datetime.datetime(2023, 1, 1)
+    for i in range(1, count + 1):
+        if table == 'customers':
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            yield (i, first, last, f"{first}.{last}{i}@example.com".lower(), rng.choice(CITIES),
+                   (start + datetime.timedelta(days=rng.randrange(900))).date())
+        elif table == 'products':
+            category = rng.choice(CATEGORIES)
+            yield (i, f"{category[:-1]} #{i}", category, rng.choice(SIZES),
+                   decimal.Decimal(rng.randrange(500, 20000)) / 100, rng.randrange(200))
+        elif table == 'orders':
+            yield (i, rng.randrange(1, sizes['customers'] + 1), start + datetime.timedelta(seconds=i * 37),
+                   rng.choice(STATUSES), decimal.Decimal(rng.randrange(1000, 50000)) / 100)
+        else:
+            # Two lines per order, so order_items covers the first half of the orders
+            yield ((i + 1) // 2, 2 - i % 2, rng.randrange(1, sizes['products'] + 1), rng.randrange(1, 4),
+                   decimal.Decimal(rng.randrange(500, 20000)) / 100)
+
+
+def seed(conn, dialect, rows, chunk_size=5000, log=print):
+    """Creates the tables and fills them - executemany turns into multi-row INSERTs on MySQL"""
+    cursor = conn.cursor()
+    for statement in create_statements(dialect):
+        cursor.execute(statement)
+    sizes = table_sizes(rows)
+    rng = random.Random(363)
+    for table, columns, _, _ in SCHEMA:
+        started = time.perf_counter()
+        sql = f"INSERT INTO {table} ({', '.join(col[0] for col in columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+        chunk = []
+        for row in generate_rows(table, sizes[table], sizes, rng):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                cursor.executemany(sql, chunk)
+                conn.commit()
+                chunk = []
+        if chunk:
+            cursor.executemany(sql, chunk)
+        conn.commit()
+        log(f"  {table}: {sizes[table]:,} rows in {time.perf_counter() - started:.1f}s")
+    if dialect == 'mysql':
+        # Fresh tables have no statistics yet, and the pager's row estimate reads them
+        cursor.execute(f"ANALYZE TABLE {', '.join(table for table, *_ in SCHEMA)}")
+        cursor.fetchall()
+    cursor.close()
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+class Step:
+    """Timings of one benchmarked operation"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.times = []
+        self.rows = 0
+    
+    def summary(self):
+        times = sorted(self.times)
+        total = sum(times)
+        return {
+            'runs': len(times),
+            'p50_ms': round(percentile(times, 0.50) * 1000, 3),
+            'p90_ms': round(percentile(times, 0.90) * 1000, 3),
+            'p99_ms': round(percentile(times, 0.99) * 1000, 3),
+            'max_ms': round(times[-1] * 1000, 3),
+            'mean_ms': round(total / len(times) * 1000, 3),
+            'rows': self.rows,
+            'rows_per_s': round(self.rows / total) if self.rows and total else None,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+
+class Benchmark:
+    """Runs each step `repeat` times against a connect() function and collects the timings"""
+    
+    def __init__(self, connect, make_pool=None, repeat=20, page_size=200, bulk_size=1000, query_rows=None):
+        self.connect = connect  # () -> new connection
+        self.make_pool = make_pool  # () -> ConnectionPool, only for real servers
+        self.repeat = repeat
+        self.page_size = page_size  # same as the Tables tab
+        self.bulk_size = bulk_size
+        self.query_rows = query_rows  # cap on rows streamed by the SQL tab steps, None = all of them
+        self.fetch_size = 500  # same as the SQL tab
+        self.steps = {}
+    
+    def timed(self, name, func, runs=None):
+        """Calls func() runs times; func returns how many rows it handled (or None)"""
+        step = self.steps.setdefault(name, Step(name))
+        for _ in range(runs or self.repeat):
+            started = time.perf_counter()
+            rows = func()
+            step.times.append(time.perf_counter() - started)
+            step.rows += rows or 0
+        return step
+    
+    def run(self, log=print):
+        self.time_connect()
+        conn = self.connect()
+        cursor = conn.cursor()
+        gateway = TableGateway(conn, cursor, statements=StatementCache(conn))
+        try:
+            for step in (self.time_browse, self.time_single_writes, self.time_bulk_writes, self.time_queries):
+                step(gateway)
+                log(f"  {step.__name__[5:].replace('_', ' ')} done")
+        finally:
+            cursor.close()
+            conn.close()
+        return {name: step.summary() for name, step in self.steps.items()}
+    
+    def time_connect(self):
+        """connect_db: open the connection(s) and load every table's structure"""
+        def connect():
+            if self.make_pool is not None:
+                # Same as the app - the pool opens its first connection on the first checkout
+                pool = self.make_pool()
+                with pool.connection() as conn:
+                    cursor = conn.cursor()
+                    tables = TableGateway(conn, cursor).list_tables(reload=True)
+                    cursor.close()
+                pool.close()
+                return len(tables)
+            conn = self.connect()
+            cursor = conn.cursor()
+            tables = TableGateway(conn, cursor).list_tables(reload=True)
+            cursor.close()
+            conn.close()
+            return len(tables)
+        self.timed('connect_db', connect, runs=min(self.repeat, 5))
+    
+    def time_browse(self, gateway):
+        """load_tables, then load_table_data and scrolling the way the Tables tab does it"""
+        self.timed('load_tables', lambda: len(gateway.list_tables(reload=True)))
+        
+        cache = ResultCache()
+        
+        def load_table_data(table, use_cache):
+            if not use_cache:
+                cache.invalidate()
+            pager = gateway.pager(table, self.page_size)
+            cache.validate(gateway.cursor, table)
+            pager.estimate_rows(gateway.cursor)
+            return len(pager.fetch_first(gateway.cursor, cache))
+        
+        for table in ('orders', 'order_items'):
+            self.timed(f'load_table_data {table}', lambda: load_table_data(table, False))
+        self.timed('load_table_data orders (cached)', lambda: load_table_data('orders', True))
+        
+        # Scrolling down - keyset pages one after another
+        pager = gateway.pager('orders', self.page_size)
+        state = {'rows': pager.fetch_first(gateway.cursor), 'offset': 0}
+        
+        def next_page():
+            last = state['rows'][-1] if state['rows'] else None
+            if last is None:
+                state['rows'] = pager.fetch_first(gateway.cursor)
+                state['offset'] = 0
+                return len(state['rows'])
+            state['offset'] += len(state['rows'])
+            state['rows'] = pager.fetch_after(gateway.cursor, last, state['offset'])
+            return len(state['rows'])
+        self.timed('scroll orders', next_page)
+        
+        # Sorted on a column with an index, and filtered on one without
+        self.timed('sort orders by order_date desc',
+                   lambda: len(gateway.page('orders', page_size=self.page_size, sort_column='order_date',
+                                            descending=True)))
+        self.timed('filter orders status = returned',
+                   lambda: len(gateway.page('orders', page_size=self.page_size,
+                                            filters=[('status', '=', 'returned')])))
+    
+    def customer(self, key):
+        return {'customer_id': key, 'first_name': "Bench", 'last_name': f"Row{key}",
+                'email': f"bench{key}@example.com", 'city': "Waterloo", 'joined': datetime.date(2024, 1, 1)}
+    
+    def time_single_writes(self, gateway):
+        """Add, Edit and Delete buttons - one row at a time, committed each time"""
+        keys = iter(range(BULK_KEY_BASE, BULK_KEY_BASE + self.repeat))
+        inserted = []
+        
+        def insert():
+            key = next(keys)
+            inserted.append(gateway.insert('customers', self.customer(key)))
+            return 1
+        self.timed('insert one', insert)
+        
+        updates = iter(inserted)
+        self.timed('update one', lambda: gateway.update('customers', next(updates), {'city': "Toronto"}))
+        deletes = iter(inserted)
+        self.timed('delete one', lambda: gateway.delete_many('customers', [next(deletes)]))
+    
+    def time_bulk_writes(self, gateway):
+        """Imports and Apply Changes - bulk_size rows per transaction"""
+        runs = max(self.repeat // 4, 1)
+        batches = []
+        for run in range(runs):
+            start = BULK_KEY_BASE + 100_000 + run * self.bulk_size
+            batches.append(list(range(start, start + self.bulk_size)))
+        
+        inserts = iter(batches)
+        self.timed('insert bulk', lambda: gateway.insert_many('customers', [self.customer(key) for key in next(inserts)]),
+                   runs=runs)
+        updates = iter(batches)
+        self.timed('update bulk', lambda: gateway.update_many('customers', {(key,): {'city': "Ottawa"}
+                                                                          for key in next(updates)}),
+                   runs=runs)
+        deletes = iter(batches)
+        self.timed('delete bulk', lambda: gateway.delete_many('customers', [(key,) for key in next(deletes)]),
+                   runs=runs)
+    
+    def stream(self, cursor, query):
+        """The SQL tab's worker loop - execute, then fetchmany until the result runs out"""
+        if self.query_rows is not None:
+            query += f" LIMIT {self.query_rows}"
+        cursor.execute(query)
+        received = 0
+        while True:
+            rows = cursor.fetchmany(self.fetch_size)
+            if not rows:
+                break
+            received += len(rows)
+        return received
+    
+    def time_queries(self, gateway):
+        """execute_query with big results"""
+        runs = max(self.repeat // 10, 1)
+        cursor = gateway.cursor
+        self.timed('execute_query scan orders', lambda: self.stream(cursor, "SELECT * FROM orders"), runs=runs)
+        self.timed('execute_query join', lambda: self.stream(
+            cursor,
+            "SELECT o.order_id, o.order_date, c.first_name, c.last_name, i.line_no, p.name, i.quantity, i.price "
+            "FROM order_items i JOIN orders o ON o.order_id = i.order_id "
+            "JOIN customers c ON c.customer_id = o.customer_id JOIN products p ON p.product_id = i.product_id"
+        ), runs=runs)
+
+
+class LocalServer:
+    """A throwaway mysqld or mariadbd with its data directory in a temp folder"""
+    
+    def __init__(self):
+        self.server = shutil.which('mysqld') or shutil.which('mariadbd')
+        if self.server is None:
+            raise RuntimeError("Couldn't find mysqld or mariadbd on the PATH")
+        self.mariadb = 'mariadb' in os.path.basename(self.server) or b'MariaDB' in subprocess.run(
+            [self.server, '--version'], capture_output=True).stdout
+        self.tmp = tempfile.mkdtemp(prefix="dbms_bench_")
+        self.datadir = os.path.join(self.tmp, "data")
+        self.socket = os.path.join(self.tmp, "mysql.sock")
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        self.process = None
+    
+    def start(self, timeout=60):
+        if self.mariadb:
+            install = shutil.which('mariadb-install-db') or shutil.which('mysql_install_db')
+            subprocess.run([install, f"--datadir={self.datadir}", "--auth-root-authentication-method=normal",
+                            "--skip-test-db"], check=True, capture_output=True)
+        else:
+            subprocess.run([self.server, "--initialize-insecure", f"--datadir={self.datadir}"],
+                           check=True, capture_output=True)
+        args = [self.server, "--no-defaults", f"--datadir={self.datadir}", f"--socket={self.socket}",
+                f"--port={self.port}", "--bind-address=127.0.0.1", f"--pid-file={self.tmp}/mysqld.pid"]
+        if not self.mariadb:
+            args.append("--mysqlx=OFF")
+        self.process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                mysql.connector.connect(**self.connect_args()).close()
+                return
+            except mysql.connector.Error:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError(f"{os.path.basename(self.server)} didn't start")
+                time.sleep(0.5)
+    
+    def connect_args(self):
+        return dict(host="127.0.0.1", port=self.port, user="root", password="")
+    
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def print_report(results, baseline=None, threshold=1.2):
+    """Prints a table of the results; with a baseline, marks steps whose p50 got slower than threshold times"""
+    header = f"{'step':<34}{'runs':>5}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'rows/s':>12}{'RSS MB':>9}"
+    if baseline:
+        header += f"{'vs base':>10}"
+    print(header)
+    regressions = []
+    for name, result in results.items():
+        rows_per_s = f"{result['rows_per_s']:,}" if result['rows_per_s'] else "-"
+        rss = result['peak_rss_mb'] if result['peak_rss_mb'] is not None else "-"
+        line = (f"{name:<34}{result['runs']:>5}{result['p50_ms']:>10.2f}{result['p90_ms']:>10.2f}"
+                f"{result['p99_ms']:>10.2f}{rows_per_s:>12}{rss:>9}")
+        old = baseline.get(name) if baseline else None
+        if old and old['p50_ms']:
+            ratio = result['p50_ms'] / old['p50_ms']
+            line += f"{ratio:>9.2f}x"
+            if ratio > threshold:
+                line += " slower"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the app's database paths")
+    parser.add_argument('--rows', type=int, default=10_000, help="orders to seed (other tables scale with it)")
+    parser.add_argument('--repeat', type=int, default=20, help="runs of each quick step")
+    parser.add_argument('--bulk-size', type=int, default=1000)
+    parser.add_argument('--query-rows', type=int, help="LIMIT for the big SQL tab queries")
+    parser.add_argument('--latency', type=float, default=0.0, help="ms added per statement (SQLite stand-in only)")
+    server = parser.add_mutually_exclusive_group()
+    server.add_argument('--mysql', action='store_true', help="use a scratch database on the server below")
+    server.add_argument('--spawn-mysqld', action='store_true', help="start a throwaway local server")
+    parser.add_argument('--host', default="localhost")
+    parser.add_argument('--port', type=int, default=3306)
+    parser.add_argument('--user', default="root")
+    parser.add_argument('--password', default=os.environ.get('MYSQL_PWD', ""))
+    parser.add_argument('--keep', action='store_true', help="don't drop the scratch database afterwards")
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="JSON file from an earlier --save to compare against")
+    parser.add_argument('--threshold', type=float, default=1.2, help="p50 ratio that counts as a regression")
+    args = parser.parse_args(argv)
+    
+    database = f"dbms_bench_{os.getpid()}"
+    spawned = None
+    fake = None
+    make_pool = None
+    server_args = None  # set once there's a real server to clean up after
+    try:
+        if args.mysql or args.spawn_mysqld:
+            if args.spawn_mysqld:
+                print("Starting a local server...")
+                spawned = LocalServer()
+                spawned.start()
+                server_args = spawned.connect_args()
+                backend = "spawned " + os.path.basename(spawned.server)
+            else:
+                server_args = dict(host=args.host, port=args.port, user=args.user, password=args.password)
+                backend = f"mysql {args.host}:{args.port}"
+            admin = mysql.connector.connect(**server_args)
+            admin.cursor().execute(f"CREATE DATABASE {database}")
+            admin.close()
+            connect_args = dict(server_args, database=database)
+            
+            def connect():
+                return mysql.connector.connect(**connect_args)
+            
+            def mysql_pool():
+                return ConnectionPool(connect_args)
+            make_pool = mysql_pool
+            dialect = 'mysql'
+        else:
+            fake = FakeServer(os.path.join(tempfile.gettempdir(), f"{database}.sqlite3"),
+                              latency=args.latency / 1000)
+            connect = fake.connect
+            backend = "sqlite stand-in" + (f", {args.latency} ms latency" if args.latency else "")
+            dialect = 'sqlite'
+        
+        print(f"Seeding {args.rows:,} orders ({backend})...")
+        conn = connect()
+        seed(conn, dialect, args.rows)
+        conn.close()
+        # UPDATE_TIME only has whole seconds, so the result cache won't trust tables written in the last two
+        time.sleep(2)
+        
+        print("Running...")
+        bench = Benchmark(connect, make_pool, args.repeat, bulk_size=args.bulk_size, query_rows=args.query_rows)
+        results = bench.run()
+    except (mysql.connector.Error, RuntimeError, subprocess.CalledProcessError) as e:
+        print(f"Benchmark failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if fake is not None:
+            fake.remove()
+        elif server_args is not None and not args.keep:
+            try:
+                admin = mysql.connector.connect(**server_args)
+                admin.cursor().execute(f"DROP DATABASE IF EXISTS {database}")
+                admin.close()
+            except mysql.connector.Error:
+                pass  # the server went away, the scratch database goes with a spawned one anyway
+        if spawned is not None:
+            spawned.stop()
+    
+    report = {
+        'meta': {
+            'backend': backend,
+            'rows': args.rows,
+            'repeat': args.repeat,
+            'bulk_size': args.bulk_size,
+            'python': platform.python_version(),
+            'connector': mysql.connector.__version__,
+            'platform': platform.platform(),
+            'when': datetime.datetime.now().isoformat(timespec='seconds'),
+        },
+        'results': results,
+    }
+    
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            old = json.load(f)
+        if old['meta']['backend'] != backend or old['meta']['rows'] != args.rows:
+            print(f"Note: baseline was {old['meta']['backend']} with {old['meta']['rows']:,} rows")
+        baseline = old['results']
+    print()
+    regressions = print_report(results, baseline, args.threshold)
+    
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved to {args.save}")
+    if regressions:
+        print(f"\n{len(regressions)} step(s) slower than {args.threshold}x the baseline: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""
+bulk_job.py
+Runs a big DELETE or UPDATE as a bulk job - a string of small transactions,
+one primary key range at a time - instead of one transaction that holds its
+locks and grows the undo log until the whole table is done, while the store
+waits on it.
+
+The ranges are cut by walking the primary key index (LIMIT 1 OFFSET n past
+where the last range ended), the statement's own WHERE is ANDed onto each
+one, and every chunk is committed before the next one starts. Between chunks
+the job looks at Threads_running and backs off while the server is busy,
+sizes the next chunk so each takes about chunk_time seconds, and sleeps to
+stay under max_rate rows a second if it was given one. The last key done is
+written to a checkpoint file after every commit, so a job that was stopped,
+or crashed, picks up where it left off.
+"""
+
+import json
+import os
+import re
+import time
+
+import mysql.connector
+
+from exporter import json_value
+from script_runner import _quoted_end
+from statement_cache import quote_identifier
+from table_pager import key_range_condition
+
+BULK_STATEMENT = re.compile(r"\s*(?:(DELETE)\s+FROM|(UPDATE))\s+(`(?:[^`]|``)+`|[A-Za-z0-9_$]+)\s+(.*?)[\s;]*$",
+                            re.IGNORECASE | re.DOTALL)
+WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_$]*")
+
+
+def top_level_words(text):
+    """(position, upper cased word) for the words outside strings, quoted names and brackets"""
+    words = []
+    depth = 0
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if c in "'\"`":
+            i = _quoted_end(text, i)
+            continue
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c.isalpha() or c == '_':
+            match = WORD.match(text, i)
+            if depth == 0:
+                words.append((i, match.group(0).upper()))
+            i = match.end()
+            continue
+        i += 1
+    return words
+
+
+def format_duration(seconds):
+    """e.g. 1h 05m, 3m 20s, 42s"""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class BulkStatement:
+    """A single table DELETE or UPDATE, taken apart so each chunk can add its key range to the WHERE"""
+    
+    def __init__(self, sql):
+        match = BULK_STATEMENT.match(sql)
+        if not match:
+            raise ValueError("A bulk job runs one single-table DELETE FROM ... or UPDATE ... SET ... statement")
+        self.sql = sql.strip()
+        self.kind = 'DELETE' if match.group(1) else 'UPDATE'
+        name = match.group(3)
+        self.table = name[1:-1].replace('``', '`') if name.startswith('`') else name
+        
+        rest = match.group(4)
+        words = top_level_words(rest)
+        for _, word in words:
+            if word in ('ORDER', 'LIMIT', 'JOIN', 'USING'):
+                raise ValueError(f"Bulk jobs pick their own chunks - take the {word} out of the statement")
+        where_at = next((pos for pos, word in words if word == 'WHERE'), None)
+        head = rest if where_at is None else rest[:where_at]
+        self.where = "" if where_at is None else rest[where_at + len('WHERE'):].strip()
+        
+        self.set_clause = ""
+        if self.kind == 'UPDATE':
+            if not words or words[0] != (0, 'SET'):
+                raise ValueError("Expected UPDATE table SET ...")
+            self.set_clause = head[len('SET'):].strip()
+        elif head.strip():
+            raise ValueError("Bulk jobs work on one table at a time - expected DELETE FROM table WHERE ...")
+    
+    def sets_column(self, column):
+        """Whether the UPDATE assigns to column (near enough - it only looks at the top level of SET)"""
+        pattern = rf"(?:^|,)\s*(?:`{re.escape(column)}`|{re.escape(column)})\s*="
+        return bool(re.search(pattern, self.set_clause, re.IGNORECASE))
+    
+    def chunk_query(self, range_condition):
+        """The statement cut down to one key range"""
+        where = f"({range_condition})" if range_condition else ""
+        if self.where:
+            where = f"{where} AND ({self.where})" if where else self.where
+        where = f" WHERE {where}" if where else ""
+        if self.kind == 'DELETE':
+            return f"DELETE FROM {quote_identifier(self.table)}{where}"
+        return f"UPDATE {quote_identifier(self.table)} SET {self.set_clause}{where}"
+
+
+class BulkJob:
+    """One bulk DELETE or UPDATE - run() carries on from wherever the last run (or the checkpoint) stopped"""
+    
+    def __init__(self, sql, key_columns, chunk_size=1000, chunk_time=0.5, max_rate=None, max_threads_running=20,
+                 checkpoint_path=None):
+        self.statement = BulkStatement(sql)
+        if not key_columns:
+            raise ValueError(f"{self.statement.table} has no primary key to cut the job into ranges by")
+        for col in key_columns:
+            if self.statement.sets_column(col):
+                raise ValueError(f"The UPDATE changes {col}, part of the primary key the job walks along")
+        self.key_columns = list(key_columns)
+        self.chunk_size = chunk_size  # key range size for the next chunk - adjusted as the job runs
+        self.min_chunk = 10
+        self.max_chunk = max(chunk_size * 20, 10000)
+        self.chunk_time = chunk_time  # seconds each chunk should take
+        self.max_rate = max_rate  # rows changed a second, None for as fast as chunk_time allows
+        self.max_threads_running = max_threads_running  # back off while the server has more than this
+        self.checkpoint_path = checkpoint_path
+        self.on_progress = None  # on_progress(bulk_job) after every chunk - called on the worker thread
+        self.pause_requested = False  # set from the Tk thread, the job pauses after the chunk it's on
+        
+        self.last_key = None  # end of the last range committed
+        self.done = False
+        self.chunks = 0
+        self.rows_affected = 0
+        self.rows_scanned = 0  # index entries walked past, which is what the estimate counts
+        self.estimated_rows = None  # the table's row estimate, for how far along we are
+        self.elapsed = 0.0  # seconds spent running across every run(), waits included but not pauses
+        self.throttled = 0.0  # seconds of that spent waiting for the server to calm down
+        self.state = "starting"
+    
+    @property
+    def table(self):
+        return self.statement.table
+    
+    def progress(self):
+        """Fraction done, going by the table's row estimate - None when there's no estimate"""
+        if self.done:
+            return 1.0
+        if not self.estimated_rows:
+            return None
+        return min(self.rows_scanned / self.estimated_rows, 0.99)
+    
+    def eta(self):
+        """Seconds left at the speed so far, or None before there's anything to go on"""
+        fraction = self.progress()
+        if not fraction or self.done:
+            return None
+        return self.elapsed * (1 - fraction) / fraction
+    
+    def progress_text(self):
+        """e.g. '12,000 rows deleted in 12 chunks, 40% done, about 1m 30s left'"""
+        verb = "deleted" if self.statement.kind == 'DELETE' else "updated"
+        text = f"{self.rows_affected:,} rows {verb} in {self.chunks:,} chunks"
+        fraction = self.progress()
+        if fraction is not None and not self.done:
+            text += f", {fraction:.0%} done"
+            eta = self.eta()
+            if eta is not None:
+                text += f", about {format_duration(eta)} left"
+        if self.state:
+            text += f" ({self.state})"
+        return text
+    
+    def save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        checkpoint = {
+            'sql': self.statement.sql, 'done': self.done, 'last_key': None if self.last_key is None else [json_value(v) for v in self.last_key],
+            'chunk_size': self.chunk_size, 'chunks': self.chunks, 'rows_affected': self.rows_affected,
+            'rows_scanned': self.rows_scanned, 'elapsed': self.elapsed, 'throttled': self.throttled,
+        }
+        # Written next to the real file and swapped in, so a crash mid-write can't leave half a checkpoint
+        os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+        with open(self.checkpoint_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(self.checkpoint_path + ".tmp", self.checkpoint_path)
+    
+    def load_checkpoint(self):
+        """Carries on from the checkpoint file if it's for this statement - returns whether it was"""
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError, TypeError):
+            return False
+        if checkpoint.get('sql') != self.statement.sql:
+            return False
+        # Keys come back as text for dates and decimals - MySQL compares them against the columns all the same
+        self.last_key = None if checkpoint['last_key'] is None else tuple(checkpoint['last_key'])
+        for name in ('done', 'chunk_size', 'chunks', 'rows_affected', 'rows_scanned', 'elapsed', 'throttled'):
+            setattr(self, name, checkpoint[name])
+        return True
+    
+    def remove_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+    
+    def report(self, state=None):
+        if state is not None:
+            self.state = state
+        if self.on_progress:
+            self.on_progress(self)
+    
+    def wait(self, seconds, job=None):
+        """Sleeps, but wakes up for Cancel"""
+        end = time.perf_counter() + seconds
+        while True:
+            if job is not None:
+                job.check_cancelled()
+            left = end - time.perf_counter()
+            if left <= 0:
+                break
+            time.sleep(min(left, 0.1))
+        self.elapsed += seconds
+    
+    @staticmethod
+    def threads_running(cursor):
+        """Threads_running on the server, or None if we can't see it"""
+        try:
+            cursor.execute("SHOW GLOBAL STATUS LIKE 'Threads_running'")
+            rows = cursor.fetchall()
+        except mysql.connector.Error:
+            return None
+        return int(rows[0][1]) if rows else None
+    
+    def wait_for_load(self, cursor, job=None):
+        """Holds off, longer each time, while the server is busier than max_threads_running"""
+        delay = 0.5
+        while True:
+            running = self.threads_running(cursor)
+            if running is None or running <= self.max_threads_running:
+                return
+            self.report(f"server busy, {running} threads running - waiting")
+            self.wait(delay, job)
+            self.throttled += delay
+            delay = min(delay * 2, 10)
+    
+    def estimate_rows(self, cursor):
+        cursor.execute("SELECT TABLE_ROWS FROM information_schema.TABLES "
+                       "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (self.table,))
+        rows = cursor.fetchall()
+        return rows[0][0] if rows else None
+    
+    def range_end(self, cursor):
+        """Key chunk_size entries past the last range, or None when the rest of the table fits in this chunk"""
+        names = ", ".join(quote_identifier(col) for col in self.key_columns)
+        condition, params = key_range_condition(self.key_columns, self.last_key, None)
+        where = f" WHERE {condition}" if condition else ""
+        cursor.execute(f"SELECT {names} FROM {quote_identifier(self.table)}{where} ORDER BY {names} LIMIT 1 OFFSET %s",
+                       params + [self.chunk_size - 1])
+        rows = cursor.fetchall()
+        return tuple(rows[0]) if rows else None
+    
+    def resize(self, seconds):
+        """Scales the next chunk towards chunk_time, never more than halving or doubling it at once"""
+        if seconds <= 0:
+            return
+        target = self.chunk_size * self.chunk_time / seconds
+        target = min(max(target, self.chunk_size / 2), self.chunk_size * 2)
+        self.chunk_size = int(min(max(target, self.min_chunk), self.max_chunk))
+    
+    def run(self, conn, cursor, job=None):
+        """
+        Runs chunks until the table's done, committing each one. Cancelling (or a failure)
+        rolls back just the chunk it was in - the checkpoint still has everything before it.
+        """
+        if self.estimated_rows is None:
+            self.estimated_rows = self.estimate_rows(cursor)
+        
+        while not self.done:
+            if job is not None:
+                job.check_cancelled()
+                if self.pause_requested:
+                    self.report("paused")
+                    job.pause()  # between chunks, so nothing's locked while we wait
+            self.wait_for_load(cursor, job)
+            self.state = ""
+            
+            started = time.perf_counter()
+            try:
+                upper = self.range_end(cursor)
+                condition, params = key_range_condition(self.key_columns, self.last_key, upper)
+                cursor.execute(self.statement.chunk_query(condition), params)
+                affected = max(cursor.rowcount, 0)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            seconds = time.perf_counter() - started
+            
+            self.last_key = upper
+            self.done = upper is None
+            self.chunks += 1
+            self.rows_affected += affected
+            self.rows_scanned += self.chunk_size
+            self.elapsed += seconds
+            self.save_checkpoint()
+            self.resize(seconds)
+            
+            if self.max_rate and not self.done:
+                # Spread the chunks out so the rows changed per second stay under max_rate
+                spare = affected / self.max_rate - seconds
+                if spare > 0:
+                    self.report(f"holding to {self.max_rate:,} rows/s")
+                    self.wait(spare, job)
+            self.report("")
+        return self
@@ -0,0 +1,340 @@
+"""
+cli.py
+Command line entry point for the same table operations the GUI does - list
+and describe tables, page through rows, insert, update, delete and run
+scripts - without Tk, so they can be scripted, timed and profiled.
+
+    python cli.py --user root tables
+    python cli.py --user root stats --exact
+    python cli.py --user root page orders --sort order_date --desc --where status = shipped
+    python cli.py --user root diff orders --to-host staging --sql sync_orders.sql
+    python cli.py --user root insert customers --row '{"first_name": "Ann", "last_name": "Lee"}'
+    python cli.py --user root --profile script migration.sql --transaction
+    python cli.py --user root snapshot store.sqlite3 orders order_items
+    python cli.py --snapshot store.sqlite3 page orders --where status = shipped
+    python cli.py --saved production --compress stats
+
+The password comes from --password, the MYSQL_PWD environment variable, the
+keyring (for a --saved connection), or a prompt, in that order. --saved picks
+up the settings of a connection saved in the GUI - any given on the command
+line still win. With --snapshot the commands run on a snapshot file instead,
+and no password is needed.
+"""
+
+import argparse
+import cProfile
+import getpass
+import json
+import os
+import pstats
+import sys
+import time
+
+import mysql.connector
+
+from connection_pool import open_connection
+from exporter import json_value
+from importer import converter_for
+from saved_connections import SavedConnections
+from script_runner import ScriptError
+from snapshot import Snapshot, SnapshotWriter
+from statement_cache import StatementCache
+from table_diff import TableDiff, other_connection
+from table_gateway import TableGateway
+from table_pager import FILTER_OPS
+from table_stats import format_size
+
+
+def column_converters(gateway, table):
+    """{column: function turning command line text into that column's type}"""
+    return {col[0]: converter_for(col[1]) for col in gateway.describe(table).columns}
+
+
+def parse_key(gateway, table, text):
+    """'12' or '12,3' (for composite keys) -> primary key tuple in the key columns' types"""
+    key_columns = gateway.primary_key(table)
+    parts = text.split(",")
+    if len(parts) != len(key_columns):
+        raise ValueError(f"{table}'s primary key is ({', '.join(key_columns)}), got {text!r}")
+    converters = column_converters(gateway, table)
+    return tuple(converters[col](part) for col, part in zip(key_columns, parts))
+
+
+def print_rows(columns, rows, fmt):
+    if fmt == 'jsonl':
+        for row in rows:
+            print(json.dumps({col: json_value(value) for col, value in zip(columns, row)}))
+        return
+    for row in rows:
+        print("\t".join("NULL" if value is None else str(json_value(value)) for value in row))
+
+
+def cmd_tables(gateway, args):
+    for table in gateway.list_tables():
+        print(table)
+
+
+def cmd_stats(gateway, args):
+    print("\t".join(("table", "engine", "rows", "avg_row", "data", "index", "updated")))
+    for stats in gateway.table_stats().values():
+        if args.exact:
+            stats.exact_rows = gateway.count(stats.name)
+        print("\t".join((stats.name, stats.engine or "", stats.row_text(), format_size(stats.avg_row_length),
+                         format_size(stats.data_length), format_size(stats.index_length),
+                         "" if stats.update_time is None else str(stats.update_time))))
+
+
+def cmd_describe(gateway, args):
+    schema = gateway.describe(args.table)
+    for col in schema.columns:
+        print("\t".join("" if value is None else str(value) for value in col))
+
+
+def cmd_page(gateway, args):
+    filters = []
+    converters = column_converters(gateway, args.table)
+    for col, op, text in args.where:
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unknown operator {op!r} - use one of: {', '.join(FILTER_OPS)}")
+        if op in ('is null', 'is not null'):
+            value = None
+        elif op in ('starts with', 'contains'):
+            value = text
+        else:
+            value = converters.get(col, str)(text)
+        filters.append((col, op, value))
+    
+    view = dict(sort_column=args.sort, descending=args.desc, filters=filters)
+    pager = gateway.pager(args.table, args.size, **view)
+    if args.format == 'tsv':
+        print("\t".join(pager.columns))
+    
+    rows = pager.fetch_first(gateway.cursor)
+    offset = 0
+    for _ in range(args.pages):
+        if not rows:
+            break
+        print_rows(pager.columns, rows, args.format)
+        offset += len(rows)
+        if len(rows) < args.size:
+            break
+        rows = pager.fetch_after(gateway.cursor, rows[-1], offset)
+
+
+def cmd_insert(gateway, args):
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        started = time.perf_counter()
+        inserted = gateway.insert_many(args.table, rows)
+        print(f"Inserted {inserted:,} rows in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+        return
+    key = gateway.insert(args.table, json.loads(args.row))
+    print(",".join(map(str, key)) if key else "Inserted (key unknown)")
+
+
+def cmd_update(gateway, args):
+    converters = column_converters(gateway, args.table)
+    values = {}
+    for assignment in args.set:
+        col, sep, text = assignment.partition("=")
+        if not sep or col not in converters:
+            raise ValueError(f"Expected column=value with a column of {args.table}, got {assignment!r}")
+        values[col] = None if text == "NULL" else converters[col](text)
+    affected = gateway.update(args.table, parse_key(gateway, args.table, args.key), values)
+    print(f"{affected} row(s) updated")
+
+
+def cmd_delete(gateway, args):
+    keys = [parse_key(gateway, args.table, key) for key in args.key]
+    print(f"{gateway.delete_many(args.table, keys)} row(s) deleted")
+
+
+def cmd_diff(gateway, args):
+    schema = gateway.describe(args.table)
+    other_args = dict(host=args.to_host or args.host, port=args.to_port or args.port, user=args.to_user or args.user,
+                      password=args.to_password if args.to_password is not None else args.password,
+                      database=args.to_database or args.database)
+    diff = TableDiff(args.table, [col[0] for col in schema.columns], schema.primary_key)
+    with other_connection(other_args) as (other_conn, other_cursor):
+        diff.run(gateway.cursor, other_cursor)
+        print(diff.summary(), file=sys.stderr)
+        if args.sql:
+            with open(args.sql, 'w', encoding='utf-8') as f:
+                f.write(diff.sync_script())
+        if args.apply and len(diff):
+            print(f"{diff.apply(other_conn, other_cursor):,} row(s) changed on the target", file=sys.stderr)
+    
+    for label, rows in (("missing", diff.missing), ("extra", diff.extra), ("changed", [new for new, old in diff.changed])):
+        for row in rows:
+            print(label + "\t" + "\t".join("NULL" if value is None else str(json_value(value)) for value in row))
+
+
+def cmd_snapshot(gateway, args):
+    tables = args.tables or gateway.list_tables()
+    writer = SnapshotWriter(args.file)
+    writer.take(gateway.cursor, [gateway.describe(table) for table in tables], f"{args.host}:{args.port}", args.database)
+    print(f"Copied {writer.rows:,} rows from {len(tables)} tables in {writer.elapsed:.2f}s", file=sys.stderr)
+
+
+def cmd_script(gateway, args):
+    with open(args.file, encoding='utf-8') as f:
+        script = f.read()
+    
+    def on_results(runner, results):
+        for result in results:
+            if result.error:
+                print(f"Statement {result.index + 1} (line {result.statement.line}): {result.error}", file=sys.stderr)
+            elif result.columns is not None:
+                print_rows(result.columns, result.rows, 'tsv')
+    
+    runner = gateway.run_script(script, args.transaction, not args.keep_going, on_results=on_results)
+    print(f"{runner.executed:,} of {len(runner.statements):,} statements in {runner.elapsed:.2f}s"
+          + (f", {runner.failed:,} failed" if runner.failed else ""), file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Clothing Store DB Manager without the GUI")
+    # Defaults are filled in by main() - after --saved, which needs to know what was actually given
+    parser.add_argument('--host', help="default: localhost")
+    parser.add_argument('--port', type=int, help="default: 3306")
+    parser.add_argument('--user', help="default: root")
+    parser.add_argument('--password')
+    parser.add_argument('--database', help="default: clothing_retail_store")
+    parser.add_argument('--compress', action='store_true', help="compress the protocol, for slow links")
+    parser.add_argument('--saved', metavar='NAME', help="use a connection saved in the GUI")
+    parser.add_argument('--profile', action='store_true', help="run under cProfile and print the slowest calls")
+    parser.add_argument('--snapshot', metavar='FILE', help="work on a snapshot file instead of the server")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    commands.add_parser('tables', help="list tables").set_defaults(func=cmd_tables)
+    
+    stats = commands.add_parser('stats', help="rows, sizes and last update of every table")
+    stats.add_argument('--exact', action='store_true', help="COUNT(*) each table instead of the estimate")
+    stats.set_defaults(func=cmd_stats)
+    
+    describe = commands.add_parser('describe', help="show a table's columns")
+    describe.add_argument('table')
+    describe.set_defaults(func=cmd_describe)
+    
+    page = commands.add_parser('page', help="print rows a page at a time")
+    page.add_argument('table')
+    page.add_argument('--size', type=int, default=200)
+    page.add_argument('--pages', type=int, default=1)
+    page.add_argument('--sort')
+    page.add_argument('--desc', action='store_true')
+    page.add_argument('--where', nargs=3, action='append', default=[], metavar=('COLUMN', 'OP', 'VALUE'),
+                      help="filter, e.g. --where price '>' 20 (VALUE is ignored for 'is null')")
+    page.add_argument('--format', choices=('tsv', 'jsonl'), default='tsv')
+    page.set_defaults(func=cmd_page)
+    
+    insert = commands.add_parser('insert', help="insert one row, or many from a JSON Lines file")
+    insert.add_argument('table')
+    rows = insert.add_mutually_exclusive_group(required=True)
+    rows.add_argument('--row', help="JSON object of column: value")
+    rows.add_argument('--file', help="JSON Lines file, one object per row")
+    insert.set_defaults(func=cmd_insert)
+    
+    update = commands.add_parser('update', help="update one row by primary key")
+    update.add_argument('table')
+    update.add_argument('--key', required=True, help="primary key, comma separated for composite keys")
+    update.add_argument('--set', nargs='+', required=True, metavar='COLUMN=VALUE')
+    update.set_defaults(func=cmd_update)
+    
+    delete = commands.add_parser('delete', help="delete rows by primary key")
+    delete.add_argument('table')
+    delete.add_argument('--key', nargs='+', required=True)
+    delete.set_defaults(func=cmd_delete)
+    
+    diff = commands.add_parser('diff', help="compare a table with its copy on another server or database")
+    diff.add_argument('table')
+    diff.add_argument('--to-host', help="the copy's settings default to this connection's")
+    diff.add_argument('--to-port', type=int)
+    diff.add_argument('--to-user')
+    diff.add_argument('--to-password')
+    diff.add_argument('--to-database')
+    diff.add_argument('--sql', metavar='FILE', help="write the statements that make the copy match this table")
+    diff.add_argument('--apply', action='store_true', help="run those statements on the copy")
+    diff.set_defaults(func=cmd_diff)
+    
+    snapshot = commands.add_parser('snapshot', help="copy tables into a local snapshot file")
+    snapshot.add_argument('file')
+    snapshot.add_argument('tables', nargs='*', help="tables to copy (default: all of them)")
+    snapshot.set_defaults(func=cmd_snapshot)
+    
+    script = commands.add_parser('script', help="run a SQL script file")
+    script.add_argument('file')
+    script.add_argument('--transaction', action='store_true', help="all or nothing")
+    script.add_argument('--keep-going', action='store_true', help="carry on past failed statements")
+    script.set_defaults(func=cmd_script)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    saved_password = None
+    if args.saved:
+        saved = SavedConnections().load()
+        settings = saved.get(args.saved)
+        if settings is None:
+            print(f"No saved connection called {args.saved}", file=sys.stderr)
+            return 1
+        for key in ('host', 'port', 'user', 'database'):
+            if getattr(args, key) is None:
+                setattr(args, key, int(settings[key]) if key == 'port' else settings[key])
+        args.compress = args.compress or bool(settings['compress'])
+        saved_password = saved.password(args.saved)
+    for key, default in (('host', "localhost"), ('port', 3306), ('user', "root"), ('database', "clothing_retail_store")):
+        if getattr(args, key) is None:
+            setattr(args, key, default)
+    
+    if args.snapshot:
+        try:
+            conn = Snapshot(args.snapshot).server.connect()
+        except (ValueError, OSError) as e:
+            print(f"Failed to open the snapshot: {e}", file=sys.stderr)
+            return 1
+        return run_command(conn, args)
+    
+    password = args.password
+    if password is None:
+        password = os.environ.get('MYSQL_PWD')
+    if password is None:
+        password = saved_password
+    if password is None:
+        password = getpass.getpass(f"Password for {args.user}@{args.host}: ")
+    args.password = password  # diff falls back on it for the other copy
+    
+    try:
+        # Through the C extension when it's installed, the same as the GUI's pool
+        conn = open_connection(dict(host=args.host, port=args.port, user=args.user, password=password,
+                                    database=args.database, compress=args.compress))
+    except mysql.connector.Error as e:
+        print(f"Failed to connect: {e}", file=sys.stderr)
+        return 1
+    return run_command(conn, args)
+
+
+def run_command(conn, args):
+    """Runs the subcommand on conn, then closes it"""
+    cursor = conn.cursor()
+    gateway = TableGateway(conn, cursor, statements=StatementCache(conn))
+    profiler = cProfile.Profile() if args.profile else None
+    try:
+        if profiler:
+            profiler.enable()
+        args.func(gateway, args)
+    except (mysql.connector.Error, ScriptError, ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if profiler:
+            profiler.disable()
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(25)
+        cursor.close()
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
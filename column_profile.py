@@ -0,0 +1,180 @@
+"""
+column_profile.py
+Column profiles for the Tables tab - null rate, distinct values, min, max,
+average and most common values for every column of a table, instead of
+writing the same handful of ad hoc queries each time.
+
+Everything but the most common values comes from one aggregate query over
+all the columns at once, with the aggregates picked from each column's
+DESCRIBE type (AVG for numbers, average length for text, nothing but nulls
+for blobs). The most common values need a GROUP BY per column, so those run
+side by side on separate pooled connections once the big query's back, and
+only for columns where values actually repeat.
+
+Tables much bigger than the sample size are profiled from a sample instead:
+evenly spread ranges of the primary key (its first column, when that's an
+integer), each read with an index range scan and a LIMIT, so the sample
+costs the same on a 10M row table as on a 200k row one. MySQL has no
+TABLESAMPLE, and WHERE RAND() < x still reads every row, so ranges are it.
+"""
+
+import random
+import time
+
+from fk_lookup import TEXT_TYPES
+from importer import converter_for
+from statement_cache import quote_identifier
+
+# Comparing or grouping these is slow or meaningless, so they only get their nulls counted
+OPAQUE_TYPES = ('tinyblob', 'blob', 'mediumblob', 'longblob', 'binary', 'varbinary', 'json', 'geometry',
+                'point', 'linestring', 'polygon')
+
+
+def base_type(col_type):
+    return col_type.split('(')[0].split()[0].lower()
+
+
+class ColumnProfile:
+    """What's in one column"""
+    
+    def __init__(self, name, col_type):
+        self.name = name
+        self.col_type = col_type
+        kind = base_type(col_type)
+        self.opaque = kind in OPAQUE_TYPES
+        self.text = kind in TEXT_TYPES
+        self.numeric = converter_for(col_type) in (int, float) or kind in ('decimal', 'numeric')
+        
+        self.non_null = None
+        self.distinct = None
+        self.minimum = None
+        self.maximum = None
+        self.average = None  # mean for numbers, mean length for text
+        self.top = None  # [(value, rows), ...] most common first - None until its query has come back
+    
+    def aggregates(self):
+        """The SELECT list entries this column adds to the combined query"""
+        name = quote_identifier(self.name)
+        if self.opaque:
+            return [f"COUNT({name})"]
+        average = "NULL"
+        if self.numeric:
+            average = f"AVG({name})"
+        elif self.text:
+            average = f"AVG(CHAR_LENGTH({name}))"
+        return [f"COUNT({name})", f"COUNT(DISTINCT {name})", f"MIN({name})", f"MAX({name})", average]
+    
+    def take(self, values):
+        """Reads this column's aggregates back out of the combined row"""
+        self.non_null = values[0]
+        if not self.opaque:
+            self.distinct, self.minimum, self.maximum, self.average = values[1:]
+    
+    @property
+    def wants_top_values(self):
+        """Whether a most-common-values query is worth running - not when every value's different"""
+        return not self.opaque and self.distinct is not None and 0 < self.distinct < self.non_null
+
+
+class TableProfile:
+    """Profiles of every column of one table, from the whole table or a primary key range sample"""
+    
+    def __init__(self, schema, estimated_rows=None, sample_rows=100_000, sample_ranges=20, top_count=5):
+        self.table = schema.name
+        self.columns = [ColumnProfile(col[0], col[1]) for col in schema.columns]
+        self.key_columns = list(schema.primary_key)
+        self.estimated_rows = estimated_rows  # information_schema's estimate, decides whether to sample
+        self.sample_rows = sample_rows  # None to always read the whole table
+        self.sample_ranges = sample_ranges
+        self.top_count = top_count
+        
+        self.rows = None  # rows profiled - all of them, or the sample's
+        self.range_starts = None  # where each sample range starts, kept so every query sees the same sample
+        self.started = time.perf_counter()
+        self.elapsed = None  # seconds until the last query came back
+        self.profiled_at = time.strftime("%H:%M:%S")
+        
+        first = schema.primary_key[0] if schema.primary_key else None
+        col_type = next((col[1] for col in schema.columns if col[0] == first), None)
+        self.sample_column = first if col_type is not None and converter_for(col_type) is int else None
+    
+    @property
+    def sampled(self):
+        return self.range_starts is not None
+    
+    def describe(self):
+        """e.g. 'Sampled 100,000 of ~12,000,000 rows (20 key ranges) in 1.4s'"""
+        if self.rows is None:
+            return f"Profiling {self.table}..."
+        if self.sampled:
+            text = f"Sampled {self.rows:,} of ~{self.estimated_rows:,} rows ({len(self.range_starts)} key ranges)"
+        else:
+            text = f"All {self.rows:,} rows"
+        if self.elapsed is not None:
+            text += f" in {self.elapsed:.2f}s"
+        return text + f", at {self.profiled_at}"
+    
+    def plan_sample(self, cursor):
+        """Picks the sample's key ranges, if the table's big enough to need one and has a key to cut it by"""
+        if (not self.sample_rows or self.sample_column is None or self.estimated_rows is None
+                or self.estimated_rows < 2 * self.sample_rows):
+            return
+        column = quote_identifier(self.sample_column)
+        cursor.execute(f"SELECT MIN({column}), MAX({column}) FROM {quote_identifier(self.table)}")  # ends of the index
+        low, high = cursor.fetchall()[0]
+        if low is None:
+            return
+        step = (high - low) / self.sample_ranges
+        # A random offset inside each slice, so profiling again doesn't look at exactly the same rows
+        self.range_starts = [int(low + step * (i + random.random())) for i in range(self.sample_ranges)]
+    
+    def source(self):
+        """FROM clause and params for the rows being profiled"""
+        table = quote_identifier(self.table)
+        if not self.sampled:
+            return table, []
+        names = ", ".join(quote_identifier(col.name) for col in self.columns)
+        order = ", ".join(map(quote_identifier, self.key_columns))
+        per_range = max(self.sample_rows // len(self.range_starts), 1)
+        column = quote_identifier(self.sample_column)
+        parts = []
+        params = []
+        for i, start in enumerate(self.range_starts):
+            # Each range stops where the next one starts, so no row gets in the sample twice
+            where = f"{column} >= %s"
+            params.append(start)
+            if i + 1 < len(self.range_starts):
+                where += f" AND {column} < %s"
+                params.append(self.range_starts[i + 1])
+            parts.append(f"SELECT * FROM (SELECT {names} FROM {table} WHERE {where} ORDER BY {order} LIMIT %s) AS r{i}")
+            params.append(per_range)
+        return f"({' UNION ALL '.join(parts)}) AS sample", params
+    
+    def aggregate(self, cursor):
+        """The combined query - row count plus every column's aggregates in one pass"""
+        self.plan_sample(cursor)
+        select = ["COUNT(*)"]
+        spans = []
+        for col in self.columns:
+            aggregates = col.aggregates()
+            spans.append((len(select), len(select) + len(aggregates)))
+            select.extend(aggregates)
+        source, params = self.source()
+        cursor.execute(f"SELECT {', '.join(select)} FROM {source}", params)
+        row = cursor.fetchall()[0]
+        self.rows = row[0]
+        for col, (start, end) in zip(self.columns, spans):
+            col.take(row[start:end])
+        return self
+    
+    def top_values(self, cursor, col):
+        """Most common values of one column - each of these runs on its own connection"""
+        name = quote_identifier(col.name)
+        source, params = self.source()
+        cursor.execute(f"SELECT {name}, COUNT(*) FROM {source} WHERE {name} IS NOT NULL "
+                       f"GROUP BY {name} ORDER BY COUNT(*) DESC LIMIT %s", params + [self.top_count])
+        col.top = [tuple(row) for row in cursor.fetchall()]
+        return col
+    
+    def finished(self):
+        self.elapsed = time.perf_counter() - self.started
@@ -0,0 +1,267 @@
+"""
+connection_pool.py
+Shared pool of MySQL connections for the whole app, built on
+mysql.connector.pooling.
+
+Everything checks a connection out for one operation and gives it straight
+back, so a dropped connection or a leftover unread result only ever affects
+the operation that caused it. MySQLConnectionPool already pings every
+connection it hands out and reconnects the ones the server dropped, so the
+checkout itself adds no round trips of its own.
+
+Connections are opened as they're first needed rather than all at once, so
+connecting costs one handshake instead of pool_size of them - on a slow link
+that's most of the wait before the first table shows. They go through the C
+extension (_mysql_connector) when it's installed, which reads results
+several times faster than the pure Python protocol, and fall back on the
+pure Python one if the C extension can't make the connection.
+
+Given a connect() function instead, the pool hands out connections from that
+(an opened snapshot's SQLite file) with everything else working the same.
+"""
+
+import threading
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import pooling
+
+from statement_cache import StatementCache
+
+
+def uses_c_extension(conn):
+    """True if a connection (pooled or not) talks to the server through the C extension"""
+    cnx = getattr(conn, '_cnx', conn)
+    return mysql.connector.HAVE_CEXT and isinstance(cnx, mysql.connector.CMySQLConnection)
+
+
+def open_connection(connect_args, use_pure=None):
+    """
+    mysql.connector.connect(), with use_pure=None meaning the C extension if it's installed.
+    Only falls back on the pure Python protocol for things the C extension can't do (an auth
+    plugin or option it doesn't support) - a wrong password or a server that's down would
+    just fail a second time.
+    """
+    if use_pure is None:
+        if mysql.connector.HAVE_CEXT:
+            try:
+                return mysql.connector.connect(use_pure=False, **connect_args)
+            except mysql.connector.NotSupportedError:
+                pass
+            except (ImportError, RuntimeError, TypeError):
+                pass  # a C extension built for another version of the connector
+        use_pure = True
+    return mysql.connector.connect(use_pure=use_pure, **connect_args)
+
+
+class LocalConnection:
+    """A connection from LocalPool - close() gives it back to the pool instead of closing it"""
+    
+    def __init__(self, pool, cnx):
+        self._pool = pool
+        self._cnx = cnx
+    
+    def __getattr__(self, name):
+        return getattr(self._cnx, name)
+    
+    def close(self):
+        self._pool.put_back(self._cnx)
+
+
+class LocalPool:
+    """Does MySQLConnectionPool's job for connections that come from a connect() function rather than a server"""
+    
+    def __init__(self, connect, pool_size):
+        self.connect = connect
+        self.pool_size = pool_size
+        self.idle = []
+        self.lock = threading.Lock()
+    
+    def get_connection(self):
+        with self.lock:
+            cnx = self.idle.pop() if self.idle else None
+        return LocalConnection(self, cnx if cnx is not None else self.connect())
+    
+    def put_back(self, cnx):
+        with self.lock:
+            if len(self.idle) < self.pool_size:
+                self.idle.append(cnx)
+                return
+        cnx.close()
+    
+    def _remove_connections(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for cnx in idle:
+            cnx.close()
+
+
+class ConnectionPool:
+    """Hands out pooled connections with cleanup on checkin and usage stats"""
+    
+    def __init__(self, connect_args, pool_size=5, checkout_timeout=30, connect=None):
+        self.connect_args = connect_args  # kwargs for mysql.connector.connect (compress=True for slow links)
+        self.connect = connect  # makes connections instead of mysql.connector when it's given
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout  # how long to wait for a free connection
+        
+        self.pool = None  # created on first use so connect_db doesn't block the Tk thread
+        self.use_pure = None  # decided by the first connection - None tries the C extension
+        self.opened = 0  # connections opened so far, up to pool_size
+        self.lock = threading.Lock()
+        # MySQLConnectionPool errors out when it's empty, this lets callers wait their turn instead
+        self.available = threading.BoundedSemaphore(pool_size)
+        self.sessions = {}  # id of the raw connection -> its connection_id when it was last checked in
+        self.statement_caches = {}  # id of the raw connection -> its StatementCache
+        
+        # Counters for the status bar
+        self.checkouts = 0
+        self.waits = 0
+        self.reconnects = 0
+        self.in_use = 0
+    
+    def get_pool(self):
+        """Creates the underlying MySQLConnectionPool the first time it's needed"""
+        with self.lock:
+            if self.pool is None and self.connect is not None:
+                self.pool = LocalPool(self.connect, self.pool_size)
+            elif self.pool is None:
+                # Starts out empty - get_connection() opens connections as they're needed
+                self.pool = pooling.MySQLConnectionPool(
+                    pool_name=f"store_{id(self)}",
+                    pool_size=self.pool_size,
+                    pool_reset_session=False,  # we roll back open transactions ourselves in checkin
+                )
+                self.pool.set_config(**self.connect_args)  # only used to reconnect dropped connections
+            return self.pool
+    
+    def get_connection(self):
+        """An idle connection from the pool, or a new one if they're all in use and there's room for one more"""
+        pool = self.get_pool()
+        if self.connect is not None:
+            return pool.get_connection()
+        
+        # Taking from the queue under our lock means nobody takes the one we saw between looking and taking.
+        # MySQLConnectionPool has no public way to ask whether a connection is free without taking it.
+        with self.lock:
+            if not pool._cnx_queue.empty() or self.opened >= self.pool_size:
+                return pool.get_connection()
+            self.opened += 1
+        
+        try:
+            cnx = open_connection(self.connect_args, self.use_pure)
+        except Exception:
+            with self.lock:
+                self.opened -= 1
+            raise
+        self.use_pure = not uses_c_extension(cnx)  # no point trying the C extension again if it failed once
+        # get_connection() reconnects anything whose version doesn't match the pool's config,
+        # and there's no public way to tag a connection the pool didn't open itself
+        cnx.pool_config_version = pool._config_version
+        # Handed straight out - close() puts it in the pool's queue like the ones the pool opened itself
+        return pooling.PooledMySQLConnection(pool, cnx)
+    
+    def checkout(self):
+        """Gets a healthy connection, waiting for one to free up if they're all busy"""
+        if not self.available.acquire(blocking=False):
+            with self.lock:
+                self.waits += 1
+            if not self.available.acquire(timeout=self.checkout_timeout):
+                raise pooling.PoolError("Timed out waiting for a free connection")
+        
+        try:
+            conn = self.get_connection()
+        except Exception:
+            self.available.release()
+            raise
+        
+        with self.lock:
+            self.checkouts += 1
+            self.in_use += 1
+            # A new session id means the pool reconnected it on the way out (its StatementCache notices too)
+            session = self.sessions.get(id(conn._cnx))
+            if session is not None and session != getattr(conn, 'connection_id', None):
+                self.reconnects += 1
+        return conn
+    
+    def reconnect(self, conn):
+        conn.reconnect(attempts=3, delay=1)
+        with self.lock:
+            self.reconnects += 1
+            cache = self.statement_caches.get(id(conn._cnx))
+        if cache is not None:
+            cache.clear(close=False)  # prepared statements don't survive a new session
+    
+    def statements(self, conn):
+        """The StatementCache for a checked out connection - it stays with the connection between checkouts"""
+        with self.lock:
+            cache = self.statement_caches.get(id(conn._cnx))
+            if cache is None:
+                cache = self.statement_caches[id(conn._cnx)] = StatementCache(conn._cnx)
+            return cache
+    
+    def checkin(self, conn):
+        """Gives a connection back, cleaning up anything the last operation left behind"""
+        try:
+            # Leftover results or an open transaction would break the next user of this connection
+            conn.consume_results()
+            if conn.in_transaction:
+                conn.rollback()
+        except mysql.connector.Error:
+            # Broken connection - reconnect now so the next checkout gets a working one
+            try:
+                self.reconnect(conn)
+            except mysql.connector.Error:
+                pass  # get_connection() will try again next time
+        
+        self.sessions[id(conn._cnx)] = getattr(conn, 'connection_id', None)
+        try:
+            conn.close()  # returns it to the pool, doesn't actually disconnect
+        finally:
+            with self.lock:
+                self.in_use -= 1
+            self.available.release()
+    
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as conn: ... - always gives the connection back"""
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+    
+    @contextmanager
+    def cursor(self, **kwargs):
+        """with pool.cursor() as cursor: ... - a fresh cursor on its own connection"""
+        with self.connection() as conn:
+            cursor = conn.cursor(**kwargs)
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+    
+    def driver_text(self):
+        """How we talk to the server, e.g. 'C extension, compressed'"""
+        if self.connect is not None:
+            return "local file"
+        if self.use_pure is None:
+            driver = "not connected"
+        else:
+            driver = "pure Python" if self.use_pure else "C extension"
+        return driver + (", compressed" if self.connect_args.get('compress') else "")
+    
+    def stats_text(self):
+        """Short summary for the status bar"""
+        opened = f", {self.opened} open" if self.connect is None else ""
+        return (f"Pool {self.in_use}/{self.pool_size} in use{opened} | {self.driver_text()} | "
+                f"{self.checkouts:,} checkouts | {self.waits:,} waits | {self.reconnects:,} reconnects")
+    
+    def close(self):
+        """Disconnects all the idle connections (busy ones close when they come back)"""
+        with self.lock:
+            if self.pool is not None:
+                self.pool._remove_connections()
+                self.pool = None
+                self.opened = 0
+            self.statement_caches.clear()
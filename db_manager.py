@@ -8,23 +8,148 @@ Assignment 9
 March 28, 2025
 """
 
-import mysql.connector
+import bisect
+import collections
+import hashlib
+import os
+import queue
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox, simpledialog, filedialog
+
+from bulk_job import BulkJob, BulkStatement
+from column_profile import TableProfile
+from connection_pool import ConnectionPool
+from exporter import HAVE_PYARROW, Exporter
+from fk_lookup import ReferenceLookup, single_column_keys
+from importer import MODES, BulkImporter, converter_for
+from pending_changes import PendingChanges
+from query_profiler import QueryProfiler, analyze_plan_tree, json_plan_tree
+from query_worker import QueryCancelled, QueryJob, QueryWorker
+from result_cache import ResultCache
+from saved_connections import SavedConnections, keyring
+from schema_cache import SchemaCache, is_ddl
+from script_runner import split_statements
+from snapshot import Snapshot, SnapshotWriter
+from table_gateway import TableGateway
+from table_pager import FILTER_OPS, TablePager, scan_warnings
+from table_diff import TableDiff, other_connection
+from table_stats import StatsLoader, format_size
+from table_watcher import TableWatcher, WatchUnavailable
 
 class ClothingStoreDBApp:
-    def __init__(self, root):
+    def __init__(self, root, started=None):
         """Set up the main application window and database stuff"""
         self.root = root
         self.root.title("Clothing Store DB Manager")
         self.root.geometry("800x500")
+        self.started = started  # perf_counter from when main.py started, for the startup time in the status bar
         
         # Need these for database connection
-        self.conn = None  # will hold the active connection
-        self.cursor = None  # will be our cursor for executing commands
+        self.connect_args = None  # settings from the connection fields, set once connected
+        self.connect_started = None  # perf_counter from when Connect was pressed, until the first table is drawn
+        self.connect_elapsed = None  # seconds from Connect until the table list came back
+        self.saved_connections = SavedConnections().load()  # from ~/.dbms_interface/connections.json
+        self.snapshot = None  # the Snapshot we're browsing instead of a server, when working offline
+        self.pool = None  # ConnectionPool every query borrows a connection from
+        self.pool_size = 6  # enough for each tab plus the stats sidebar's counts
+        self.schema_cache = None  # table structures, loaded once when we connect
+        self.schema_ttl = 600  # seconds before a cached table structure is looked up again
+        self.lookups = None  # ReferenceLookup behind the foreign key fields in the Add/Edit forms
+        self.lookup_delay = 250  # ms of no typing before a foreign key field searches
+        
+        # Queries run on background workers so the window never freezes.
+        # One worker per tab means the Tables tab and SQL Query tab don't wait on each other.
+        self.results = queue.Queue()  # callbacks the workers want run on the Tk thread
+        self.table_worker = None
+        self.query_worker = None
+        self.bulk_worker = None  # imports and exports can take a while, so they get their own worker
+        self.bulk_job = None  # the chunked DELETE/UPDATE running on the bulk worker, if there is one
+        self.bulk_job_dir = os.path.join(os.path.expanduser("~"), ".dbms_interface", "bulk_jobs")  # checkpoints
+        self.async_backend = None  # event loop thread the Dashboard runs its panels on, started on first refresh
+        
+        # Table Stats sidebar - sizes and row estimates of every table, refreshed in the background
+        self.stats_loader = None  # StatsLoader, runs the refreshes and exact counts on threads of its own
+        self.table_stats = {}  # table name -> TableStats from the last refresh
+        self.stats_interval = 60  # seconds between refreshes
+        self.stats_timer = None  # root.after id of the next refresh
+        self.stats_count_parallel = 3  # exact counts run at once, each on its own pooled connection
+        self.stats_sort = ('name', False)  # (TableStats attribute, descending) from the header clicked
+        self.profile_sample_rows = 100_000  # tables much bigger than this get profiled from a sample
+        
+        # Paging state for the Tables tab - we only keep a window of rows in the treeview
+        self.pager = None  # TablePager for the table being viewed
+        self.page_size = 200  # rows fetched per query
+        self.window_pages = 3  # visible page plus a prefetch page on each side
+        self.window_rows = []  # the rows currently in the treeview, in order
+        self.window_start = 0  # position of the first window row in the whole table
+        self.at_end = False  # True once we've fetched the last page
+        self.page_loading = False  # stops scroll events from stacking up fetches
+        self.row_estimate = None  # rough row count from information_schema
+        self.next_iid = 0  # treeview item ids just keep counting up
+        self.pending = None  # PendingChanges - inline edits and deletes waiting for Apply
+        self.cell_editor = None  # Entry laid over a cell while it's being edited
+        self.checksum_chunk = 50  # rows per checksum when refreshing only what changed
+        self.range_checksums = {}  # (first key, last key) -> (count, checksum) from the last Refresh Changed
+        self.sort_column = None  # header the user clicked, None = primary key order
+        self.sort_descending = False
+        self.table_filters = []  # (column, op, value) from the filter bar, run on the server
+        
+        # Watch mode - the open table gets checked for new and changed rows every few seconds
+        self.watcher = None  # TableWatcher for the current pager
+        self.watch_timer = None  # root.after id of the next check
+        self.watch_highlight = {}  # key -> when its highlight wears off, for rows watch mode just brought in
+        self.watch_highlight_seconds = 10
+        
+        # SQL Query tab results are capped and drawn a slice at a time so a big SELECT can't freeze the window
+        self.query_job = None  # the running query, kept so Fetch More can resume it
+        self.query_fetch_size = 500  # rows per fetchmany
+        self.query_render_size = 200  # rows inserted into the treeview per tick
+        self.query_backlog = collections.deque()  # rows received but not drawn yet
+        self.query_rendering = False
+        self.query_render_time = 0.0  # time spent drawing the current result, not yet added to its stats
+        self.script_tabs = []  # extra result tabs from the last script run
+        self.max_script_tabs = 20  # result sets beyond this are only listed under Messages
+        
+        # Every statement the workers run gets timed - shown in the Performance tab
+        self.profiler = QueryProfiler()
+        self.render_stats = None  # stats of the result the GUI is drawing right now
+        self.perf_version = -1  # profiler version the Performance tab last showed
+        self.perf_refreshed = 0.0
+        
+        # Dashboard panels - (title, SQL), all refreshed at once on the async backend
+        self.dashboard_panels = []
+        self.dashboard_max_rows = 200
+        self.default_panels = [
+            ("Table sizes", "SELECT TABLE_NAME, TABLE_ROWS, ROUND((DATA_LENGTH + INDEX_LENGTH) / 1048576, 1) AS size_mb "
+                            "FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() "
+                            "ORDER BY DATA_LENGTH + INDEX_LENGTH DESC"),
+            ("Connections", "SELECT ID, USER, HOST, COMMAND, TIME, STATE FROM information_schema.PROCESSLIST "
+                            "WHERE DB = DATABASE() ORDER BY TIME DESC"),
+            ("Server status", "SHOW GLOBAL STATUS WHERE Variable_name IN ('Uptime', 'Threads_connected', "
+                              "'Threads_running', 'Questions', 'Slow_queries', 'Innodb_buffer_pool_reads')"),
+            ("Recently changed tables", "SELECT TABLE_NAME, UPDATE_TIME FROM information_schema.TABLES "
+                                        "WHERE TABLE_SCHEMA = DATABASE() AND UPDATE_TIME IS NOT NULL "
+                                        "ORDER BY UPDATE_TIME DESC LIMIT 10"),
+        ]
+        
+        # Pages already fetched, so going back to a table redraws without asking the server for it again
+        self.result_cache = ResultCache(max_bytes=64 * 1024 * 1024)
+        self.cache_path = os.path.join(os.path.expanduser("~"), ".dbms_interface", "result_cache.bin")
         
         # Build the GUI
         self.create_widgets()
+        
+        # A cache file from last time means the user asked to keep it
+        if os.path.exists(self.cache_path):
+            self.keep_cache_var.set(self.result_cache.load(self.cache_path))
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Start checking for results from the workers
+        self.root.after(50, self.poll_results)
+        
+        # Runs once the window has been drawn for the first time
+        self.root.after_idle(self.on_started)
     
     def create_widgets(self):
         """Create all the GUI elements - connection area, tabs, etc."""
@@ -59,10 +184,36 @@ class ClothingStoreDBApp:
         
         ttk.Button(button_frame, text="Connect", command=self.connect_db).pack(side=tk.LEFT, padx=5)
         
+        # Protocol compression - less to send over a slow link, a little more CPU on both ends
+        self.compress_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(button_frame, text="Compress", variable=self.compress_var).pack(side=tk.LEFT, padx=5)
+        
+        # Local copies of tables to browse and report on without touching the server
+        ttk.Button(button_frame, text="Take Snapshot...", command=self.take_snapshot).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Open Snapshot...", command=self.open_snapshot).pack(side=tk.LEFT, padx=5)
+        
         # Status indicator - turns green when connected
         self.conn_status = ttk.Label(button_frame, text="Not Connected", foreground="red")
         self.conn_status.pack(side=tk.LEFT, padx=20)
         
+        # Saved connections - picking one fills in the fields above
+        saved_frame = ttk.Frame(conn_frame)
+        saved_frame.grid(row=2, column=0, columnspan=10, pady=(0, 5))
+        
+        ttk.Label(saved_frame, text="Saved Connection:").pack(side=tk.LEFT, padx=5)
+        self.saved_var = tk.StringVar()
+        self.saved_list = ttk.Combobox(saved_frame, textvariable=self.saved_var, state="readonly", width=20,
+                                       values=self.saved_connections.names())
+        self.saved_list.pack(side=tk.LEFT, padx=5)
+        self.saved_list.bind("<<ComboboxSelected>>", lambda e: self.use_saved_connection(self.saved_var.get()))
+        ttk.Button(saved_frame, text="Save As...", command=self.save_connection).pack(side=tk.LEFT, padx=5)
+        ttk.Button(saved_frame, text="Delete", command=self.delete_saved_connection).pack(side=tk.LEFT, padx=5)
+        
+        # Opens in the background as soon as the app starts, so it's ready by the time you want it
+        self.startup_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(saved_frame, text="Connect at startup", variable=self.startup_var,
+                        command=self.set_startup_connection).pack(side=tk.LEFT, padx=5)
+        
         # Notebook with tabs for different functions
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(expand=True, fill=tk.BOTH, padx=10, pady=10)
@@ -77,10 +228,30 @@ class ClothingStoreDBApp:
         self.notebook.add(self.query_tab, text="SQL Query")
         self.setup_query_tab()
         
+        # Third tab - timings, slow queries and query plans
+        self.performance_tab = ttk.Frame(self.notebook)
+        self.notebook.add(self.performance_tab, text="Performance")
+        self.setup_performance_tab()
+        
+        # Fourth tab - several queries refreshed side by side
+        self.dashboard_tab = ttk.Frame(self.notebook)
+        self.notebook.add(self.dashboard_tab, text="Dashboard")
+        self.setup_dashboard_tab()
+        
         # Status bar at the bottom
+        status_frame = ttk.Frame(self.root)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        
         self.status_var = tk.StringVar(value="Ready")
-        status_bar = ttk.Label(self.root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
-        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        status_bar = ttk.Label(status_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
+        status_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        # Connection pool stats on the right side of the status bar
+        self.pool_stats_var = tk.StringVar(value="")
+        ttk.Label(status_frame, textvariable=self.pool_stats_var, relief=tk.SUNKEN, anchor=tk.E).pack(side=tk.RIGHT)
+        
+        # Imports and exports run in the background, this stops them
+        ttk.Button(status_frame, text="Stop Import/Export", command=lambda: self.cancel_worker(self.bulk_worker)).pack(side=tk.RIGHT)
     
     def setup_tables_tab(self):
         """Creates the table view tab with all the CRUD controls"""
@@ -98,28 +269,126 @@ class ClothingStoreDBApp:
         
         # CRUD operation buttons
         ttk.Button(left_panel, text="View Data", command=self.load_table_data).pack(fill=tk.X, pady=2)
+        ttk.Button(left_panel, text="Refresh", command=self.load_tables).pack(fill=tk.X, pady=2)
+        ttk.Button(left_panel, text="Refresh Changed", command=self.refresh_changed).pack(fill=tk.X, pady=2)
         ttk.Button(left_panel, text="Add Record", command=self.add_record).pack(fill=tk.X, pady=2)
         ttk.Button(left_panel, text="Edit Record", command=self.edit_record).pack(fill=tk.X, pady=2)
         ttk.Button(left_panel, text="Delete Record", command=self.delete_record).pack(fill=tk.X, pady=2)
+        ttk.Button(left_panel, text="Apply Changes", command=self.apply_changes).pack(fill=tk.X, pady=2)
+        ttk.Button(left_panel, text="Discard Changes", command=self.discard_changes).pack(fill=tk.X, pady=2)
+        ttk.Button(left_panel, text="Count Rows", command=self.count_rows).pack(fill=tk.X, pady=2)
+        ttk.Button(left_panel, text="Profile...", command=self.profile_table).pack(fill=tk.X, pady=2)
+        ttk.Button(left_panel, text="Export...", command=self.export_table).pack(fill=tk.X, pady=2)
+        ttk.Button(left_panel, text="Import...", command=self.import_file).pack(fill=tk.X, pady=2)
+        ttk.Button(left_panel, text="Compare...", command=self.compare_table).pack(fill=tk.X, pady=2)
+        ttk.Button(left_panel, text="Cancel", command=lambda: self.cancel_worker(self.table_worker)).pack(fill=tk.X, pady=2)
+        
+        # Saves the page cache to disk on exit so the next run starts with it
+        self.keep_cache_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(left_panel, text="Keep cache between runs", variable=self.keep_cache_var).pack(anchor=tk.W, pady=2)
+        
+        # Watch mode - patches new and changed rows into the view as they happen
+        watch_frame = ttk.Frame(left_panel)
+        watch_frame.pack(anchor=tk.W, pady=2)
+        self.watch_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(watch_frame, text="Watch every", variable=self.watch_var,
+                        command=self.toggle_watch).pack(side=tk.LEFT)
+        self.watch_interval_var = tk.StringVar(value="5")
+        ttk.Spinbox(watch_frame, from_=1, to=3600, textvariable=self.watch_interval_var, width=4).pack(side=tk.LEFT)
+        ttk.Label(watch_frame, text="s").pack(side=tk.LEFT)
+        self.watch_info_var = tk.StringVar(value="")
+        ttk.Label(left_panel, textvariable=self.watch_info_var, wraplength=150).pack(anchor=tk.W)
+        
+        # Shows which rows are loaded and about how many there are in total
+        self.row_info_var = tk.StringVar(value="")
+        ttk.Label(left_panel, textvariable=self.row_info_var, wraplength=150).pack(anchor=tk.W, pady=10)
+        
+        # How many inline edits/deletes haven't been sent yet
+        self.pending_var = tk.StringVar(value="")
+        ttk.Label(left_panel, textvariable=self.pending_var, wraplength=150).pack(anchor=tk.W)
+        
+        # Live progress of whatever the Tables tab is running
+        self.table_activity_var = tk.StringVar(value="")
+        ttk.Label(left_panel, textvariable=self.table_activity_var, wraplength=150).pack(anchor=tk.W)
+        
+        # Table Stats sidebar on the far right - every table's rows and size at a glance
+        stats_panel = ttk.LabelFrame(self.tables_tab, text="Table Stats")
+        stats_panel.pack(side=tk.RIGHT, fill=tk.Y, padx=5, pady=5)
+        
+        stats_frame = ttk.Frame(stats_panel)
+        stats_frame.pack(fill=tk.BOTH, expand=True)
+        self.stats_tree = ttk.Treeview(stats_frame, columns=('name', 'rows', 'size'), show='headings', height=10)
+        for column, text, width, attribute in (('name', "Table", 110, 'name'), ('rows', "Rows", 80, 'rows'),
+                                               ('size', "Size", 70, 'total_length')):
+            self.stats_tree.heading(column, text=text, anchor=tk.W,
+                                    command=lambda attribute=attribute: self.sort_table_stats(attribute))
+            self.stats_tree.column(column, width=width, anchor=tk.W if column == 'name' else tk.E)
+        stats_vsb = ttk.Scrollbar(stats_frame, orient="vertical", command=self.stats_tree.yview)
+        self.stats_tree.configure(yscrollcommand=stats_vsb.set)
+        self.stats_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        stats_vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        # Double click opens the table, selecting a row shows the rest of its numbers underneath
+        self.stats_tree.bind("<Double-1>", self.open_stats_table)
+        self.stats_tree.bind("<<TreeviewSelect>>", self.show_stats_detail)
+        
+        self.stats_detail_var = tk.StringVar(value="")
+        ttk.Label(stats_panel, textvariable=self.stats_detail_var, justify=tk.LEFT).pack(anchor=tk.W, pady=5)
+        ttk.Button(stats_panel, text="Count Selected", command=self.count_selected_tables).pack(fill=tk.X, pady=2)
+        ttk.Button(stats_panel, text="Refresh Stats", command=self.refresh_table_stats).pack(fill=tk.X, pady=2)
+        self.stats_info_var = tk.StringVar(value="")
+        ttk.Label(stats_panel, textvariable=self.stats_info_var, wraplength=250).pack(anchor=tk.W, pady=2)
         
         # Data display area on the right
         right_panel = ttk.Frame(self.tables_tab)
         right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5, pady=5)
         
+        # Filter bar - filters run on the server, one per column, and all of them have to match
+        filter_frame = ttk.Frame(right_panel)
+        filter_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(filter_frame, text="Filter:").pack(side=tk.LEFT)
+        self.filter_column_var = tk.StringVar()
+        self.filter_column_list = ttk.Combobox(filter_frame, textvariable=self.filter_column_var, state="readonly", width=15)
+        self.filter_column_list.pack(side=tk.LEFT, padx=2)
+        self.filter_op_var = tk.StringVar(value="=")
+        ttk.Combobox(filter_frame, textvariable=self.filter_op_var, values=list(FILTER_OPS), state="readonly",
+                     width=11).pack(side=tk.LEFT, padx=2)
+        self.filter_value_var = tk.StringVar()
+        filter_entry = ttk.Entry(filter_frame, textvariable=self.filter_value_var, width=20)
+        filter_entry.pack(side=tk.LEFT, padx=2)
+        filter_entry.bind("<Return>", self.add_filter)
+        ttk.Button(filter_frame, text="Filter", command=self.add_filter).pack(side=tk.LEFT, padx=2)
+        ttk.Button(filter_frame, text="Clear Filters", command=self.clear_filters).pack(side=tk.LEFT, padx=2)
+        
+        # Active filters/sort, and a warning when no index can help with them
+        self.view_info_var = tk.StringVar(value="")
+        ttk.Label(right_panel, textvariable=self.view_info_var).pack(anchor=tk.W)
+        self.scan_warning_var = tk.StringVar(value="")
+        ttk.Label(right_panel, textvariable=self.scan_warning_var, foreground="darkorange").pack(anchor=tk.W)
+        
         # Treeview for displaying table data with scrollbars
         tree_frame = ttk.Frame(right_panel)
         tree_frame.pack(fill=tk.BOTH, expand=True)
         
-        self.tree = ttk.Treeview(tree_frame)
+        self.tree = ttk.Treeview(tree_frame)  # ctrl/shift click selects several rows
+        
+        # Double click a cell to edit it in place, Delete key marks the selected rows for deletion.
+        # Neither touches the database until Apply Changes.
+        self.tree.bind("<Double-1>", self.start_cell_edit)
+        self.tree.bind("<Delete>", self.mark_rows_deleted)
+        self.tree.tag_configure('edited', background='#fff3b0')
+        self.tree.tag_configure('deleted', background='#f4b6b6')
+        self.tree.tag_configure('watched', background='#c8f0c8')  # just inserted or changed, seen by watch mode
         
         # Need both vertical and horizontal scrollbars for large datasets
-        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
+        self.tree_vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
         hsb = ttk.Scrollbar(tree_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        # Go through on_tree_scroll so we can fetch more pages as the user scrolls
+        self.tree.configure(yscrollcommand=self.on_tree_scroll, xscrollcommand=hsb.set)
         
         # Grid layout makes scrollbars work properly
         self.tree.grid(column=0, row=0, sticky='nsew')
-        vsb.grid(column=1, row=0, sticky='ns')
+        self.tree_vsb.grid(column=1, row=0, sticky='ns')
         hsb.grid(column=0, row=1, sticky='ew')
         
         # This makes the treeview resize with the window
@@ -136,496 +405,2982 @@ class ClothingStoreDBApp:
         self.query_text = tk.Text(input_frame, height=5, wrap=tk.WORD)
         self.query_text.pack(fill=tk.X, padx=5, pady=5)
         
-        # Execute button
-        ttk.Button(input_frame, text="Execute Query", command=self.execute_query).pack(anchor=tk.E, padx=5, pady=5)
+        # Execute and Cancel buttons, with live progress next to them
+        query_buttons = ttk.Frame(input_frame)
+        query_buttons.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Button(query_buttons, text="Execute Query", command=self.execute_query).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(query_buttons, text="Cancel", command=lambda: self.cancel_worker(self.query_worker)).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(query_buttons, text="Export Results...", command=self.export_query).pack(side=tk.RIGHT, padx=5)
+        self.fetch_more_button = ttk.Button(query_buttons, text="Fetch More", command=self.fetch_more_rows, state=tk.DISABLED)
+        self.fetch_more_button.pack(side=tk.RIGHT, padx=5)
+        
+        # Stops fetching after this many rows until Fetch More is pressed (0 = no limit)
+        self.query_limit_var = tk.StringVar(value="10000")
+        ttk.Spinbox(query_buttons, textvariable=self.query_limit_var, from_=0, to=10_000_000,
+                    increment=1000, width=8).pack(side=tk.RIGHT, padx=5)
+        ttk.Label(query_buttons, text="Row limit:").pack(side=tk.RIGHT)
+        
+        self.query_activity_var = tk.StringVar(value="")
+        ttk.Label(query_buttons, textvariable=self.query_activity_var).pack(side=tk.LEFT)
+        
+        # Time to first row and total fetch time of the last query
+        self.query_timing_var = tk.StringVar(value="")
+        ttk.Label(query_buttons, textvariable=self.query_timing_var).pack(side=tk.LEFT, padx=10)
+        
+        # Options for scripts with more than one statement
+        script_options = ttk.Frame(input_frame)
+        script_options.pack(fill=tk.X, padx=5)
+        self.script_transaction_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(script_options, text="Run script as one transaction",
+                        variable=self.script_transaction_var).pack(side=tk.LEFT)
+        self.stop_on_error_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(script_options, text="Stop on error", variable=self.stop_on_error_var).pack(side=tk.LEFT, padx=10)
+        # Big DELETEs and UPDATEs in small committed chunks, so they don't lock up the live tables
+        ttk.Button(script_options, text="Run as Bulk Job...", command=self.run_bulk_job).pack(side=tk.RIGHT, padx=5)
         
         # Bottom part for query results
         results_frame = ttk.LabelFrame(self.query_tab, text="Query Results")
         results_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        # Another treeview for displaying query results
-        tree_frame = ttk.Frame(results_frame)
-        tree_frame.pack(fill=tk.BOTH, expand=True)
+        # Results go in tabs - one for a single query, one per result set when running a script
+        self.results_notebook = ttk.Notebook(results_frame)
+        self.results_notebook.pack(fill=tk.BOTH, expand=True)
         
-        self.query_tree = ttk.Treeview(tree_frame)
+        tree_frame = ttk.Frame(self.results_notebook)
+        self.results_notebook.add(tree_frame, text="Result")
+        self.query_tree = self.make_result_tree(tree_frame)
+    
+    def make_result_tree(self, tree_frame):
+        """Treeview with both scrollbars filling tree_frame"""
+        tree = ttk.Treeview(tree_frame)
         
         # Scrollbars again
-        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=self.query_tree.yview)
-        hsb = ttk.Scrollbar(tree_frame, orient="horizontal", command=self.query_tree.xview)
-        self.query_tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        hsb = ttk.Scrollbar(tree_frame, orient="horizontal", command=tree.xview)
+        tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
         
         # Grid layout
-        self.query_tree.grid(column=0, row=0, sticky='nsew')
+        tree.grid(column=0, row=0, sticky='nsew')
         vsb.grid(column=1, row=0, sticky='ns')
         hsb.grid(column=0, row=1, sticky='ew')
         
         tree_frame.grid_columnconfigure(0, weight=1)
         tree_frame.grid_rowconfigure(0, weight=1)
+        return tree
+    
+    def setup_performance_tab(self):
+        """Creates the Performance tab - statement timings, the slow-query log and query plans"""
+        controls = ttk.Frame(self.performance_tab)
+        controls.pack(fill=tk.X, padx=5, pady=5)
+        
+        self.slow_only_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(controls, text="Slow queries only", variable=self.slow_only_var,
+                        command=self.refresh_performance).pack(side=tk.LEFT)
+        
+        # Anything slower than this (execute + fetch + render) goes into the slow-query log
+        ttk.Label(controls, text="Slow over (ms):").pack(side=tk.LEFT, padx=(10, 0))
+        self.slow_ms_var = tk.StringVar(value=str(int(self.profiler.slow_threshold * 1000)))
+        slow_entry = ttk.Entry(controls, textvariable=self.slow_ms_var, width=6)
+        slow_entry.pack(side=tk.LEFT, padx=5)
+        slow_entry.bind("<Return>", self.set_slow_threshold)
+        slow_entry.bind("<FocusOut>", self.set_slow_threshold)
+        
+        ttk.Button(controls, text="Export JSON...", command=self.export_performance_log).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(controls, text="Clear", command=self.clear_performance_log).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(controls, text="EXPLAIN ANALYZE", command=lambda: self.explain_query(analyze=True)).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(controls, text="EXPLAIN", command=self.explain_query).pack(side=tk.RIGHT, padx=5)
+        
+        panes = ttk.PanedWindow(self.performance_tab, orient=tk.VERTICAL)
+        panes.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # Statement log, newest first
+        log_frame = ttk.LabelFrame(panes, text="Statements")
+        columns = ("time", "source", "execute", "fetch", "render", "rows", "bytes", "statement")
+        self.perf_tree = ttk.Treeview(log_frame, columns=columns, show='headings')
+        headings = {"time": "Time", "source": "Source", "execute": "Execute ms", "fetch": "Fetch ms",
+                    "render": "Render ms", "rows": "Rows", "bytes": "~Bytes", "statement": "Statement"}
+        for col in columns:
+            self.perf_tree.heading(col, text=headings[col], anchor=tk.W)
+            self.perf_tree.column(col, width=80, anchor=tk.W, stretch=col == "statement")
+        self.perf_tree.column("statement", width=300)
+        self.perf_tree.tag_configure('slow', foreground='red')
+        perf_vsb = ttk.Scrollbar(log_frame, orient="vertical", command=self.perf_tree.yview)
+        self.perf_tree.configure(yscrollcommand=perf_vsb.set)
+        self.perf_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        perf_vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        panes.add(log_frame, weight=3)
+        
+        # Plan from the last EXPLAIN, as a tree
+        plan_frame = ttk.LabelFrame(panes, text="Query Plan")
+        self.plan_tree = ttk.Treeview(plan_frame, columns=("detail",))
+        self.plan_tree.heading('#0', text="Step", anchor=tk.W)
+        self.plan_tree.heading("detail", text="Details", anchor=tk.W)
+        self.plan_tree.column('#0', width=250)
+        self.plan_tree.column("detail", width=400)
+        plan_vsb = ttk.Scrollbar(plan_frame, orient="vertical", command=self.plan_tree.yview)
+        self.plan_tree.configure(yscrollcommand=plan_vsb.set)
+        self.plan_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        plan_vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        panes.add(plan_frame, weight=2)
+        
+        # The statements behind the log rows, for EXPLAIN on a selected one
+        self.perf_rows = {}
+    
+    def setup_dashboard_tab(self):
+        """Creates the Dashboard tab - a grid of small result panels that all refresh together"""
+        controls = ttk.Frame(self.dashboard_tab)
+        controls.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Button(controls, text="Refresh All", command=self.refresh_dashboard).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="Add SQL Tab Query as Panel...", command=self.add_dashboard_panel).pack(side=tk.LEFT, padx=5)
+        self.dashboard_info_var = tk.StringVar(value="")
+        ttk.Label(controls, textvariable=self.dashboard_info_var).pack(side=tk.LEFT, padx=10)
+        
+        self.dashboard_frame = ttk.Frame(self.dashboard_tab)
+        self.dashboard_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        for title, sql in self.default_panels:
+            self.make_dashboard_panel(title, sql)
+        self.layout_dashboard()
     
-    def connect_db(self):
-        """Tries to connect to the database with the given credentials"""
+    def make_dashboard_panel(self, title, sql):
+        frame = ttk.LabelFrame(self.dashboard_frame, text=title)
+        top = ttk.Frame(frame)
+        top.pack(fill=tk.X)
+        info_var = tk.StringVar(value="Not loaded")
+        ttk.Label(top, textvariable=info_var).pack(side=tk.LEFT, padx=5)
+        tree_frame = ttk.Frame(frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        panel = {'title': title, 'sql': sql, 'frame': frame, 'info_var': info_var,
+                 'tree': self.make_result_tree(tree_frame)}
+        ttk.Button(top, text="Remove", command=lambda: self.remove_dashboard_panel(panel)).pack(side=tk.RIGHT)
+        self.dashboard_panels.append(panel)
+        return panel
+    
+    def layout_dashboard(self):
+        """Two panels per row"""
+        for i, panel in enumerate(self.dashboard_panels):
+            panel['frame'].grid(row=i // 2, column=i % 2, sticky='nsew', padx=3, pady=3)
+        for col in range(2):
+            self.dashboard_frame.grid_columnconfigure(col, weight=1, uniform="panels")
+        rows = (len(self.dashboard_panels) + 1) // 2
+        for row in range(rows + 1):  # the extra one is the row a removed panel may have left behind
+            self.dashboard_frame.grid_rowconfigure(row, weight=1 if row < rows else 0)
+    
+    def poll_results(self):
+        """Runs any callbacks the background workers have queued up, then checks again shortly"""
         try:
-            # Close any existing connection first to avoid resource leaks
-            if self.conn:
-                self.cursor.close()
-                self.conn.close()
-            
+            while True:
+                callback, args = self.results.get_nowait()
+                try:
+                    callback(*args)
+                except tk.TclError:
+                    pass  # the widget went away (e.g. a dialog was closed) before the result came in
+        except queue.Empty:
+            pass
+        
+        self.update_activity()
+        self.pool_stats_var.set(f"{self.pool.stats_text()} | {self.result_cache.stats_text()}" if self.pool else "")
+        
+        # Redraw the statement log when something new came in, but not more than twice a second
+        if self.profiler.version != self.perf_version and time.perf_counter() - self.perf_refreshed > 0.5:
+            self.refresh_performance()
+        self.root.after(50, self.poll_results)
+    
+    def update_activity(self):
+        """Shows rows received and elapsed time for whatever each tab is running"""
+        for worker, var in ((self.table_worker, self.table_activity_var), (self.query_worker, self.query_activity_var)):
+            job = worker.current_job if worker else None
+            if job is None:
+                var.set("")
+            elif job.paused:
+                var.set(f"{job.description}... {job.rows_received:,} rows, waiting for Fetch More")
+            else:
+                var.set(f"{job.description}... {job.rows_received:,} rows, {job.elapsed:.1f}s")
+    
+    def run_job(self, worker, work, on_done, error_title, error_message, description, on_rows=None):
+        """Queues work(cursor, job) on a worker; errors get shown in a message box"""
+        def on_error(e):
+            if isinstance(e, QueryCancelled):
+                self.status_var.set(f"{description} cancelled")
+            else:
+                messagebox.showerror(error_title, f"{error_message}: {e}")
+        
+        job = QueryJob(work, None, on_error, None, description)
+        
+        # Note which result is being drawn so record_render can charge the time to it
+        def with_stats(callback):
+            def run(*args):
+                self.render_stats = job.stats
+                try:
+                    callback(*args)
+                finally:
+                    self.render_stats = None
+            return run
+        
+        job.on_done = with_stats(on_done)
+        job.on_rows = with_stats(on_rows) if on_rows else None
+        return worker.submit(job)
+    
+    def record_render(self, started):
+        """Adds the time since started to the render time of the result being drawn"""
+        if self.render_stats is not None:
+            self.profiler.add_render_time(self.render_stats, time.perf_counter() - started)
+    
+    def cancel_worker(self, worker):
+        """Cancel button - kills the running query on the server"""
+        if worker is not None and worker.busy:
+            worker.cancel()
+            self.status_var.set("Cancelling...")
+    
+    def stop_workers(self):
+        """Shuts down the background workers and the connection pool"""
+        self.stop_watch()
+        for worker in (self.table_worker, self.query_worker, self.bulk_worker):
+            if worker is not None:
+                worker.stop()
+        if self.async_backend is not None:
+            self.async_backend.stop()
+            self.async_backend = None
+        if self.stats_loader is not None:
+            self.stats_loader.stop()
+            self.stats_loader = None
+        if self.stats_timer is not None:
+            self.root.after_cancel(self.stats_timer)
+            self.stats_timer = None
+        self.table_worker = None
+        self.query_worker = None
+        self.bulk_worker = None
+        self.bulk_job = None  # its checkpoint is still on disk, to resume after reconnecting
+        self.connect_args = None
+        self.connect_started = None
+        self.connect_elapsed = None
+        self.snapshot = None
+        self.schema_cache = None
+        self.lookups = None
+        self.pending = None  # unapplied edits belong to the old connection
+        
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+    
+    def on_close(self):
+        """Window closed - saves the page cache if the user wants it kept, then shuts everything down"""
+        try:
+            if self.keep_cache_var.get():
+                self.result_cache.save(self.cache_path)
+            elif os.path.exists(self.cache_path):
+                self.result_cache.close()  # can't delete a file that's still mapped on Windows
+                os.remove(self.cache_path)
+        except OSError as e:
+            messagebox.showerror("Cache Error", f"Failed to save the page cache: {e}")
+        self.stop_workers()
+        self.root.destroy()
+    
+    def on_started(self):
+        """Window's up - shows how long that took, then opens the saved connection marked for startup"""
+        if self.started is not None:
+            self.status_var.set(f"Ready in {(time.perf_counter() - self.started) * 1000:.0f} ms")
+        
+        name = self.saved_connections.startup
+        if name is None:
+            return
+        self.use_saved_connection(name)
+        if self.saved_connections.password(name) is None:
+            self.status_var.set(f"{self.status_var.get()} | type the password for {name} and Connect")
+            return
+        self.connect_db(prewarm=True)
+    
+    def use_saved_connection(self, name):
+        """Fills the connection fields in from a saved connection"""
+        settings = self.saved_connections.get(name)
+        if settings is None:
+            return
+        self.saved_var.set(name)
+        self.host_var.set(settings['host'])
+        self.port_var.set(settings['port'])
+        self.user_var.set(settings['user'])
+        self.db_var.set(settings['database'])
+        self.compress_var.set(bool(settings['compress']))
+        self.password_var.set(self.saved_connections.password(name) or "")
+        self.startup_var.set(self.saved_connections.startup == name)
+    
+    def save_connection(self):
+        """Save As... - keeps the connection fields under a name, and the password too if there's a keyring"""
+        name = simpledialog.askstring("Save Connection", "Name for this connection:", parent=self.root,
+                                      initialvalue=self.saved_var.get() or f"{self.db_var.get()} on {self.host_var.get()}")
+        if not name:
+            return
+        settings = dict(host=self.host_var.get(), port=self.port_var.get(), user=self.user_var.get(),
+                        database=self.db_var.get(), compress=self.compress_var.get())
+        try:
+            kept_password = self.saved_connections.put(name, settings, self.password_var.get(), self.startup_var.get())
+        except OSError as e:
+            messagebox.showerror("Save Error", f"Failed to save the connection: {e}")
+            return
+        self.saved_list['values'] = self.saved_connections.names()
+        self.saved_var.set(name)
+        if keyring is None:
+            self.status_var.set(f"Saved {name} - without the password, install keyring to keep that too")
+        elif not kept_password:
+            self.status_var.set(f"Saved {name} - the keyring wouldn't take the password")
+        else:
+            self.status_var.set(f"Saved {name}")
+    
+    def delete_saved_connection(self):
+        name = self.saved_var.get()
+        if not name or not messagebox.askyesno("Delete Connection", f"Forget the saved connection {name}?"):
+            return
+        try:
+            self.saved_connections.remove(name)
+        except OSError as e:
+            messagebox.showerror("Save Error", f"Failed to delete the connection: {e}")
+            return
+        self.saved_list['values'] = self.saved_connections.names()
+        self.saved_var.set("")
+        self.startup_var.set(False)
+    
+    def set_startup_connection(self):
+        """Connect at startup checkbox - only one saved connection can have it"""
+        name = self.saved_var.get()
+        if not name:
+            self.startup_var.set(False)
+            messagebox.showinfo("Connect at Startup", "Save the connection first, then tick this.")
+            return
+        self.saved_connections.startup = name if self.startup_var.get() else None
+        try:
+            self.saved_connections.save()
+        except OSError as e:
+            messagebox.showerror("Save Error", f"Failed to save the connection: {e}")
+    
+    def connect_db(self, snapshot=None, prewarm=False):
+        """
+        Tries to connect to the database with the given credentials (in the background), or opens a snapshot.
+        prewarm is the saved connection opened at startup - same thing, just without the popup at the end.
+        """
+        # Close any existing connections first to avoid resource leaks
+        self.stop_workers()
+        self.connect_started = time.perf_counter()
+        
+        connect = None
+        if snapshot is None:
             # Get all the connection info from the input fields
-            host = self.host_var.get()
-            port = self.port_var.get()
-            user = self.user_var.get()
-            password = self.password_var.get()
             database = self.db_var.get()
-            
-            # Try to connect - this will throw an exception if it fails
-            self.conn = mysql.connector.connect(
-                host=host,
-                port=port,
-                user=user,
-                password=password,
+            connect_args = dict(
+                host=self.host_var.get(),
+                port=self.port_var.get(),
+                user=self.user_var.get(),
+                password=self.password_var.get(),
                 database=database
             )
+            if self.compress_var.get():
+                connect_args['compress'] = True
+        else:
+            # Nothing to log in to - the file stands in for the server
+            database = snapshot.database
+            connect_args = dict(host="snapshot", port=snapshot.path, user="", password="", database=database)
+            connect = snapshot.server.connect
+            self.snapshot = snapshot
+        
+        self.conn_status.config(text="Connecting...", foreground="orange")
+        self.status_var.set(f"Connecting to {database}...")
+        
+        # The pool actually connects on first use, which happens on the worker thread
+        self.pool = ConnectionPool(connect_args, pool_size=self.pool_size, connect=connect)
+        self.table_worker = QueryWorker("tables", self.pool, self.results, self.profiler)
+        self.query_worker = QueryWorker("query", self.pool, self.results, self.profiler)
+        self.bulk_worker = QueryWorker("bulk", self.pool, self.results, self.profiler)
+        self.stats_loader = StatsLoader(self.pool, self.results, self.profiler, self.stats_count_parallel)
+        schema_cache = self.schema_cache = SchemaCache(ttl=self.schema_ttl)
+        self.lookups = ReferenceLookup(schema_cache)
+        self.result_cache.scope = (connect_args['host'], connect_args['port'], database)
+        
+        profiler = self.profiler
+        
+        # Load the structure of every table up front - doubles as our connection test
+        def work(cursor, job):
+            # Everything up to here was opening the pool's connections - log that as its own entry
+            stats = profiler.start("Connecting", f"connect to {connect_args['host']}:{connect_args['port']}")
+            stats.execute_time = job.elapsed
+            profiler.add(stats)
+            gateway = TableGateway(job.conn, cursor, schema_cache)
+            return gateway.list_tables(reload=True), gateway.table_stats()
+        
+        def done(result):
+            tables, table_stats = result
+            self.connect_args = connect_args
             
-            self.cursor = self.conn.cursor()
+            # Put the table names in the dropdown, and their sizes in the sidebar
+            self.show_tables(tables)
+            self.show_table_stats(table_stats)
+            
+            if snapshot is not None:
+                self.conn_status.config(text="Snapshot (offline)", foreground="blue")
+                self.status_var.set(f"Browsing a snapshot of {snapshot.describe()}")
+                return
             
             # Update the UI to show we're connected
+            self.connect_elapsed = time.perf_counter() - self.connect_started
             self.conn_status.config(text="Connected", foreground="green")
-            self.status_var.set(f"Connected to {database}")
+            self.status_var.set(f"Connected to {database} in {self.connect_elapsed * 1000:.0f} ms "
+                                f"({self.pool.driver_text()})")
             
-            # Load table names into the dropdown
-            self.load_tables()
-            
-            messagebox.showinfo("Connection", "Successfully connected to the database!")
-            
-        except mysql.connector.Error as e:
+            if not prewarm:
+                messagebox.showinfo("Connection", "Successfully connected to the database!")
+        
+        def failed(e):
+            self.stop_workers()
+            self.conn_status.config(text="Connection Failed", foreground="red")
+            if isinstance(e, QueryCancelled):
+                self.status_var.set("Connection cancelled")
+                return
+            if prewarm:
+                # Nobody asked for this one just now, so no popup - Connect shows the error if it's tried again
+                self.status_var.set(f"Couldn't open {self.saved_var.get()} at startup: {e}")
+                return
             # Show a helpful error message if connection fails
             messagebox.showerror("Connection Error", f"Failed to connect: {e}")
-            self.conn_status.config(text="Connection Failed", foreground="red")
             self.status_var.set("Connection failed")
+        
+        self.table_worker.submit(QueryJob(work, done, failed, description="Connecting"))
     
-    def load_tables(self):
-        """Gets the list of tables from the database after connecting"""
-        if not self.conn:
-            messagebox.showwarning("No Connection", "Please connect to a database first.")
+    def take_snapshot(self):
+        """Copies the tables picked into a local file, to browse and report on offline"""
+        if not self.connect_args or self.snapshot is not None:
+            messagebox.showwarning("No Connection", "Please connect to a database first - snapshots are taken from a server.")
             return
         
-        try:
-            # SHOW TABLES is a MySQL command that lists all tables
-            self.cursor.execute("SHOW TABLES")
-            tables = [table[0] for table in self.cursor.fetchall()]
-            
-            # Put the table names in the dropdown
-            self.table_list['values'] = tables
-            if tables:
-                self.table_list.current(0)  # select the first one
-                self.load_table_data()  # and load its data
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Take Snapshot")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        ttk.Label(dialog, text="Tables to copy:").pack(anchor=tk.W, padx=10, pady=5)
+        tables = self.schema_cache.table_names()
+        listbox = tk.Listbox(dialog, selectmode=tk.EXTENDED, height=min(max(len(tables), 5), 15), exportselection=False)
+        for table in tables:
+            listbox.insert(tk.END, table)
+        listbox.select_set(0, tk.END)  # the whole database unless told otherwise
+        listbox.pack(fill=tk.BOTH, expand=True, padx=10)
+        
+        def start():
+            picked = [tables[i] for i in listbox.curselection()]
+            if not picked:
+                messagebox.showwarning("Take Snapshot", "Pick at least one table.", parent=dialog)
+                return
+            path = filedialog.asksaveasfilename(parent=dialog, title="Save Snapshot",
+                                                initialfile=f"{self.connect_args['database']}.snapshot.sqlite3",
+                                                defaultextension=".sqlite3", filetypes=[("Snapshot", "*.sqlite3")])
+            if not path:
+                return
+            dialog.destroy()
+            self.run_snapshot(picked, path)
         
-        except mysql.connector.Error as e:
-            messagebox.showerror("Error", f"Failed to load tables: {e}")
+        ttk.Button(dialog, text="Take Snapshot", command=start).pack(pady=10)
     
-    def load_table_data(self, event=None):
-        """Loads and displays data from the selected table"""
-        selected_table = self.table_var.get()
+    def run_snapshot(self, tables, path):
+        """Streams the tables into the snapshot file on the bulk worker"""
+        writer = SnapshotWriter(path)
+        schema_cache = self.schema_cache
+        source = f"{self.connect_args['host']}:{self.connect_args['port']}"
+        database = self.connect_args['database']
         
-        if not selected_table:
-            return
+        def work(cursor, job):
+            writer.on_progress = lambda w: job.post(self.status_var.set, f"Taking snapshot - {w.throughput_text()}")
+            schemas = [schema_cache.get(cursor, table) for table in tables]
+            return writer.take(cursor, schemas, source, database, job)
+        
+        def done(writer):
+            self.status_var.set(f"Snapshot saved to {path}: {writer.throughput_text()}")
+            if messagebox.askyesno("Snapshot", f"Copied {writer.rows:,} rows from {len(tables)} tables in "
+                                   f"{writer.elapsed:.1f}s.\n\nOpen the snapshot now? (This disconnects from the server.)"):
+                self.open_snapshot(path)
         
+        self.run_job(self.bulk_worker, work, done, "Snapshot Error", "Snapshot failed", "Taking snapshot")
+    
+    def open_snapshot(self, path=None):
+        """Browses a snapshot file in place of the server - everything reads from the file, nothing needs a connection"""
+        if path is None:
+            path = filedialog.askopenfilename(parent=self.root, title="Open Snapshot",
+                                              filetypes=[("Snapshot", "*.sqlite3"), ("All files", "*.*")])
+            if not path:
+                return
         try:
-            # First get the column names and types
-            self.cursor.execute(f"DESCRIBE {selected_table}")
-            columns = [column[0] for column in self.cursor.fetchall()]
-            
-            # Set up the treeview columns based on table structure
-            self.tree['columns'] = columns
-            self.tree.column('#0', width=0, stretch=tk.NO)  # hide the first column
-            
-            # Clear existing headings first
-            for col in self.tree['columns']:
-                self.tree.heading(col, text='')
-            
-            # Set up the headers
-            for col in columns:
-                self.tree.column(col, anchor=tk.W, width=100)
-                self.tree.heading(col, text=col, anchor=tk.W)
-            
-            # Get all the data with a simple SELECT *
-            self.cursor.execute(f"SELECT * FROM {selected_table}")
-            
-            # Clear any existing data
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-            
-            # Add all the rows to the treeview
-            for i, row in enumerate(self.cursor.fetchall()):
-                self.tree.insert('', 'end', iid=i, values=row)
-            
-            self.status_var.set(f"Loaded data from {selected_table}")
-            
-        except mysql.connector.Error as e:
-            messagebox.showerror("Error", f"Failed to load table data: {e}")
+            snapshot = Snapshot(path)
+        except (ValueError, OSError) as e:
+            messagebox.showerror("Snapshot Error", f"Failed to open the snapshot: {e}")
+            return
+        self.connect_db(snapshot)
     
-    def add_record(self):
-        """Creates and displays a form to add a new record to the current table"""
-        selected_table = self.table_var.get()
+    def load_tables(self):
+        """Reloads the list of tables and their structure (the Refresh button)"""
+        if not self.connect_args:
+            messagebox.showwarning("No Connection", "Please connect to a database first.")
+            return
         
-        if not selected_table or not self.conn:
-            messagebox.showwarning("Error", "Please select a table and ensure you're connected.")
+        schema_cache = self.schema_cache
+        self.result_cache.invalidate()  # Refresh means really go back to the server
+        self.lookups.clear()
+        
+        def work(cursor, job):
+            gateway = TableGateway(job.conn, cursor, schema_cache)
+            return gateway.list_tables(reload=True), gateway.table_stats()
+        
+        def done(result):
+            tables, table_stats = result
+            self.show_tables(tables)
+            self.show_table_stats(table_stats)
+        
+        self.run_job(self.table_worker, work, done, "Error", "Failed to load tables", "Loading tables")
+    
+    def show_tables(self, tables):
+        """Puts the table names in the dropdown and opens the current (or first) one"""
+        self.table_list['values'] = tables
+        if tables:
+            if self.table_var.get() not in tables:
+                self.table_list.current(0)  # select the first one
+            self.load_table_data()  # and load its data
+    
+    def with_schema(self, table, callback, error_message):
+        """
+        Calls callback(schema) with the table's structure.
+        Straight away if it's cached, otherwise after loading it on the worker.
+        """
+        schema = self.schema_cache.peek(table)
+        if schema is not None:
+            callback(schema)
             return
         
-        try:
-            # Need to know the table structure to create the right form fields
-            self.cursor.execute(f"DESCRIBE {selected_table}")
-            columns = self.cursor.fetchall()
-            
-            # Create a popup dialog for the new record form
-            dialog = tk.Toplevel(self.root)
-            dialog.title(f"Add Record to {selected_table}")
-            dialog.geometry("400x300")
-            dialog.transient(self.root)
-            dialog.grab_set()  # makes the dialog modal
-            
-            # If there are lots of fields, we need scrolling
-            canvas = tk.Canvas(dialog)
-            scrollbar = ttk.Scrollbar(dialog, orient="vertical", command=canvas.yview)
-            scrollable_frame = ttk.Frame(canvas)
-            
-            # This makes the scrolling work
-            scrollable_frame.bind(
-                "<Configure>",
-                lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-            )
-            
-            canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-            canvas.configure(yscrollcommand=scrollbar.set)
-            
-            canvas.pack(side="left", fill="both", expand=True, padx=5, pady=5)
-            scrollbar.pack(side="right", fill="y")
-            
-            # Create input fields for each column
-            entries = {}
-            for i, col in enumerate(columns):
-                col_name = col[0]
-                col_type = col[1]
-                is_auto = col[5] == 'auto_increment'  # skip auto_increment fields
-                is_required = col[2] == 'NO'  # mark required fields
-                
-                # Don't need to enter auto_increment fields - the DB handles those
-                if is_auto:
-                    continue
-                
-                # Show field info in the label
-                label_text = f"{col_name} ({col_type})"
-                if is_required:
-                    label_text += " *"  # asterisk for required fields
-                    
-                ttk.Label(scrollable_frame, text=label_text).grid(row=i, column=0, padx=10, pady=5, sticky=tk.W)
-                
-                # Create an entry field
-                entry_var = tk.StringVar()
-                ttk.Entry(scrollable_frame, textvariable=entry_var, width=30).grid(row=i, column=1, padx=10, pady=5)
-                
-                entries[col_name] = entry_var
-            
-            # Button frame at the bottom
-            button_frame = ttk.Frame(dialog)
-            button_frame.pack(side="bottom", fill="x", padx=10, pady=10)
-            
-            # Submit function for the add button
-            def submit():
-                # Get values from all fields
-                values = {col: var.get() for col, var in entries.items() if var.get() or var.get() == '0'}
-                
-                # Check that required fields are filled
-                missing_fields = []
-                for col in columns:
-                    col_name = col[0]
-                    is_required = col[2] == 'NO'
-                    is_auto = col[5] == 'auto_increment'
-                    
-                    if is_required and not is_auto and col_name in entries and not entries[col_name].get():
-                        missing_fields.append(col_name)
-                
-                if missing_fields:
-                    messagebox.showwarning("Required Fields", f"Please fill in required fields: {', '.join(missing_fields)}")
-                    return
-                
-                if not values:
-                    messagebox.showwarning("Empty Data", "Please enter data for at least one field.")
-                    return
-                
-                try:
-                    # Build the INSERT query - can't use string formatting for values due to SQL injection risk
-                    cols = list(values.keys())
-                    vals = list(values.values())
-                    placeholders = ["%s"] * len(vals)  # use parameterized query
-                    
-                    query = f"INSERT INTO {selected_table} ({', '.join(cols)}) VALUES ({', '.join(placeholders)})"
-                    
-                    # Execute and commit the insert
-                    self.cursor.execute(query, vals)
-                    self.conn.commit()
-                    
-                    messagebox.showinfo("Success", "Record added successfully!")
-                    dialog.destroy()
-                    
-                    # Refresh the table view
-                    self.load_table_data()
-                    
-                except mysql.connector.Error as e:
-                    messagebox.showerror("Error", f"Failed to add record: {e}")
-            
-            # Add the submit button
-            ttk.Button(button_frame, text="Add Record", command=submit).pack(pady=5)
-            
-        except mysql.connector.Error as e:
-            messagebox.showerror("Error", f"Failed to get table structure: {e}")
+        schema_cache = self.schema_cache
+        
+        def work(cursor, job):
+            return TableGateway(job.conn, cursor, schema_cache).describe(table)
+        
+        self.run_job(self.table_worker, work, callback, "Error", error_message, "Reading table structure")
     
-    def edit_record(self):
-        """Creates a form to edit the selected record"""
+    def load_table_data(self, event=None, start_key=None, filters=None):
+        """
+        Loads the first page of the selected table - the rest is fetched as you scroll.
+        start_key opens it at the row with that primary key instead, filters replaces the filter bar's.
+        """
         selected_table = self.table_var.get()
-        selected_items = self.tree.selection()
         
-        if not selected_table or not self.conn:
-            messagebox.showwarning("Error", "Please select a table and ensure you're connected.")
+        if not selected_table or not self.table_worker:
             return
         
-        if not selected_items:
-            messagebox.showwarning("No Selection", "Please select a record to edit.")
-            return
+        # Switching tables would leave unapplied edits behind
+        if self.pending and self.pending.table != selected_table:
+            if not messagebox.askyesno("Unapplied Changes",
+                                       f"Discard {len(self.pending)} unapplied changes to {self.pending.table}?"):
+                self.table_var.set(self.pending.table)
+                return
+            self.pending = None
         
-        try:
-            # Get the table structure
-            self.cursor.execute(f"DESCRIBE {selected_table}")
-            columns = self.cursor.fetchall()
-            
-            # Need to find the primary key to build the WHERE clause
-            primary_key = None
-            primary_key_index = -1
-            
-            for i, col in enumerate(columns):
-                if col[3] == 'PRI':  # PRI means primary key in DESCRIBE results
-                    primary_key = col[0]
-                    primary_key_index = i
-                    break
-            
-            if primary_key is None:
-                messagebox.showerror("Error", "Could not identify primary key for this table.")
-                return
-            
-            # Get the current values for the selected record
-            selected_values = self.tree.item(selected_items[0])['values']
-            primary_key_value = selected_values[primary_key_index]
-            
-            # Create dialog for the edit form
-            dialog = tk.Toplevel(self.root)
-            dialog.title(f"Edit Record in {selected_table}")
-            dialog.geometry("400x300")
-            dialog.transient(self.root)
-            dialog.grab_set()
-            
-            # Scrolling for lots of fields
-            canvas = tk.Canvas(dialog)
-            scrollbar = ttk.Scrollbar(dialog, orient="vertical", command=canvas.yview)
-            scrollable_frame = ttk.Frame(canvas)
-            
-            scrollable_frame.bind(
-                "<Configure>",
-                lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-            )
-            
-            canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-            canvas.configure(yscrollcommand=scrollbar.set)
-            
-            canvas.pack(side="left", fill="both", expand=True, padx=5, pady=5)
-            scrollbar.pack(side="right", fill="y")
-            
-            # Create fields with current values filled in
-            entries = {}
-            for i, col in enumerate(columns):
-                col_name = col[0]
-                col_type = col[1]
-                is_primary = col[3] == 'PRI'
-                is_required = col[2] == 'NO'
-                
-                # Label with extra info
-                label_text = f"{col_name} ({col_type})"
-                if is_primary:
-                    label_text += " [PK]"  # mark primary key
-                if is_required:
-                    label_text += " *"  # mark required fields
-                    
-                ttk.Label(scrollable_frame, text=label_text).grid(row=i, column=0, padx=10, pady=5, sticky=tk.W)
-                
-                # Fill with current value
-                current_value = str(selected_values[i]) if i < len(selected_values) else ""
-                entry_var = tk.StringVar(value=current_value)
-                entry = ttk.Entry(scrollable_frame, textvariable=entry_var, width=30)
-                entry.grid(row=i, column=1, padx=10, pady=5)
-                
-                # Can't edit primary key - would change record identity
-                if is_primary:
-                    entry.config(state='readonly')
-                
-                entries[col_name] = entry_var
+        self.close_cell_editor(save=False)
+        
+        # Filters and sort belong to the table they were set on
+        if self.pager is not None and self.pager.table != selected_table:
+            self.sort_column = None
+            self.sort_descending = False
+            self.table_filters = []
+        if start_key is not None or filters is not None:
+            self.sort_column = None
+            self.sort_descending = False
+            self.table_filters = list(filters or [])
+        
+        page_size = self.page_size
+        schema_cache = self.schema_cache
+        cache = self.result_cache
+        view = dict(sort_column=self.sort_column, descending=self.sort_descending, filters=list(self.table_filters))
+        
+        # Draw the cached first page straight away, then check on the worker that it's still current
+        shown = self.show_cached_page(selected_table) if start_key is None else None
+        
+        def work(cursor, job):
+            # Column names and primary key come from the schema cache - no DESCRIBE round trip
+            pager = TableGateway(job.conn, cursor, schema_cache).pager(selected_table, page_size, **view)
             
-            # Button frame
-            button_frame = ttk.Frame(dialog)
-            button_frame.pack(side="bottom", fill="x", padx=10, pady=10)
+            if start_key is not None:
+                rows = pager.fetch_from(cursor, start_key, cache)
+                job.rows_received = len(rows)
+                return pager, rows, pager.estimate_rows(cursor), pager.count_before(cursor, start_key)
             
-            # The update function for the submit button
-            def submit():
-                # Get all field values except primary key
-                values = {col: var.get() for col, var in entries.items() if col != primary_key}
-                
-                # Check required fields
-                missing_fields = []
-                for col in columns:
-                    col_name = col[0]
-                    is_required = col[2] == 'NO'
-                    is_primary = col[3] == 'PRI'
-                    
-                    if is_required and not is_primary and col_name in entries and not entries[col_name].get():
-                        missing_fields.append(col_name)
-                
-                if missing_fields:
-                    messagebox.showwarning("Required Fields", f"Please fill in required fields: {', '.join(missing_fields)}")
-                    return
-                
-                try:
-                    # Build the UPDATE query with SET clauses for each field
-                    set_clauses = []
-                    vals = []
-                    
-                    for col, var in entries.items():
-                        if col != primary_key:  # Skip primary key in SET clause
-                            set_clauses.append(f"{col} = %s")
-                            vals.append(var.get())
-                    
-                    vals.append(primary_key_value)  # For WHERE clause
-                    
-                    # UPDATE table SET col1 = val1, col2 = val2 WHERE primary_key = primary_key_value
-                    query = f"UPDATE {selected_table} SET {', '.join(set_clauses)} WHERE {primary_key} = %s"
-                    
-                    # Execute and commit
-                    self.cursor.execute(query, vals)
-                    self.conn.commit()
-                    
-                    messagebox.showinfo("Success", "Record updated successfully!")
-                    dialog.destroy()
-                    
-                    # Refresh the view
-                    self.load_table_data()
-                    
-                except mysql.connector.Error as e:
-                    messagebox.showerror("Error", f"Failed to update record: {e}")
+            # One small information_schema query says whether the cached pages are still good
+            if cache.validate(cursor, selected_table) and shown is not None:
+                return None, None, pager.estimate_rows(cursor)
             
-            # Add the submit button
-            ttk.Button(button_frame, text="Update Record", command=submit).pack(pady=5)
+            # Only grab the first page, not the whole table
+            rows = pager.fetch_first(cursor, cache)
+            job.rows_received = len(rows)
             
-        except mysql.connector.Error as e:
-            messagebox.showerror("Error", f"Failed to prepare edit form: {e}")
+            # Rough total from information_schema, COUNT(*) would scan the whole table
+            return pager, rows, pager.estimate_rows(cursor)
+        
+        def done(result):
+            if shown is not None and shown is not self.pager:
+                return  # user moved on while we were checking
+            if start_key is not None:
+                self.show_first_page(result[:3], window_start=result[3])
+                self.select_start_row(start_key)
+                return
+            if result[0] is None:
+                self.row_estimate = result[2]
+                self.update_row_info()
+                self.status_var.set(f"Loaded data from {selected_table} (cached)")
+            else:
+                self.show_first_page(result)
+            self.report_first_table(selected_table)
+        
+        self.run_job(self.table_worker, work, done, "Error", "Failed to load table data", f"Loading {selected_table}")
     
-    def delete_record(self):
-        """Deletes the selected record after confirmation"""
-        selected_table = self.table_var.get()
-        selected_items = self.tree.selection()
+    def report_first_table(self, table):
+        """The first table drawn after connecting - says how long Connect took to get there"""
+        if self.connect_started is None or self.connect_elapsed is None:
+            return
+        self.status_var.set(f"{self.status_var.get()} | connected in {self.connect_elapsed * 1000:.0f} ms, "
+                            f"{table} on screen {(time.perf_counter() - self.connect_started) * 1000:.0f} ms "
+                            f"after Connect ({self.pool.driver_text()})")
+        self.connect_started = None
+    
+    def show_cached_page(self, table):
+        """Shows the table's first page from the result cache if it's there - returns the pager, or None"""
+        schema = self.schema_cache.peek(table)
+        if schema is None:
+            return None
+        pager = TablePager(table, schema.column_names, schema.primary_key, self.page_size, self.sort_column,
+                           self.sort_descending, self.table_filters)
+        rows = self.result_cache.get(table, *pager.first_query())
+        if rows is None:
+            return None
+        self.show_first_page((pager, rows, self.row_estimate if self.pager and self.pager.table == table else None))
+        self.status_var.set(f"Loaded data from {table} (cached, checking for changes...)")
+        return pager
+    
+    def show_first_page(self, result, window_start=0):
+        """Sets up the treeview for a freshly loaded table - window_start is the first row's position"""
+        started = time.perf_counter()
+        self.pager, rows, self.row_estimate = result
+        columns = self.pager.columns
         
-        if not selected_table or not self.conn:
-            messagebox.showwarning("Error", "Please select a table and ensure you're connected.")
+        # Keep unapplied changes when reloading the same table, they get laid back over the rows
+        if self.pending is None or self.pending.table != self.pager.table:
+            self.pending = PendingChanges(self.pager.table, self.pager.key_columns) if self.pager.key_columns else None
+        self.update_pending_info()
+        
+        # Set up the treeview columns based on table structure
+        self.tree['columns'] = columns
+        self.tree.column('#0', width=0, stretch=tk.NO)  # hide the first column
+        
+        # Clear existing headings first
+        for col in self.tree['columns']:
+            self.tree.heading(col, text='')
+        
+        # Set up the headers - clicking one sorts by it (on the server)
+        for col in columns:
+            self.tree.column(col, anchor=tk.W, width=100)
+            text = col
+            if col == self.pager.sort_column:
+                text += " \u25bc" if self.pager.descending else " \u25b2"
+            self.tree.heading(col, text=text, anchor=tk.W, command=lambda c=col: self.sort_by(c))
+        self.filter_column_list['values'] = columns
+        if self.filter_column_var.get() not in columns:
+            self.filter_column_var.set(columns[0] if columns else "")
+        self.update_view_info()
+        
+        # Clear any existing data - one delete call is much faster than one per row
+        self.tree.delete(*self.tree.get_children())
+        self.window_rows = []
+        self.window_start = window_start
+        self.page_loading = False
+        self.range_checksums = {}
+        
+        self.at_end = len(rows) < self.page_size
+        self.append_rows(rows)
+        self.update_row_info()
+        self.record_render(started)
+        
+        self.status_var.set(f"Loaded data from {self.pager.table}")
+    
+    def select_start_row(self, key):
+        """Selects the row a table was opened at, or says it isn't there"""
+        items = self.tree.get_children()
+        if items and self.pager.row_key(self.window_rows[0]) == tuple(key):
+            self.tree.selection_set(items[0])
+            self.tree.see(items[0])
+            self.status_var.set(f"Opened {self.pager.table} at {', '.join(map(str, key))}")
+        else:
+            self.status_var.set(f"No row in {self.pager.table} has the key {', '.join(map(str, key))}")
+    
+    def append_rows(self, rows):
+        """Adds rows to the bottom of the treeview window"""
+        for row in rows:
+            values, tags = self.row_display(row)
+            self.tree.insert('', 'end', iid=self.next_iid, values=values, tags=tags)
+            self.next_iid += 1
+        self.window_rows.extend(rows)
+    
+    def prepend_rows(self, rows):
+        """Adds rows to the top of the treeview window (rows are in normal order)"""
+        for row in reversed(rows):
+            values, tags = self.row_display(row)
+            self.tree.insert('', 0, iid=self.next_iid, values=values, tags=tags)
+            self.next_iid += 1
+        self.window_rows[:0] = rows
+        self.window_start -= len(rows)
+    
+    def trim_window(self, from_top):
+        """Drops rows from one end so the treeview never holds more than a few pages"""
+        extra = len(self.window_rows) - self.page_size * self.window_pages
+        if extra <= 0:
             return
         
-        if not selected_items:
-            messagebox.showwarning("No Selection", "Please select a record to delete.")
+        items = self.tree.get_children()
+        if from_top:
+            self.tree.delete(*items[:extra])
+            del self.window_rows[:extra]
+            self.window_start += extra
+        else:
+            self.tree.delete(*items[-extra:])
+            del self.window_rows[-extra:]
+            self.at_end = False  # we just threw away the rows at the bottom
+    
+    def on_tree_scroll(self, first, last):
+        """Scrollbar callback - fetches the next/previous page when the user gets close to an edge"""
+        self.tree_vsb.set(first, last)
+        self.close_cell_editor()  # the cell it was covering just moved
+        
+        if self.pager is None or self.page_loading or not self.window_rows:
             return
         
-        try:
-            # Need to find the primary key for the WHERE clause
-            self.cursor.execute(f"DESCRIBE {selected_table}")
-            columns = self.cursor.fetchall()
-            
-            # Find the primary key
-            primary_key = None
-            primary_key_index = -1
-            
-            for i, col in enumerate(columns):
-                if col[3] == 'PRI':  # PRI means primary key
-                    primary_key = col[0]
-                    primary_key_index = i
-                    break
+        if float(last) > 0.9 and not self.at_end:
+            self.load_next_page()
+        elif float(first) < 0.1 and self.window_start > 0:
+            self.load_previous_page()
+    
+    def load_next_page(self):
+        """Fetches the page after the window and drops rows off the top if needed"""
+        pager = self.pager
+        last_row = self.window_rows[-1]
+        offset = self.window_start + len(self.window_rows)
+        cache = self.result_cache
+        
+        def work(cursor, job):
+            return pager.fetch_after(cursor, last_row, offset, cache)
+        
+        def done(rows):
+            self.page_loading = False
+            if pager is not self.pager:
+                return  # user switched tables while this was loading
             
-            if primary_key is None:
-                messagebox.showerror("Error", "Could not identify primary key for this table.")
+            self.at_end = len(rows) < self.page_size
+            started = time.perf_counter()
+            anchor = self.tree.identify_row(1)  # the row at the top of the view right now
+            self.append_rows(rows)
+            self.trim_window(from_top=True)
+            self.keep_view_on(anchor)
+            self.update_row_info()
+            self.record_render(started)
+        
+        self.page_loading = True
+        job = self.run_job(self.table_worker, work, done, "Error", "Failed to load more rows", "Loading rows")
+        self.clear_page_loading_on_error(job)
+    
+    def load_previous_page(self):
+        """Fetches the page before the window and drops rows off the bottom if needed"""
+        pager = self.pager
+        first_row = self.window_rows[0]
+        offset = self.window_start
+        cache = self.result_cache
+        
+        def work(cursor, job):
+            return pager.fetch_before(cursor, first_row, offset, cache)
+        
+        def done(rows):
+            self.page_loading = False
+            if pager is not self.pager:
                 return
             
-            # Get the primary key value for the selected record
-            selected_values = self.tree.item(selected_items[0])['values']
-            primary_key_value = selected_values[primary_key_index]
-            
-            # Always confirm before deleting! Too easy to delete wrong record
-            if not messagebox.askyesno("Confirm", f"Delete record with {primary_key}={primary_key_value}?"):
+            if not rows:
+                # Rows got deleted above us, so we're really at the start
+                self.window_start = 0
                 return
             
-            # DELETE FROM table WHERE primary_key = value
-            self.cursor.execute(f"DELETE FROM {selected_table} WHERE {primary_key} = %s", (primary_key_value,))
-            self.conn.commit()
-            
-            messagebox.showinfo("Success", "Record deleted successfully!")
-            
-            # Refresh the view
-            self.load_table_data()
-            
-        except mysql.connector.Error as e:
-            messagebox.showerror("Error", f"Failed to delete record: {e}")
+            started = time.perf_counter()
+            anchor = self.tree.identify_row(1)
+            self.prepend_rows(rows)
+            self.window_start = max(self.window_start, 0)
+            self.trim_window(from_top=False)
+            self.keep_view_on(anchor)
+            self.update_row_info()
+            self.record_render(started)
+        
+        self.page_loading = True
+        job = self.run_job(self.table_worker, work, done, "Error", "Failed to load more rows", "Loading rows")
+        self.clear_page_loading_on_error(job)
+    
+    def clear_page_loading_on_error(self, job):
+        """Makes sure a failed page fetch doesn't block scrolling forever"""
+        show_error = job.on_error
+        
+        def on_error(e):
+            self.page_loading = False
+            show_error(e)
+        
+        job.on_error = on_error
+    
+    def keep_view_on(self, item):
+        """Scrolls so the given row stays at the top after rows were added or removed above it"""
+        items = self.tree.get_children()
+        if item and self.tree.exists(item) and items:
+            self.tree.yview_moveto(self.tree.index(item) / len(items))
+    
+    def update_row_info(self):
+        """Updates the 'Rows x-y of ~z' label"""
+        if not self.window_rows:
+            self.row_info_var.set("No rows")
+            return
+        
+        text = f"Rows {self.window_start + 1:,}-{self.window_start + len(self.window_rows):,}"
+        if self.at_end:
+            # We've seen the last row so we actually know the total
+            text += f" of {self.window_start + len(self.window_rows):,}"
+        elif self.row_estimate is not None:
+            text += f" of ~{self.row_estimate:,}"
+        self.row_info_var.set(text)
+    
+    def update_view_info(self):
+        """Shows the active filters and sort, and warns when they'll need a full table scan"""
+        pager = self.pager
+        parts = []
+        for col, op, value in pager.filters:
+            parts.append(f"{col} {op}" if value is None else f"{col} {op} {value!r}")
+        text = "Filtered: " + ", ".join(parts) if parts else ""
+        if pager.sort_column:
+            text += ("  |  " if text else "") + f"Sorted by {pager.sort_column}" + (" (descending)" if pager.descending else "")
+        self.view_info_var.set(text)
+        
+        schema = self.schema_cache.peek(pager.table) if self.schema_cache else None
+        warnings = scan_warnings(schema.indexes, pager.filters, pager.sort_column) if schema else []
+        self.scan_warning_var.set("\n".join(warnings))
+    
+    def sort_by(self, column):
+        """Header click - sorts on the server: ascending, then descending, then back to primary key order"""
+        if self.pager is None:
+            return
+        if self.sort_column != column:
+            self.sort_column, self.sort_descending = column, False
+        elif not self.sort_descending:
+            self.sort_descending = True
+        else:
+            self.sort_column, self.sort_descending = None, False
+        self.load_table_data()
+    
+    def add_filter(self, event=None):
+        """Adds (or replaces) the filter on one column and reloads the view from the server"""
+        column = self.filter_column_var.get()
+        op = self.filter_op_var.get()
+        text = self.filter_value_var.get()
+        if self.pager is None or not column:
+            messagebox.showwarning("Filter", "Please load a table first.")
+            return
+        
+        value = None
+        if op in ('starts with', 'contains'):
+            value = text
+        elif op not in ('is null', 'is not null'):
+            # Compare against the column's own type so the server can use its index
+            schema = self.schema_cache.peek(self.pager.table) if self.schema_cache else None
+            col_type = next((col[1] for col in schema.columns if col[0] == column), "text") if schema else "text"
+            try:
+                value = converter_for(col_type)(text)
+            except (ValueError, ArithmeticError):
+                messagebox.showerror("Filter", f"{text!r} isn't a valid {col_type}")
+                return
+        
+        self.table_filters = [f for f in self.table_filters if f[0] != column] + [(column, op, value)]
+        self.load_table_data()
+    
+    def clear_filters(self):
+        if not self.table_filters:
+            return
+        self.table_filters = []
+        self.load_table_data()
+    
+    def count_rows(self):
+        """Runs an exact COUNT(*) for the current table - only when the user asks since it can be slow"""
+        if self.pager is None or not self.connect_args:
+            messagebox.showwarning("Error", "Please select a table and ensure you're connected.")
+            return
+        
+        pager = self.pager
+        
+        def work(cursor, job):
+            return pager.exact_count(cursor)
+        
+        def done(total):
+            if pager is self.pager:
+                self.row_estimate = total
+                self.update_row_info()
+            if not pager.filters:
+                self.record_exact_count(pager.table, total)
+            self.status_var.set(f"{pager.table} has exactly {total:,} rows")
+        
+        self.run_job(self.table_worker, work, done, "Error", "Failed to count rows", f"Counting {pager.table}")
+    
+    def profile_table(self):
+        """Opens the Profile window for the current table - null rates, distinct counts, ranges and top values"""
+        selected_table = self.table_var.get()
+        
+        if not selected_table or not self.connect_args:
+            messagebox.showwarning("Error", "Please select a table and ensure you're connected.")
+            return
+        
+        self.with_schema(selected_table, self.show_profile_window, "Failed to get table structure")
+    
+    def show_profile_window(self, schema):
+        """One row per column - shows the cached profile straight away if there is one"""
+        window = tk.Toplevel(self.root)
+        window.title(f"Profile of {schema.name}")
+        window.geometry("950x400")
+        
+        controls = ttk.Frame(window)
+        controls.pack(fill=tk.X, padx=10, pady=5)
+        info_var = tk.StringVar(value="")
+        ttk.Label(controls, textvariable=info_var).pack(side=tk.LEFT)
+        sample_var = tk.BooleanVar(value=True)
+        ttk.Button(controls, text="Profile Again",
+                   command=lambda: self.run_profile(schema, sample_var.get(), draw)).pack(side=tk.RIGHT, padx=5)
+        ttk.Checkbutton(controls, text=f"Sample tables over {self.profile_sample_rows * 2:,} rows",
+                        variable=sample_var).pack(side=tk.RIGHT, padx=5)
+        
+        tree_frame = ttk.Frame(window)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        headings = (("column", "Column", 120), ("type", "Type", 100), ("nulls", "Nulls", 90), ("distinct", "Distinct", 80),
+                    ("min", "Min", 110), ("max", "Max", 110), ("average", "Avg / Avg Length", 100),
+                    ("top", "Most Common", 250))
+        tree = ttk.Treeview(tree_frame, columns=[name for name, _, _ in headings], show='headings')
+        for name, text, width in headings:
+            tree.heading(name, text=text)
+            tree.column(name, width=width)
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(fill=tk.BOTH, expand=True)
+        
+        def draw(profile):
+            if not window.winfo_exists():
+                return
+            info_var.set(profile.describe())
+            tree.delete(*tree.get_children())
+            for col in profile.columns:
+                if col.non_null is None:
+                    tree.insert('', 'end', values=(col.name, col.col_type))
+                    continue
+                nulls = profile.rows - col.non_null
+                top = ", ".join(f"{value} ({rows:,})" for value, rows in col.top or ())
+                if col.wants_top_values and col.top is None:
+                    top = "..."  # its query is still running
+                tree.insert('', 'end', values=(
+                    col.name, col.col_type, f"{nulls:,} ({nulls / profile.rows:.1%})" if profile.rows else "0",
+                    "" if col.distinct is None else f"{col.distinct:,}",
+                    "" if col.minimum is None else col.minimum, "" if col.maximum is None else col.maximum,
+                    "" if col.average is None else f"{float(col.average):,.2f}", top
+                ))
+        
+        if schema.profile is not None:
+            draw(schema.profile)
+        else:
+            self.run_profile(schema, sample_var.get(), draw)
+    
+    def run_profile(self, schema, sample, draw):
+        """
+        Combined aggregate query first, then a most-common-values query for each column with repeats -
+        all on the stats loader's threads, so the column queries run side by side on separate connections.
+        """
+        stats = self.table_stats.get(schema.name)
+        profile = TableProfile(schema, stats.rows if stats else None, self.profile_sample_rows if sample else None)
+        table = schema.name
+        waiting = []  # columns whose most common values haven't come back yet
+        
+        def failed(e):
+            self.status_var.set(f"Profiling {table} failed")
+            messagebox.showerror("Profile Error", f"Failed to profile {table}: {e}")
+        
+        def column_done(col):
+            waiting.remove(col)
+            if not waiting:
+                profile.finished()
+                self.status_var.set(f"Profiled {table}: {profile.describe()}")
+            draw(profile)
+        
+        def column_failed(col, e):
+            col.top = []  # show it as having none rather than waiting forever
+            column_done(col)
+        
+        def done(profile):
+            # Kept with the cached structure, so opening the window again doesn't go back to the server
+            schema.profile = profile
+            waiting.extend(col for col in profile.columns if col.wants_top_values)
+            if not waiting:
+                profile.finished()
+                self.status_var.set(f"Profiled {table}: {profile.describe()}")
+            for col in list(waiting):
+                self.stats_loader.submit(f"Profiling {table}.{col.name}",
+                                         lambda cursor, col=col: profile.top_values(cursor, col),
+                                         column_done, lambda e, col=col: column_failed(col, e))
+            draw(profile)
+        
+        self.status_var.set(f"Profiling {table}...")
+        self.stats_loader.submit(f"Profiling {table}", profile.aggregate, done, failed)
+    
+    def schedule_stats_refresh(self):
+        """Sets up the next background refresh of the Table Stats sidebar"""
+        if self.stats_timer is not None:
+            self.root.after_cancel(self.stats_timer)
+        self.stats_timer = self.root.after(self.stats_interval * 1000, self.refresh_table_stats)
+    
+    def refresh_table_stats(self):
+        """Reloads the sidebar in the background - one information_schema query covers every table"""
+        loader = self.stats_loader
+        if loader is None:
+            return
+        if self.stats_timer is not None:
+            self.root.after_cancel(self.stats_timer)
+            self.stats_timer = None
+        
+        def done(table_stats):
+            if loader is self.stats_loader:
+                self.show_table_stats(table_stats)
+        
+        def failed(e):
+            if loader is self.stats_loader:
+                # Not worth a message box every minute - say so in the sidebar and try again next time
+                self.stats_info_var.set(f"Couldn't refresh: {e}")
+                self.schedule_stats_refresh()
+        
+        loader.refresh(done, failed)
+    
+    def show_table_stats(self, table_stats):
+        """Fills the sidebar, keeping exact counts of tables that haven't changed since they were counted"""
+        for name, stats in table_stats.items():
+            stats.keep_count(self.table_stats.get(name))
+        self.table_stats = table_stats
+        self.draw_table_stats()
+        total = sum(stats.total_length for stats in table_stats.values())
+        self.stats_info_var.set(f"{len(table_stats)} tables, {format_size(total)} - as of {time.strftime('%H:%M:%S')}")
+        self.schedule_stats_refresh()
+    
+    def draw_table_stats(self):
+        """Redraws the sidebar in the current sort order, keeping the selection"""
+        selected = self.stats_tree.selection()
+        self.stats_tree.delete(*self.stats_tree.get_children())
+        
+        attribute, descending = self.stats_sort
+        
+        def sort_value(stats):
+            if attribute == 'rows' and stats.exact_rows is not None:
+                return (True, stats.exact_rows)
+            value = getattr(stats, attribute)
+            return (value is not None, value)  # tables the server has no number for go together
+        
+        for stats in sorted(self.table_stats.values(), key=sort_value, reverse=descending):
+            size = format_size(stats.total_length) if stats.data_length is not None else ""
+            self.stats_tree.insert('', 'end', iid=stats.name, values=(stats.name, stats.row_text(), size))
+        self.stats_tree.selection_set([item for item in selected if self.stats_tree.exists(item)])
+        self.show_stats_detail()
+    
+    def sort_table_stats(self, attribute):
+        """Header click - the same header again flips the order. Numbers start biggest first"""
+        current, descending = self.stats_sort
+        self.stats_sort = (attribute, not descending if attribute == current else attribute != 'name')
+        self.draw_table_stats()
+    
+    def show_stats_detail(self, event=None):
+        """Everything we know about the table selected in the sidebar"""
+        selection = self.stats_tree.selection()
+        stats = self.table_stats.get(selection[0]) if len(selection) == 1 else None
+        if stats is None:
+            self.stats_detail_var.set(f"{len(selection)} tables selected" if selection else "")
+            return
+        
+        lines = [f"Engine: {stats.engine or 'unknown'}",
+                 f"Estimated rows: {'unknown' if stats.rows is None else f'{stats.rows:,}'}"]
+        if stats.exact_rows is not None:
+            took = f" (counted in {stats.counted_in:.2f}s)" if stats.counted_in is not None else ""
+            lines.append(f"Exact rows: {stats.exact_rows:,}{took}")
+        lines.append(f"Data: {format_size(stats.data_length) or 'unknown'}, "
+                     f"indexes: {format_size(stats.index_length) or 'unknown'}")
+        lines.append(f"Avg row: {format_size(stats.avg_row_length) or 'unknown'}")
+        lines.append(f"Last update: {stats.update_time or 'unknown'}")
+        self.stats_detail_var.set("\n".join(lines))
+    
+    def open_stats_table(self, event):
+        """Double click in the sidebar - views that table"""
+        table = self.stats_tree.identify_row(event.y)
+        if table:
+            self.table_var.set(table)
+            self.load_table_data()
+    
+    def count_selected_tables(self):
+        """Exact COUNT(*) of the tables selected in the sidebar, several at once on their own connections"""
+        if self.stats_loader is None:
+            messagebox.showwarning("No Connection", "Please connect to a database first.")
+            return
+        tables = list(self.stats_tree.selection())
+        if not tables:
+            messagebox.showwarning("Count Selected", "Select one or more tables in Table Stats first.")
+            return
+        
+        loader = self.stats_loader
+        for table in tables:
+            self.stats_tree.set(table, 'rows', "counting...")
+        
+        def counted(table, total, seconds):
+            if loader is self.stats_loader:
+                self.record_exact_count(table, total, seconds)
+        
+        def failed(table, e):
+            if loader is not self.stats_loader:
+                return
+            if table in self.table_stats and self.stats_tree.exists(table):
+                self.stats_tree.set(table, 'rows', self.table_stats[table].row_text())
+            self.stats_info_var.set(f"Failed to count {table}: {e}")
+        
+        loader.count(tables, counted, failed)
+    
+    def record_exact_count(self, table, total, seconds=None):
+        """Shows a table's exact row count in the sidebar, and in the row info if it's the table being viewed"""
+        stats = self.table_stats.get(table)
+        if stats is not None:
+            stats.exact_rows = total
+            stats.counted_in = seconds
+            if self.stats_tree.exists(table):
+                self.stats_tree.set(table, 'rows', stats.row_text())
+            self.show_stats_detail()
+        
+        pager = self.pager
+        if pager is not None and pager.table == table and not pager.filters and self.row_estimate != total:
+            self.row_estimate = total
+            self.update_row_info()
+    
+    def row_display(self, row):
+        """Values and tags to show for a row, with any unapplied change laid over it"""
+        if not self.pending and not self.watch_highlight:
+            return row, ()
+        key = self.pager.row_key(row)
+        if self.pending:
+            if key in self.pending.deletes:
+                return row, ('deleted',)
+            edits = self.pending.updates.get(key)
+            if edits:
+                return [edits.get(col, value) for col, value in zip(self.pager.columns, row)], ('edited',)
+        if key in self.watch_highlight:
+            return row, ('watched',)
+        return row, ()
+    
+    def selected_rows(self):
+        """The window rows behind the selected items - real values, not the strings the treeview shows"""
+        return [self.window_rows[self.tree.index(item)] for item in self.tree.selection()]
+    
+    def update_pending_info(self):
+        count = len(self.pending) if self.pending else 0
+        self.pending_var.set(f"{count:,} unapplied changes" if count else "")
+    
+    def start_cell_edit(self, event):
+        """Double click - puts an Entry over the cell so it can be edited in place"""
+        self.close_cell_editor()
+        if self.tree.identify_region(event.x, event.y) != 'cell':
+            return
+        if not self.pending:
+            if self.pager is not None and not self.pager.key_columns:
+                self.status_var.set("Inline editing needs a primary key - use Edit Record instead")
+            return
+        
+        item = self.tree.identify_row(event.y)
+        column = self.tree.identify_column(event.x)  # '#1', '#2', ...
+        col_name = self.pager.columns[int(column[1:]) - 1]
+        if col_name in self.pager.key_columns:
+            self.status_var.set("Primary key columns can't be edited")
+            return
+        
+        row = self.window_rows[self.tree.index(item)]
+        if self.pager.row_key(row) in self.pending.deletes:
+            return
+        
+        x, y, width, height = self.tree.bbox(item, column)
+        entry = ttk.Entry(self.tree)
+        entry.place(x=x, y=y, width=width, height=height)
+        entry.insert(0, self.tree.set(item, col_name))
+        entry.select_range(0, tk.END)
+        entry.focus_set()
+        
+        entry.bind("<Return>", lambda e: self.close_cell_editor())
+        entry.bind("<Escape>", lambda e: self.close_cell_editor(save=False))
+        entry.bind("<FocusOut>", lambda e: self.close_cell_editor())
+        self.cell_editor = (entry, item, col_name)
+    
+    def close_cell_editor(self, save=True):
+        """Removes the cell Entry, putting what was typed into the pending changes"""
+        if self.cell_editor is None:
+            return
+        entry, item, col_name = self.cell_editor
+        self.cell_editor = None
+        text = entry.get()
+        entry.destroy()
+        
+        if not save or not self.tree.exists(item) or text == self.tree.set(item, col_name):
+            return
+        
+        # Empty means NULL if the column allows it, same as the importer
+        schema = self.schema_cache.peek(self.pager.table) if self.schema_cache else None
+        nullable = schema is not None and dict((col[0], col[2]) for col in schema.columns).get(col_name) == 'YES'
+        value = None if text == '' and nullable else text
+        
+        row = self.window_rows[self.tree.index(item)]
+        self.pending.set_value(self.pager.row_key(row), col_name, value)
+        values, tags = self.row_display(row)
+        self.tree.item(item, values=values, tags=tags)
+        self.update_pending_info()
+    
+    def mark_rows_deleted(self, event=None):
+        """Delete key - marks the selected rows for deletion on the next Apply"""
+        if not self.pending:
+            return
+        for item in self.tree.selection():
+            row = self.window_rows[self.tree.index(item)]
+            self.pending.delete(self.pager.row_key(row))
+            self.tree.item(item, values=row, tags=('deleted',))
+        self.update_pending_info()
+    
+    def discard_changes(self):
+        """Throws away unapplied changes and puts the original values back"""
+        if not self.pending:
+            return
+        self.close_cell_editor(save=False)
+        self.pending.discard()
+        for item, row in zip(self.tree.get_children(), self.window_rows):
+            self.tree.item(item, values=row, tags=())
+        self.update_pending_info()
+        self.status_var.set("Discarded unapplied changes")
+    
+    def apply_changes(self, changes=None, dialog=None):
+        """
+        Sends a batch of changes in one transaction - the pending inline edits by default.
+        Only the rows that changed get patched in the treeview afterwards, no reload.
+        """
+        self.close_cell_editor()
+        from_pending = changes is None
+        if from_pending:
+            if not self.pending:
+                self.status_var.set("No changes to apply")
+                return
+            changes = self.pending.copy()  # keep editing while this runs
+        
+        pager = self.written_pager(changes.table)
+        schema_cache = self.schema_cache
+        
+        def work(cursor, job):
+            affected = TableGateway(job.conn, cursor, schema_cache, job.statements).apply(changes)
+            # Read the edited rows back so the treeview shows what the server actually stored
+            rows = pager.fetch_by_keys(cursor, list(changes.updates)) if pager else []
+            return affected, rows
+        
+        def done(result):
+            affected, rows = result
+            self.result_cache.invalidate(changes.table)
+            if from_pending and self.pending is not None and self.pending.table == changes.table:
+                self.pending.forget(changes)
+                self.update_pending_info()
+            if dialog is not None:
+                dialog.destroy()
+            if pager is None:
+                self.load_table_data()
+            else:
+                self.merge_rows(pager, rows, self.missing_keys(pager, changes.updates, rows) | changes.deletes)
+            self.status_var.set(f"Applied {len(changes):,} changes to {changes.table} ({affected:,} rows affected)")
+        
+        self.run_job(self.table_worker, work, done, "Error", "Failed to apply changes",
+                     f"Applying {len(changes):,} changes")
+    
+    def written_pager(self, table):
+        """The current pager if rows of table can be refreshed one by one, otherwise None (reload instead)"""
+        if self.pager is not None and self.pager.table == table and self.pager.uses_keyset:
+            return self.pager
+        return None
+    
+    @staticmethod
+    def missing_keys(pager, keys, rows):
+        """Keys we asked for that didn't come back - someone else deleted those rows"""
+        return set(keys) - {pager.row_key(row) for row in rows}
+    
+    def merge_rows(self, pager, rows, removed_keys=()):
+        """
+        Applies fresh copies of individual rows to the window instead of reloading the table.
+        Rows already on screen are updated in place, new ones are slotted in by key and
+        removed_keys are dropped.
+        """
+        if pager is not self.pager:
+            return  # user switched tables while the write was running
+        
+        started = time.perf_counter()
+        items = self.tree.get_children()
+        positions = {pager.row_key(row): i for i, row in enumerate(self.window_rows)}
+        new_rows = []
+        
+        moved = set()
+        
+        for row in rows:
+            key = pager.row_key(row)
+            i = positions.get(key)
+            if i is None:
+                new_rows.append(row)
+                continue
+            if pager.order_key(row) != pager.order_key(self.window_rows[i]):
+                # Its sort column changed, so it belongs somewhere else now
+                moved.add(key)
+                new_rows.append(row)
+                continue
+            self.window_rows[i] = row
+            values, tags = self.row_display(row)
+            self.tree.item(items[i], values=values, tags=tags)
+        
+        removed = sorted({positions[key] for key in removed_keys if key in positions}, reverse=True)
+        for i in sorted(removed + [positions[key] for key in moved], reverse=True):
+            self.tree.delete(items[i])
+            del self.window_rows[i]
+        if self.row_estimate is not None:
+            self.row_estimate = max(self.row_estimate - len(removed), 0)
+        
+        for row in new_rows:
+            self.insert_row_in_order(pager, row)
+        self.update_row_info()
+        self.record_render(started)
+    
+    def insert_row_in_order(self, pager, row):
+        """Puts a row into the window at its position in the view's order, if that position is in the window"""
+        # Python orders strings by code point, the server by collation - close enough for placing one row
+        keys = [pager.sort_key(r) for r in self.window_rows]
+        if pager.descending:
+            pos = len(keys) - bisect.bisect_right(keys[::-1], pager.sort_key(row))
+        else:
+            pos = bisect.bisect_left(keys, pager.sort_key(row))
+        
+        # Belongs on a page we haven't loaded - it'll show up when the user scrolls there
+        if (pos == 0 and self.window_start > 0) or (pos == len(keys) and not self.at_end):
+            return
+        
+        values, tags = self.row_display(row)
+        self.tree.insert('', pos, iid=self.next_iid, values=values, tags=tags)
+        self.next_iid += 1
+        self.window_rows.insert(pos, row)
+    
+    def refresh_changed(self):
+        """
+        Re-reads only the parts of the window that changed on the server.
+        Uses an updated_at style column when the table has one, otherwise compares
+        per-range checksums the server works out against the ones from last time
+        (so the first check after loading or scrolling reads the window once).
+        """
+        pager = self.pager
+        if pager is None or not pager.uses_keyset or pager.custom_view or not self.window_rows:
+            self.load_table_data()  # nothing to compare against (or not a key range), just reload
+            return
+        
+        schema = self.schema_cache.peek(pager.table) if self.schema_cache else None
+        change_column = schema.change_column() if schema else None
+        window_keys = [pager.row_key(row) for row in self.window_rows]
+        
+        if change_column is not None:
+            stamp_index = pager.columns.index(change_column)
+            stamps = [row[stamp_index] for row in self.window_rows if row[stamp_index] is not None]
+            since = max(stamps) if stamps else None
+            first_key, last_key = window_keys[0], window_keys[-1]
+            
+            def work(cursor, job):
+                # Anything deleted or inserted changes the count, which updated_at can't tell us about
+                if pager.count_range(cursor, first_key, last_key) != len(window_keys) or since is None:
+                    rows = pager.fetch_range(cursor, first_key, last_key)
+                    return rows, self.missing_keys(pager, window_keys, rows), None
+                return pager.fetch_changed_since(cursor, change_column, since, first_key, last_key), set(), None
+        else:
+            chunks = [window_keys[i:i + self.checksum_chunk] for i in range(0, len(window_keys), self.checksum_chunk)]
+            previous = self.range_checksums
+            
+            def work(cursor, job):
+                rows, removed, checksums = [], set(), {}
+                for chunk in chunks:
+                    job.check_cancelled()
+                    span = (chunk[0], chunk[-1])
+                    checksum = pager.range_checksum(cursor, *span)
+                    checksums[span] = checksum
+                    if previous.get(span) != checksum:
+                        changed = pager.fetch_range(cursor, *span)
+                        rows.extend(changed)
+                        removed |= self.missing_keys(pager, chunk, changed)
+                return rows, removed, checksums
+        
+        def done(result):
+            rows, removed, checksums = result
+            if checksums is not None and pager is self.pager:
+                self.range_checksums = checksums
+            if rows or removed:
+                self.result_cache.invalidate(pager.table)
+            self.merge_rows(pager, rows, removed)
+            self.status_var.set(f"Refreshed {len(rows):,} changed rows in {pager.table}")
+        
+        self.run_job(self.table_worker, work, done, "Error", "Failed to refresh rows", f"Checking {pager.table}")
+    
+    def toggle_watch(self):
+        """Watch checkbox - starts or stops checking the open table for changes"""
+        if not self.watch_var.get():
+            self.stop_watch()
+            self.watch_info_var.set("")
+            return
+        if self.pager is None or not self.connect_args:
+            messagebox.showwarning("Watch", "Please open a table first.")
+            self.watch_var.set(False)
+            return
+        self.watch_tick()
+    
+    def stop_watch(self):
+        if self.watch_timer is not None:
+            self.root.after_cancel(self.watch_timer)
+            self.watch_timer = None
+        self.watcher = None
+        self.watch_var.set(False)
+        for key in self.watch_highlight:
+            self.watch_highlight[key] = 0  # let clear_watch_highlights take them all off
+        self.clear_watch_highlights()
+    
+    def schedule_watch(self, delay=None):
+        """Sets up the next check - delay in ms, the interval box when None"""
+        if delay is None:
+            try:
+                delay = max(int(float(self.watch_interval_var.get()) * 1000), 1000)
+            except ValueError:
+                delay = 5000
+        self.watch_timer = self.root.after(delay, self.watch_tick)
+    
+    def watch_tick(self):
+        """One check of the open table - queued behind whatever the Tables tab is doing, never on top of another"""
+        self.watch_timer = None
+        pager = self.pager
+        if not self.watch_var.get() or pager is None:
+            return
+        if self.table_worker.busy or self.page_loading:
+            self.schedule_watch(500)  # the user's own loading comes first
+            return
+        
+        self.clear_watch_highlights()
+        
+        # Reloading or switching tables makes a new pager - start watching that one from scratch
+        if self.watcher is None or self.watcher.pager is not pager:
+            schema = self.schema_cache.peek(pager.table)
+            if schema is None:
+                self.with_schema(pager.table, lambda schema: self.schedule_watch(0), "Failed to start watching")
+                return
+            self.watcher = TableWatcher(pager, schema, None if self.snapshot else self.connect_args)
+        watcher = self.watcher
+        
+        def work(cursor, job):
+            if not watcher.started:
+                watcher.start(cursor)
+                return [], set(), False
+            return watcher.poll(cursor)
+        
+        def done(result):
+            if watcher is not self.watcher:
+                return  # stopped or restarted while this was running
+            if result is None:
+                # Too much changed to patch in - reload and carry on watching from there
+                self.watch_info_var.set(f"Watching {watcher.describe()} - lots changed, reloaded")
+                self.watcher = None
+                self.load_table_data()
+                self.schedule_watch()
+                return
+            
+            rows, removed, more = result
+            if (rows or removed) and pager is self.pager:
+                self.result_cache.invalidate(pager.table)
+                expires = time.monotonic() + self.watch_highlight_seconds
+                for row in rows:
+                    self.watch_highlight[pager.row_key(row)] = expires
+                anchor = self.tree.identify_row(1)
+                self.merge_rows(pager, rows, removed)
+                # Rows arriving at the end push old ones off the top, so the window stays the same size for hours
+                self.trim_window(from_top=True)
+                self.keep_view_on(anchor)
+                self.update_row_info()
+            
+            text = f"Watching {watcher.describe()}"
+            if watcher.binlog_error:
+                text += f" (not the binlog: {watcher.binlog_error})"
+            if rows or removed:
+                text += f" - {len(rows):,} new/changed, {len(removed):,} gone at {time.strftime('%H:%M:%S')}"
+            self.watch_info_var.set(text)
+            self.schedule_watch(0 if more else None)
+        
+        def failed(e):
+            if watcher is not self.watcher:
+                return
+            if isinstance(e, WatchUnavailable) and pager.uses_keyset:
+                # Nothing to keep a mark on - compare the window's checksums instead, like Refresh Changed
+                self.watch_info_var.set(f"Watching {pager.table} by checking the loaded rows ({e})")
+                self.refresh_changed()
+                self.schedule_watch()
+                return
+            self.stop_watch()
+            if isinstance(e, QueryCancelled):
+                self.watch_info_var.set("Watching stopped")
+                return
+            self.watch_info_var.set("")
+            messagebox.showerror("Watch", f"Stopped watching {pager.table}: {e}")
+        
+        self.table_worker.submit(QueryJob(work, done, failed, description=f"Watching {pager.table}"))
+    
+    def clear_watch_highlights(self):
+        """Takes the highlight off rows that came in more than watch_highlight_seconds ago"""
+        now = time.monotonic()
+        expired = {key for key, expires in self.watch_highlight.items() if expires <= now}
+        if not expired:
+            return
+        for key in expired:
+            del self.watch_highlight[key]
+        if self.pager is None:
+            return
+        items = self.tree.get_children()
+        for i, row in enumerate(self.window_rows):
+            if self.pager.row_key(row) in expired:
+                values, tags = self.row_display(row)
+                self.tree.item(items[i], tags=tags)
+    
+    def add_record(self):
+        """Creates and displays a form to add a new record to the current table"""
+        selected_table = self.table_var.get()
+        
+        if not selected_table or not self.connect_args:
+            messagebox.showwarning("Error", "Please select a table and ensure you're connected.")
+            return
+        
+        # Need to know the table structure to create the right form fields
+        self.with_schema(selected_table, lambda schema: self.show_add_dialog(selected_table, schema),
+                         "Failed to get table structure")
+    
+    def show_add_dialog(self, selected_table, schema):
+        """Builds the add record form once we know the table structure"""
+        columns = schema.describe_rows()
+        
+        # Create a popup dialog for the new record form
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"Add Record to {selected_table}")
+        dialog.geometry("400x300")
+        dialog.transient(self.root)
+        dialog.grab_set()  # makes the dialog modal
+        
+        # If there are lots of fields, we need scrolling
+        canvas = tk.Canvas(dialog)
+        scrollbar = ttk.Scrollbar(dialog, orient="vertical", command=canvas.yview)
+        scrollable_frame = ttk.Frame(canvas)
+        
+        # This makes the scrolling work
+        scrollable_frame.bind(
+            "<Configure>",
+            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
+        )
+        
+        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
+        canvas.configure(yscrollcommand=scrollbar.set)
+        
+        canvas.pack(side="left", fill="both", expand=True, padx=5, pady=5)
+        scrollbar.pack(side="right", fill="y")
+        
+        # Create input fields for each column
+        entries = {}
+        foreign_keys = single_column_keys(schema)
+        for i, col in enumerate(columns):
+            col_name = col[0]
+            col_type = col[1]
+            is_auto = col[5] == 'auto_increment'  # skip auto_increment fields
+            is_required = col[2] == 'NO'  # mark required fields
+            
+            # Don't need to enter auto_increment fields - the DB handles those
+            if is_auto:
+                continue
+            
+            # Show field info in the label
+            label_text = f"{col_name} ({col_type})"
+            if is_required:
+                label_text += " *"  # asterisk for required fields
+                
+            ttk.Label(scrollable_frame, text=label_text).grid(row=i, column=0, padx=10, pady=5, sticky=tk.W)
+            
+            # Create an entry field - foreign keys get a lookup
+            entry_var = tk.StringVar()
+            self.make_field(scrollable_frame, i, entry_var, foreign_keys.get(col_name), dialog)
+            
+            entries[col_name] = entry_var
+        
+        # Button frame at the bottom
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(side="bottom", fill="x", padx=10, pady=10)
+        
+        # Submit function for the add button
+        def submit():
+            # Get values from all fields
+            values = {col: var.get() for col, var in entries.items() if var.get() or var.get() == '0'}
+            
+            # Check that required fields are filled
+            missing_fields = []
+            for col in columns:
+                col_name = col[0]
+                is_required = col[2] == 'NO'
+                is_auto = col[5] == 'auto_increment'
+                
+                if is_required and not is_auto and col_name in entries and not entries[col_name].get():
+                    missing_fields.append(col_name)
+            
+            if missing_fields:
+                messagebox.showwarning("Required Fields", f"Please fill in required fields: {', '.join(missing_fields)}")
+                return
+            
+            if not values:
+                messagebox.showwarning("Empty Data", "Please enter data for at least one field.")
+                return
+            
+            pager = self.written_pager(selected_table)
+            schema_cache = self.schema_cache
+            
+            # Insert and commit on the worker (parameterized, never string formatted), then read back just the new row
+            def work(cursor, job):
+                key = TableGateway(job.conn, cursor, schema_cache, job.statements).insert(selected_table, values)
+                if pager is None:
+                    return []
+                return pager.fetch_by_keys(cursor, [key]) if key else None
+            
+            def done(rows):
+                self.result_cache.invalidate(selected_table)
+                messagebox.showinfo("Success", "Record added successfully!")
+                dialog.destroy()
+                
+                # Slot the new row into the view - only reload if we couldn't work out its key
+                if pager is None or rows is None:
+                    self.load_table_data()
+                else:
+                    if self.row_estimate is not None:
+                        self.row_estimate += len(rows)
+                    self.merge_rows(pager, rows)
+            
+            self.run_job(self.table_worker, work, done, "Error", "Failed to add record", "Adding record")
+        
+        # Add the submit button
+        ttk.Button(button_frame, text="Add Record", command=submit).pack(pady=5)
+    
+    def make_field(self, parent, row, entry_var, foreign_key, dialog, readonly=False):
+        """
+        Input for one column of the Add/Edit forms. A foreign key gets a dropdown that searches the
+        table it points at as you type, and a Go To button that opens the row it points at.
+        """
+        if foreign_key is None:
+            entry = ttk.Entry(parent, textvariable=entry_var, width=30)
+            entry.grid(row=row, column=1, padx=10, pady=5)
+            if readonly:
+                entry.config(state='readonly')
+            return
+        
+        field = ttk.Frame(parent)
+        field.grid(row=row, column=1, padx=10, pady=5, sticky=tk.W)
+        if readonly:
+            ttk.Entry(field, textvariable=entry_var, width=22, state='readonly').pack(side=tk.LEFT)
+        else:
+            box = ttk.Combobox(field, textvariable=entry_var, width=20)
+            box.pack(side=tk.LEFT)
+            self.attach_lookup(box, entry_var, foreign_key)
+        ttk.Button(field, text="Go To", width=6,
+                   command=lambda: self.jump_to_row(foreign_key['ref_table'], foreign_key['ref_column'],
+                                                    entry_var.get(), dialog)).pack(side=tk.LEFT, padx=(5, 0))
+    
+    def attach_lookup(self, box, entry_var, foreign_key):
+        """Type-ahead for a foreign key field - the dropdown fills with matching rows of the referenced table"""
+        lookups = self.lookups
+        table, column = foreign_key['ref_table'], foreign_key['ref_column']
+        keys = {}  # dropdown text -> the key value it stands for
+        timer = [None]  # after() id of the search waiting for the typing to stop
+        
+        def show(text, matches):
+            if not box.winfo_exists() or box.get().strip() != text:
+                return  # dialog closed, or the user kept typing
+            keys.clear()
+            for value, label in matches:
+                keys[f"{value} - {label}" if label else str(value)] = value
+            box['values'] = list(keys)
+        
+        def search():
+            timer[0] = None
+            text = box.get().strip()
+            # Prefixes typed before in this session don't need the server
+            matches = lookups.cached(table, column, text)
+            if matches is not None:
+                show(text, matches)
+                return
+            
+            def work(cursor, job):
+                return lookups.search(cursor, table, column, text)
+            
+            self.run_job(self.table_worker, work, lambda matches: show(text, matches),
+                         "Lookup Error", f"Failed to search {table}", f"Searching {table}")
+        
+        def on_key(event):
+            if event.keysym in ('Up', 'Down', 'Return', 'Escape', 'Tab'):
+                return
+            if timer[0] is not None:
+                box.after_cancel(timer[0])
+            timer[0] = box.after(self.lookup_delay, search)
+        
+        def on_pick(event):
+            # Keep just the key in the field, the label was only there to pick by
+            value = keys.get(box.get())
+            if value is not None:
+                entry_var.set(str(value))
+        
+        box.bind("<KeyRelease>", on_key)
+        box.bind("<<ComboboxSelected>>", on_pick)
+        box.bind("<FocusIn>", lambda event: None if box['values'] else search())
+    
+    def jump_to_row(self, table, column, text, dialog=None):
+        """Go To button on a foreign key field - opens the referenced table at the row the field points at"""
+        text = text.strip()
+        if not text:
+            messagebox.showwarning("Go To", "Fill in the field first.", parent=dialog)
+            return
+        
+        def open_at(schema):
+            col_type = next(col[1] for col in schema.columns if col[0] == column)
+            try:
+                value = converter_for(col_type)(text)
+            except ValueError:
+                messagebox.showerror("Go To", f"{text!r} isn't a valid {column} ({col_type})", parent=dialog)
+                return
+            if dialog is not None and dialog.winfo_exists():
+                dialog.grab_release()  # the form stays open, but the main window can be used again
+            
+            self.table_var.set(table)
+            if schema.primary_key == [column]:
+                # Page straight to the row, in primary key order so scrolling shows its neighbours
+                self.load_table_data(start_key=(value,))
+            else:
+                # It points at some other unique key - show just that row, Clear Filters brings back the rest
+                self.load_table_data(filters=[(column, '=', value)])
+        
+        self.with_schema(table, open_at, "Failed to open the referenced table")
+    
+    def edit_record(self):
+        """Creates a form to edit the selected record"""
+        selected_table = self.table_var.get()
+        selected_items = self.tree.selection()
+        
+        if not selected_table or not self.connect_args:
+            messagebox.showwarning("Error", "Please select a table and ensure you're connected.")
+            return
+        
+        if not selected_items:
+            messagebox.showwarning("No Selection", "Please select a record to edit.")
+            return
+        
+        # Several rows selected - set one column on all of them in a single UPDATE
+        if len(selected_items) > 1:
+            selected_rows = self.selected_rows()
+            self.with_schema(selected_table,
+                             lambda schema: self.show_bulk_edit_dialog(selected_table, schema, selected_rows),
+                             "Failed to prepare edit form")
+            return
+        
+        # Grab the current values now in case the row scrolls out of the window while we wait.
+        # These are the real values (not the treeview's strings) so the key matches the row we refresh.
+        selected_values = self.selected_rows()[0]
+        
+        # Get the table structure
+        self.with_schema(selected_table,
+                         lambda schema: self.show_edit_dialog(selected_table, schema, selected_values),
+                         "Failed to prepare edit form")
+    
+    def show_edit_dialog(self, selected_table, schema, selected_values):
+        """Builds the edit form once we know the table structure"""
+        columns = schema.describe_rows()
+        
+        # Need the primary key to build the WHERE clause - can be more than one column
+        primary_key = schema.primary_key
+        
+        if not primary_key:
+            messagebox.showerror("Error", "Could not identify primary key for this table.")
+            return
+        
+        primary_key_values = [selected_values[schema.column_names.index(col)] for col in primary_key]
+        
+        # Create dialog for the edit form
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"Edit Record in {selected_table}")
+        dialog.geometry("400x300")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        # Scrolling for lots of fields
+        canvas = tk.Canvas(dialog)
+        scrollbar = ttk.Scrollbar(dialog, orient="vertical", command=canvas.yview)
+        scrollable_frame = ttk.Frame(canvas)
+        
+        scrollable_frame.bind(
+            "<Configure>",
+            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
+        )
+        
+        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
+        canvas.configure(yscrollcommand=scrollbar.set)
+        
+        canvas.pack(side="left", fill="both", expand=True, padx=5, pady=5)
+        scrollbar.pack(side="right", fill="y")
+        
+        # Create fields with current values filled in
+        entries = {}
+        foreign_keys = single_column_keys(schema)
+        for i, col in enumerate(columns):
+            col_name = col[0]
+            col_type = col[1]
+            is_primary = col[3] == 'PRI'
+            is_required = col[2] == 'NO'
+            
+            # Label with extra info
+            label_text = f"{col_name} ({col_type})"
+            if is_primary:
+                label_text += " [PK]"  # mark primary key
+            if is_required:
+                label_text += " *"  # mark required fields
+                
+            ttk.Label(scrollable_frame, text=label_text).grid(row=i, column=0, padx=10, pady=5, sticky=tk.W)
+            
+            # Fill with current value
+            current_value = str(selected_values[i]) if i < len(selected_values) else ""
+            entry_var = tk.StringVar(value=current_value)
+            
+            # Can't edit primary key - would change record identity
+            self.make_field(scrollable_frame, i, entry_var, foreign_keys.get(col_name), dialog, readonly=is_primary)
+            
+            entries[col_name] = entry_var
+        
+        # Button frame
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(side="bottom", fill="x", padx=10, pady=10)
+        
+        # The update function for the submit button
+        def submit():
+            # Check required fields
+            missing_fields = []
+            for col in columns:
+                col_name = col[0]
+                is_required = col[2] == 'NO'
+                is_primary = col[3] == 'PRI'
+                
+                if is_required and not is_primary and col_name in entries and not entries[col_name].get():
+                    missing_fields.append(col_name)
+            
+            if missing_fields:
+                messagebox.showwarning("Required Fields", f"Please fill in required fields: {', '.join(missing_fields)}")
+                return
+            
+            # Every field except the primary key goes into the UPDATE
+            values = {col: var.get() for col, var in entries.items() if col not in primary_key}
+            pager = self.written_pager(selected_table)
+            schema_cache = self.schema_cache
+            key = tuple(primary_key_values)
+            
+            # Update and commit on the worker, then read back just this row
+            def work(cursor, job):
+                TableGateway(job.conn, cursor, schema_cache, job.statements).update(selected_table, key, values)
+                return pager.fetch_by_keys(cursor, [key]) if pager else []
+            
+            def done(rows):
+                self.result_cache.invalidate(selected_table)
+                messagebox.showinfo("Success", "Record updated successfully!")
+                dialog.destroy()
+                
+                # Refresh only the edited row
+                if pager is None:
+                    self.load_table_data()
+                else:
+                    self.merge_rows(pager, rows, self.missing_keys(pager, [key], rows))
+            
+            self.run_job(self.table_worker, work, done, "Error", "Failed to update record", "Updating record")
+        
+        # Add the submit button
+        ttk.Button(button_frame, text="Update Record", command=submit).pack(pady=5)
+    
+    def show_bulk_edit_dialog(self, selected_table, schema, selected_rows):
+        """Small form that sets one column to the same value on every selected row"""
+        primary_key = schema.primary_key
+        
+        if not primary_key:
+            messagebox.showerror("Error", "Could not identify primary key for this table.")
+            return
+        
+        key_indexes = [schema.column_names.index(col) for col in primary_key]
+        editable = [col for col in schema.columns if col[0] not in primary_key]
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"Edit {len(selected_rows)} Records in {selected_table}")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        ttk.Label(dialog, text="Column:").grid(row=0, column=0, padx=10, pady=5, sticky=tk.W)
+        column_var = tk.StringVar(value=editable[0][0] if editable else "")
+        ttk.Combobox(dialog, textvariable=column_var, values=[col[0] for col in editable],
+                     state="readonly", width=27).grid(row=0, column=1, padx=10, pady=5)
+        
+        ttk.Label(dialog, text="New value:").grid(row=1, column=0, padx=10, pady=5, sticky=tk.W)
+        value_var = tk.StringVar()
+        ttk.Entry(dialog, textvariable=value_var, width=30).grid(row=1, column=1, padx=10, pady=5)
+        
+        def submit():
+            col_name = column_var.get()
+            if not col_name:
+                return
+            nullable = dict((col[0], col[2]) for col in editable)[col_name] == 'YES'
+            value = value_var.get()
+            if value == '' and not nullable:
+                messagebox.showwarning("Required Fields", f"{col_name} can't be empty")
+                return
+            
+            # One UPDATE ... WHERE pk IN (...) for all of them
+            changes = PendingChanges(selected_table, primary_key)
+            for row in selected_rows:
+                changes.set_value(tuple(row[i] for i in key_indexes), col_name, value if value != '' else None)
+            self.apply_changes(changes, dialog)
+        
+        ttk.Button(dialog, text=f"Update {len(selected_rows)} Records", command=submit).grid(
+            row=2, column=0, columnspan=2, pady=10)
+    
+    def delete_record(self):
+        """Deletes the selected record after confirmation"""
+        selected_table = self.table_var.get()
+        selected_items = self.tree.selection()
+        
+        if not selected_table or not self.connect_args:
+            messagebox.showwarning("Error", "Please select a table and ensure you're connected.")
+            return
+        
+        if not selected_items:
+            messagebox.showwarning("No Selection", "Please select a record to delete.")
+            return
+        
+        # Several rows selected - delete them all with one DELETE ... WHERE pk IN (...)
+        if len(selected_items) > 1:
+            selected_rows = self.selected_rows()
+            self.with_schema(selected_table,
+                             lambda schema: self.confirm_delete_many(selected_table, schema, selected_rows),
+                             "Failed to delete records")
+            return
+        
+        selected_values = self.selected_rows()[0]
+        
+        # Need to find the primary key for the WHERE clause
+        self.with_schema(selected_table,
+                         lambda schema: self.confirm_delete(selected_table, schema, selected_values),
+                         "Failed to delete record")
+    
+    def confirm_delete(self, selected_table, schema, selected_values):
+        """Asks for confirmation and then deletes the record"""
+        # Find the primary key (all of its columns if it's a composite key)
+        primary_key = schema.primary_key
+        
+        if not primary_key:
+            messagebox.showerror("Error", "Could not identify primary key for this table.")
+            return
+        
+        # Get the primary key value for the selected record
+        primary_key_values = [selected_values[schema.column_names.index(col)] for col in primary_key]
+        key_text = ", ".join(f"{col}={value}" for col, value in zip(primary_key, primary_key_values))
+        
+        # Always confirm before deleting! Too easy to delete wrong record
+        if not messagebox.askyesno("Confirm", f"Delete record with {key_text}?"):
+            return
+        
+        pager = self.written_pager(selected_table)
+        schema_cache = self.schema_cache
+        
+        def work(cursor, job):
+            TableGateway(job.conn, cursor, schema_cache, job.statements).delete_many(selected_table, [primary_key_values])
+        
+        def done(result):
+            self.result_cache.invalidate(selected_table)
+            messagebox.showinfo("Success", "Record deleted successfully!")
+            
+            # Just take the row out of the view
+            if pager is None:
+                self.load_table_data()
+            else:
+                self.merge_rows(pager, [], [tuple(primary_key_values)])
+        
+        self.run_job(self.table_worker, work, done, "Error", "Failed to delete record", "Deleting record")
+    
+    def confirm_delete_many(self, selected_table, schema, selected_rows):
+        """Asks for confirmation and then deletes all the selected records in one transaction"""
+        primary_key = schema.primary_key
+        
+        if not primary_key:
+            messagebox.showerror("Error", "Could not identify primary key for this table.")
+            return
+        
+        if not messagebox.askyesno("Confirm", f"Delete {len(selected_rows)} records from {selected_table}?"):
+            return
+        
+        key_indexes = [schema.column_names.index(col) for col in primary_key]
+        changes = PendingChanges(selected_table, primary_key)
+        for row in selected_rows:
+            changes.delete(tuple(row[i] for i in key_indexes))
+        self.apply_changes(changes)
     
     def execute_query(self):
-        """Runs a custom SQL query and displays results for SELECT queries"""
+        """Runs a custom SQL query in the background and streams the results in as they arrive"""
         query = self.query_text.get("1.0", tk.END).strip()
         
         if not query:
             messagebox.showwarning("Empty Query", "Please enter an SQL query.")
             return
         
-        if not self.conn:
+        if not self.connect_args:
             messagebox.showwarning("No Connection", "Please connect to a database first.")
             return
         
         try:
-            # Run the query as is
-            self.cursor.execute(query)
+            row_limit = max(int(self.query_limit_var.get() or 0), 0)
+        except ValueError:
+            messagebox.showwarning("Row Limit", "Row limit has to be a whole number (0 for no limit).")
+            return
+        
+        # More than one statement is a script - those get their own runner
+        statements = split_statements(query)
+        if len(statements) > 1:
+            self.run_script(query, statements)
+            return
+        if statements:
+            query = statements[0].sql  # without the trailing ; and comments
+        
+        # A previous result waiting on Fetch More would hold the worker forever
+        self.release_paused_query()
+        self.clear_script_tabs()
+        
+        # Clear any existing data before the new results start coming in
+        self.query_backlog.clear()
+        self.query_render_time = 0.0
+        self.query_tree.delete(*self.query_tree.get_children())
+        self.fetch_more_button.config(state=tk.DISABLED)
+        self.query_timing_var.set("")
+        fetch_size = self.query_fetch_size
+        
+        def work(cursor, job):
+            # Run the query as is - the worker's cursor is unbuffered, so rows stay on the server until fetched
+            cursor.execute(query)
             
-            # Handle SELECT queries differently - need to display results
-            if query.lower().strip().startswith("select"):
-                # Get column names from the result
-                columns = [col[0] for col in self.cursor.description]
-                
-                # Set up the results treeview
-                self.query_tree['columns'] = columns
-                self.query_tree.column('#0', width=0, stretch=tk.NO)
-                
-                # Clear existing headers
-                for col in self.query_tree['columns']:
-                    self.query_tree.heading(col, text='')
-                
-                # Set column headings
-                for col in columns:
-                    self.query_tree.column(col, anchor=tk.W, width=100)
-                    self.query_tree.heading(col, text=col, anchor=tk.W)
-                
-                # Clear any existing data
-                for item in self.query_tree.get_children():
-                    self.query_tree.delete(item)
-                
-                # Add all result rows to the treeview
-                for i, row in enumerate(self.cursor.fetchall()):
-                    self.query_tree.insert('', 'end', iid=i, values=row)
-                
-                self.status_var.set("Query executed successfully.")
+            # Queries that return rows (SELECT, SHOW, ...) get streamed back in chunks
+            if cursor.with_rows:
+                job.post(self.setup_query_columns, [col[0] for col in cursor.description])
+                limit = row_limit
+                first_row = None
+                while True:
+                    size = min(fetch_size, limit - job.rows_received) if row_limit else fetch_size
+                    rows = cursor.fetchmany(size)
+                    if not rows:
+                        break
+                    if first_row is None:
+                        first_row = job.elapsed
+                        job.post(self.query_timing_var.set, f"First row {first_row:.2f}s")
+                    job.emit_rows(rows)
+                    
+                    if row_limit and job.rows_received >= limit:
+                        # Hit the cap - peek at one row so we only offer Fetch More if there really is more.
+                        # It's the first row of the next batch, so it counts towards the new limit.
+                        rows = cursor.fetchmany(1)
+                        if not rows:
+                            break
+                        job.post(self.fetch_more_button.config, {'state': tk.NORMAL})
+                        job.pause()
+                        limit += row_limit
+                        job.emit_rows(rows)
+                return job.rows_received, first_row, job.elapsed - job.paused_time
+            
+            # For INSERT, UPDATE, DELETE we need to commit and just report the affected rows
+            job.conn.commit()
+            return cursor.rowcount
+        
+        def done(result):
+            self.fetch_more_button.config(state=tk.DISABLED)
+            self.flush_query_render_time()
+            if isinstance(result, tuple):
+                rows, first_row, total = result
+                if first_row is not None:
+                    self.query_timing_var.set(f"First row {first_row:.2f}s, all rows {total:.2f}s")
+                self.status_var.set(f"Query executed successfully. {rows:,} rows.")
+            else:
+                affected_rows = result
+                self.result_cache.invalidate()  # no telling which tables it touched
+                messagebox.showinfo("Success", f"Query executed successfully. Affected rows: {affected_rows}")
+                self.status_var.set(f"Query executed. Affected rows: {affected_rows}")
+            
+            # Table structure might have changed, so the cached schema can't be trusted any more
+            if is_ddl(query):
+                self.schema_cache.invalidate()
+                self.load_tables()
+        
+        self.query_job = self.run_job(self.query_worker, work, done, "Query Error", "Failed to execute query",
+                                      "Running query", on_rows=self.append_query_rows)
+        
+        # Cancel while paused has to grey out Fetch More too
+        show_error = self.query_job.on_error
+        
+        def on_error(e):
+            self.fetch_more_button.config(state=tk.DISABLED)
+            show_error(e)
+        
+        self.query_job.on_error = on_error
+    
+    def run_bulk_job(self):
+        """Runs the DELETE or UPDATE in the SQL box a primary key range at a time, committing as it goes"""
+        query = self.query_text.get("1.0", tk.END).strip()
+        
+        if not self.connect_args:
+            messagebox.showwarning("No Connection", "Please connect to a database first.")
+            return
+        if self.bulk_job is not None:
+            messagebox.showwarning("Bulk Job", "A bulk job is already running - stop it or let it finish first.")
+            return
+        
+        statements = split_statements(query)
+        if len(statements) != 1:
+            messagebox.showwarning("Bulk Job", "Bulk jobs run one statement - leave just the DELETE or UPDATE in the box.")
+            return
+        try:
+            statement = BulkStatement(statements[0].sql)
+        except ValueError as e:
+            messagebox.showwarning("Bulk Job", str(e))
+            return
+        
+        # The primary key is what the job walks along
+        self.with_schema(statement.table, lambda schema: self.show_bulk_job_dialog(schema, statement.sql),
+                         "Failed to get table structure")
+    
+    def show_bulk_job_dialog(self, schema, sql):
+        """How big the chunks are and how gently to go"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"Bulk Job on {schema.name}")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        settings = [("Rows per chunk to start with:", "1000"),
+                    ("Seconds per chunk to aim for:", "0.5"),
+                    ("Max rows/s (0 = no limit):", "0"),
+                    ("Wait while Threads_running is over:", "20")]
+        fields = []
+        for i, (label, default) in enumerate(settings):
+            ttk.Label(dialog, text=label).grid(row=i, column=0, padx=10, pady=5, sticky=tk.W)
+            var = tk.StringVar(value=default)
+            ttk.Entry(dialog, textvariable=var, width=10).grid(row=i, column=1, padx=10, pady=5, sticky=tk.W)
+            fields.append(var)
+        
+        def start():
+            try:
+                chunk_size, max_threads = int(fields[0].get()), int(fields[3].get())
+                chunk_time, max_rate = float(fields[1].get()), float(fields[2].get())
+                if chunk_size < 1 or chunk_time <= 0 or max_rate < 0 or max_threads < 1:
+                    raise ValueError
+            except ValueError:
+                messagebox.showwarning("Bulk Job", "Those all have to be positive numbers.", parent=dialog)
+                return
+            
+            # One checkpoint per statement per database, so running the same thing again resumes it
+            scope = f"{self.connect_args['host']}:{self.connect_args['port']}/{self.connect_args['database']}\n{sql}"
+            checkpoint = os.path.join(self.bulk_job_dir, hashlib.sha1(scope.encode('utf-8')).hexdigest() + ".json")
+            try:
+                bulk_job = BulkJob(sql, schema.primary_key, chunk_size, chunk_time, max_rate or None, max_threads,
+                                   checkpoint)
+            except ValueError as e:
+                messagebox.showwarning("Bulk Job", str(e), parent=dialog)
+                return
+            
+            if os.path.exists(checkpoint) and bulk_job.load_checkpoint():
+                if not messagebox.askyesno("Resume Bulk Job", f"This job was stopped part way through "
+                                           f"({bulk_job.progress_text()}). Carry on from there?", parent=dialog):
+                    bulk_job = BulkJob(sql, schema.primary_key, chunk_size, chunk_time, max_rate or None, max_threads,
+                                       checkpoint)
+            dialog.destroy()
+            self.start_bulk_job(bulk_job)
+        
+        ttk.Button(dialog, text="Start", command=start).grid(row=len(settings), column=0, columnspan=2, pady=10)
+    
+    def start_bulk_job(self, bulk_job):
+        """Runs a bulk job on the bulk worker, in a little window with progress, Pause and Stop"""
+        table = bulk_job.table
+        window = tk.Toplevel(self.root)
+        window.title(f"Bulk Job on {table}")
+        
+        ttk.Label(window, text=bulk_job.statement.sql, wraplength=450).pack(fill=tk.X, padx=10, pady=5)
+        progress = ttk.Progressbar(window, maximum=100, length=450)
+        progress.pack(padx=10, pady=5)
+        progress_var = tk.StringVar(value="Waiting for the bulk worker...")
+        ttk.Label(window, textvariable=progress_var).pack(fill=tk.X, padx=10)
+        
+        buttons = ttk.Frame(window)
+        buttons.pack(pady=5)
+        pause_button = ttk.Button(buttons, text="Pause")
+        pause_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Stop", command=lambda: self.cancel_worker(self.bulk_worker)).pack(side=tk.LEFT, padx=5)
+        window.protocol("WM_DELETE_WINDOW", lambda: self.cancel_worker(self.bulk_worker))
+        
+        def show_progress(bulk_job):
+            if not window.winfo_exists():
+                return
+            fraction = bulk_job.progress()
+            progress.config(mode='determinate' if fraction is not None else 'indeterminate',
+                            value=(fraction or 0) * 100)
+            progress_var.set(bulk_job.progress_text())
+            self.status_var.set(f"Bulk job on {table}: {bulk_job.progress_text()}")
+        
+        def toggle_pause():
+            # The job pauses after the chunk it's on - it's committed, so nothing stays locked
+            if bulk_job.pause_requested:
+                bulk_job.pause_requested = False
+                job.resume()
+                pause_button.config(text="Pause")
+            else:
+                bulk_job.pause_requested = True
+                pause_button.config(text="Resume")
+        
+        pause_button.config(command=toggle_pause)
+        
+        def work(cursor, job):
+            bulk_job.on_progress = lambda b: job.post(show_progress, b)
+            return bulk_job.run(job.conn, cursor, job)
+        
+        def finished():
+            self.bulk_job = None
+            self.result_cache.invalidate(table)
+            if window.winfo_exists():
+                window.destroy()
+            # Whatever got done is committed, so the view needs to catch up either way
+            if self.table_var.get() == table:
+                self.load_table_data()
+        
+        def done(bulk_job):
+            bulk_job.remove_checkpoint()
+            finished()
+            self.status_var.set(f"Bulk job on {table} finished: {bulk_job.progress_text()}")
+            messagebox.showinfo("Bulk Job", f"Finished in {bulk_job.elapsed:.1f}s: {bulk_job.progress_text()}"
+                                + (f"\n\n{bulk_job.throttled:.1f}s of that was waiting for the server."
+                                   if bulk_job.throttled else ""))
+        
+        def failed(e):
+            finished()
+            if isinstance(e, QueryCancelled):
+                self.status_var.set(f"Bulk job on {table} stopped - run it again to carry on from the last chunk")
+                return
+            self.status_var.set(f"Bulk job on {table} failed")
+            messagebox.showerror("Bulk Job Error", f"Bulk job failed: {e}\n\nChunks already committed stay done - "
+                                 "run it again to carry on from the last one.")
+        
+        self.bulk_job = bulk_job
+        job = QueryJob(work, done, failed, description=f"Bulk job on {table}")
+        self.bulk_worker.submit(job)
+    
+    def clear_script_tabs(self):
+        """Removes the tabs left over from the last script, back to the single Result tab"""
+        for frame in self.script_tabs:
+            frame.destroy()
+        self.script_tabs = []
+        self.results_notebook.select(0)
+    
+    def run_script(self, query, statements):
+        """
+        Runs a multi-statement script on one connection.
+        Each result set gets its own tab, and every statement gets a line under Messages.
+        """
+        transaction = self.script_transaction_var.get()
+        if transaction and any(is_ddl(statement.sql) for statement in statements):
+            if not messagebox.askyesno("Transaction", "The script has DDL (CREATE, ALTER, DROP...), which MySQL "
+                                       "commits straight away - those statements can't be rolled back.\n\nRun it anyway?"):
+                return
+        
+        self.release_paused_query()
+        self.clear_script_tabs()
+        self.query_backlog.clear()
+        self.query_tree.delete(*self.query_tree.get_children())
+        self.fetch_more_button.config(state=tk.DISABLED)
+        self.query_timing_var.set("")
+        
+        # Messages tab - one line per statement
+        messages_frame = ttk.Frame(self.results_notebook)
+        self.results_notebook.add(messages_frame, text="Messages")
+        self.script_tabs.append(messages_frame)
+        messages = self.make_result_tree(messages_frame)
+        columns = ("number", "line", "statement", "result", "time")
+        messages['columns'] = columns
+        messages['show'] = 'headings'
+        for col, text, width in zip(columns, ("#", "Line", "Statement", "Result", "Time ms"), (40, 50, 350, 200, 70)):
+            messages.heading(col, text=text, anchor=tk.W)
+            messages.column(col, width=width, anchor=tk.W, stretch=col == "statement")
+        messages.tag_configure('error', foreground='red')
+        self.results_notebook.select(messages_frame)
+        
+        stop_on_error = self.stop_on_error_var.get()
+        schema_cache = self.schema_cache
+        total = len(statements)
+        
+        def work(cursor, job):
+            def on_results(runner, results):
+                job.rows_received += sum(result.total_rows for result in results)
+                job.post(self.show_script_results, messages, results, runner.executed, total)
+            return TableGateway(job.conn, cursor, schema_cache).run_script(statements, transaction, stop_on_error,
+                                                                          job, on_results)
+        
+        def finished():
+            if not all(statement.may_return_rows for statement in statements):
+                self.result_cache.invalidate()
+            # Structure might have changed even if the script failed part way
+            if any(is_ddl(statement.sql) for statement in statements):
+                self.schema_cache.invalidate()
+                self.load_tables()
+        
+        def done(runner):
+            finished()
+            text = f"Script finished: {runner.executed:,} of {total:,} statements in {runner.elapsed:.2f}s"
+            if runner.failed:
+                text += f", {runner.failed:,} failed"
+            if transaction:
+                text += " (committed)"
+            self.status_var.set(text)
+        
+        job = self.run_job(self.query_worker, work, done, "Script Error", "Script stopped", "Running script")
+        self.query_job = job
+        show_error = job.on_error
+        
+        def on_error(e):
+            finished()
+            show_error(e)
+            if transaction:
+                self.status_var.set("Script stopped - transaction rolled back")
+        
+        job.on_error = on_error
+    
+    def show_script_results(self, messages, results, executed, total):
+        """Adds a batch of script results - a Messages line each, and a tab for each result set"""
+        for result in results:
+            statement = result.statement
+            if result.error is not None:
+                outcome = f"Error: {result.error}"
+            elif result.columns is not None:
+                outcome = f"{result.total_rows:,} rows"
+                if result.total_rows > len(result.rows):
+                    outcome += f" (first {len(result.rows):,} shown)"
+                if len(self.script_tabs) > self.max_script_tabs:
+                    outcome += " - too many result sets to show"
+                else:
+                    self.add_script_result_tab(result)
             else:
-                # For INSERT, UPDATE, DELETE we need to commit and just show a message
-                self.conn.commit()
-                messagebox.showinfo("Success", f"Query executed successfully. Affected rows: {self.cursor.rowcount}")
-                self.status_var.set(f"Query executed. Affected rows: {self.cursor.rowcount}")
-        
-        except mysql.connector.Error as e:
-            # Show details of any SQL errors
-            messagebox.showerror("Query Error", f"Failed to execute query: {e}")
\ No newline at end of file
+                outcome = f"{result.rowcount:,} rows affected" if result.rowcount is not None and result.rowcount >= 0 else "OK"
+            
+            elapsed = f"{result.elapsed * 1000:.1f}" + (" (batch)" if result.batched else "")
+            messages.insert('', 'end', tags=('error',) if result.error is not None else (), values=(
+                result.index + 1, statement.line, " ".join(statement.sql.split())[:200], outcome, elapsed))
+        
+        self.status_var.set(f"Running script: {executed:,} of {total:,} statements")
+    
+    def add_script_result_tab(self, result):
+        """A tab with the rows one script statement returned"""
+        frame = ttk.Frame(self.results_notebook)
+        self.results_notebook.add(frame, text=f"Result {result.index + 1}")
+        self.script_tabs.append(frame)
+        
+        tree = self.make_result_tree(frame)
+        tree['columns'] = result.columns
+        tree.column('#0', width=0, stretch=tk.NO)
+        for col in result.columns:
+            tree.column(col, anchor=tk.W, width=100)
+            tree.heading(col, text=col, anchor=tk.W)
+        for row in result.rows:
+            tree.insert('', 'end', values=row)
+    
+    def fetch_more_rows(self):
+        """Fetch More button - lets a capped query carry on for another row limit's worth"""
+        job = self.query_job
+        if job is not None and job.paused:
+            self.fetch_more_button.config(state=tk.DISABLED)
+            job.resume()
+    
+    def setup_query_columns(self, columns):
+        """Sets up the results treeview for a new result set"""
+        self.query_tree['columns'] = columns
+        self.query_tree.column('#0', width=0, stretch=tk.NO)
+        
+        # Clear existing headers
+        for col in self.query_tree['columns']:
+            self.query_tree.heading(col, text='')
+        
+        # Set column headings
+        for col in columns:
+            self.query_tree.column(col, anchor=tk.W, width=100)
+            self.query_tree.heading(col, text=col, anchor=tk.W)
+        
+        # Clear any existing data, including rows from an abandoned query that were still waiting to be drawn
+        self.query_backlog.clear()
+        self.query_tree.delete(*self.query_tree.get_children())
+    
+    def append_query_rows(self, rows):
+        """Queues a chunk of streamed rows - they're drawn a slice per tick so the window stays responsive"""
+        self.query_backlog.extend(rows)
+        if not self.query_rendering:
+            self.query_rendering = True
+            self.root.after(1, self.render_query_rows)
+    
+    def render_query_rows(self):
+        """Inserts the next slice of queued rows and schedules itself again until the queue is empty"""
+        started = time.perf_counter()
+        for _ in range(min(self.query_render_size, len(self.query_backlog))):
+            self.query_tree.insert('', 'end', values=self.query_backlog.popleft())
+        self.query_render_time += time.perf_counter() - started
+        
+        if self.query_backlog:
+            self.root.after(1, self.render_query_rows)
+        else:
+            self.query_rendering = False
+            self.flush_query_render_time()
+    
+    def flush_query_render_time(self):
+        """Charges the drawing time so far to the query's stats (they only exist once its cursor closes)"""
+        job = self.query_job
+        if job is not None and job.stats is not None and self.query_render_time:
+            self.profiler.add_render_time(job.stats, self.query_render_time)
+            self.query_render_time = 0.0
+    
+    def set_slow_threshold(self, event=None):
+        try:
+            self.profiler.slow_threshold = max(float(self.slow_ms_var.get()), 0) / 1000
+        except ValueError:
+            self.slow_ms_var.set(str(int(self.profiler.slow_threshold * 1000)))
+    
+    def refresh_performance(self):
+        """Redraws the statement log from the profiler"""
+        self.perf_version = self.profiler.version
+        self.perf_refreshed = time.perf_counter()
+        
+        self.perf_tree.delete(*self.perf_tree.get_children())
+        self.perf_rows = {}
+        for stats in reversed(self.profiler.snapshot(slow_only=self.slow_only_var.get())):
+            statement = " ".join(stats.sql.split())  # one line
+            if stats.error:
+                statement = f"[{stats.error}] {statement}"
+            tags = ('slow',) if stats.total_time >= self.profiler.slow_threshold else ()
+            item = self.perf_tree.insert('', 'end', tags=tags, values=(
+                time.strftime("%H:%M:%S", time.localtime(stats.started)), stats.source,
+                f"{stats.execute_time * 1000:.1f}", f"{stats.fetch_time * 1000:.1f}", f"{stats.render_time * 1000:.1f}",
+                f"{stats.rows:,}", f"{stats.bytes:,}", statement[:300]))
+            self.perf_rows[item] = stats.sql
+    
+    def clear_performance_log(self):
+        self.profiler.clear()
+        self.refresh_performance()
+    
+    def export_performance_log(self):
+        """Saves the statement log and slow-query log as JSON"""
+        path = filedialog.asksaveasfilename(parent=self.root, title="Export performance log",
+                                            initialfile="query_log.json", defaultextension=".json",
+                                            filetypes=[("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            self.profiler.export_json(path)
+        except OSError as e:
+            messagebox.showerror("Export Error", f"Failed to save the log: {e}")
+            return
+        self.status_var.set(f"Saved performance log to {path}")
+    
+    def release_paused_query(self):
+        """A result waiting on Fetch More holds the query worker - let it go quietly"""
+        if self.query_job is not None and self.query_job.paused:
+            self.query_job.on_error = None
+            self.query_worker.cancel()
+    
+    def explain_query(self, analyze=False):
+        """
+        Shows the plan for the statement selected in the log, or the one in the SQL box.
+        EXPLAIN FORMAT=JSON only plans it; EXPLAIN ANALYZE actually runs it and reports real timings.
+        """
+        selected = self.perf_tree.selection()
+        query = self.perf_rows.get(selected[0]) if selected else self.query_text.get("1.0", tk.END).strip()
+        query = (query or "").strip().rstrip(";")
+        
+        if not query:
+            messagebox.showwarning("Empty Query", "Select a statement in the log or enter one in the SQL Query tab.")
+            return
+        
+        if not self.connect_args:
+            messagebox.showwarning("No Connection", "Please connect to a database first.")
+            return
+        
+        if analyze and query.split()[0].upper() not in ("SELECT", "WITH", "TABLE"):
+            if not messagebox.askyesno("EXPLAIN ANALYZE", "EXPLAIN ANALYZE really runs the statement. Run it anyway?"):
+                return
+        
+        self.release_paused_query()
+        
+        def work(cursor, job):
+            if analyze:
+                cursor.execute(f"EXPLAIN ANALYZE {query}")
+                return analyze_plan_tree(cursor.fetchall()[0][0])
+            cursor.execute(f"EXPLAIN FORMAT=JSON {query}")
+            return json_plan_tree(cursor.fetchall()[0][0])
+        
+        self.run_job(self.query_worker, work, self.show_plan, "Explain Error", "Failed to explain query",
+                     "Explaining query")
+    
+    def show_plan(self, plan):
+        """Fills the plan tree from (label, detail, children) tuples"""
+        self.plan_tree.delete(*self.plan_tree.get_children())
+        
+        def add(parent, node):
+            label, detail, children = node
+            item = self.plan_tree.insert(parent, 'end', text=label, values=(detail,), open=True)
+            for child in children:
+                add(item, child)
+        
+        add('', plan)
+        self.notebook.select(self.performance_tab)
+    
+    def refresh_dashboard(self):
+        """Runs every panel's query at the same time over the async backend, each on its own connection"""
+        if not self.connect_args:
+            messagebox.showwarning("No Connection", "Please connect to a database first.")
+            return
+        if self.snapshot is not None:
+            messagebox.showwarning("Dashboard", "The dashboard runs against a live server - use the SQL Query tab "
+                                   "to report on a snapshot.")
+            return
+        # asyncio and mysql.connector.aio are the slowest imports the app has, so they wait until they're needed
+        from async_backend import AsyncBackend, aio
+        if aio is None:
+            messagebox.showerror("Dashboard", "The dashboard needs a newer mysql-connector-python (with mysql.connector.aio)")
+            return
+        if self.async_backend is None:
+            connect_args = dict(self.connect_args, port=int(self.connect_args['port']))
+            self.async_backend = AsyncBackend(connect_args, self.results, pool_size=self.pool_size, profiler=self.profiler)
+        
+        panels = list(self.dashboard_panels)
+        queries = {i: (panel['sql'], ()) for i, panel in enumerate(panels)}
+        for panel in panels:
+            panel['info_var'].set("Loading...")
+        started = time.perf_counter()
+        
+        def done(results):
+            wall = time.perf_counter() - started
+            for i, (result, elapsed) in results.items():
+                self.show_dashboard_panel(panels[i], result, elapsed)
+            # Panels ran side by side, so the whole refresh takes about as long as the slowest one
+            total = sum(elapsed for _, elapsed in results.values())
+            self.dashboard_info_var.set(f"{len(panels)} panels in {wall:.2f}s ({total:.2f}s if run one by one)")
+        
+        def failed(e):
+            self.dashboard_info_var.set("")
+            messagebox.showerror("Dashboard", f"Failed to refresh the dashboard: {e}")
+        
+        self.async_backend.submit(self.async_backend.gather(queries, max_rows=self.dashboard_max_rows), done, failed)
+    
+    def show_dashboard_panel(self, panel, result, elapsed):
+        """Draws one panel's rows, or its error"""
+        if not panel['frame'].winfo_exists():
+            return  # removed while it was loading
+        tree = panel['tree']
+        tree.delete(*tree.get_children())
+        if isinstance(result, Exception):
+            panel['info_var'].set(f"Error: {result}")
+            return
+        
+        columns, rows = result
+        if columns is None:
+            panel['info_var'].set(f"{rows} rows affected, {elapsed * 1000:.0f} ms")
+            return
+        tree['columns'] = columns
+        tree['show'] = 'headings'
+        for col in columns:
+            tree.heading(col, text=col, anchor=tk.W)
+            tree.column(col, width=90, anchor=tk.W)
+        for row in rows:
+            tree.insert('', 'end', values=["NULL" if value is None else value for value in row])
+        more = "+" if len(rows) == self.dashboard_max_rows else ""
+        panel['info_var'].set(f"{len(rows):,}{more} rows, {elapsed * 1000:.0f} ms")
+    
+    def add_dashboard_panel(self):
+        """Turns whatever is in the SQL Query box into a new panel"""
+        sql = self.query_text.get("1.0", tk.END).strip()
+        if not sql:
+            messagebox.showwarning("Dashboard", "Type the panel's query in the SQL Query tab first.")
+            return
+        if len(split_statements(sql)) != 1:
+            messagebox.showwarning("Dashboard", "A panel runs a single statement.")
+            return
+        title = simpledialog.askstring("Add Panel", "Panel title:", parent=self.root)
+        if not title:
+            return
+        self.make_dashboard_panel(title, sql)
+        self.layout_dashboard()
+        if self.connect_args:
+            self.refresh_dashboard()
+    
+    def remove_dashboard_panel(self, panel):
+        self.dashboard_panels.remove(panel)
+        panel['frame'].destroy()
+        self.layout_dashboard()
+    
+    def ask_export_path(self, name):
+        """Save dialog for exports - the extension picks the format"""
+        filetypes = [("CSV", "*.csv"), ("JSON Lines", "*.jsonl")]
+        if HAVE_PYARROW:
+            filetypes.append(("Parquet", "*.parquet"))
+        return filedialog.asksaveasfilename(parent=self.root, title="Export", initialfile=f"{name}.csv",
+                                            defaultextension=".csv", filetypes=filetypes)
+    
+    def ask_rows_per_file(self):
+        """Returns rows per file, 0 for a single file, or None if the user cancelled"""
+        return simpledialog.askinteger("Split Export", "Rows per file (0 = everything in one file):",
+                                       parent=self.root, initialvalue=0, minvalue=0)
+    
+    def run_export(self, exporter, name, export):
+        """Runs an export on the export worker and shows throughput as it goes"""
+        def work(cursor, job):
+            # Throughput text gets posted after every chunk
+            exporter.on_progress = lambda ex: job.post(self.status_var.set, f"Exporting {name}: {ex.throughput_text()}")
+            return export(cursor, job)
+        
+        def done(result):
+            files = len(exporter.files)
+            self.status_var.set(f"Exported {name} to {files} file{'s' if files != 1 else ''}: {exporter.throughput_text()}")
+            messagebox.showinfo("Export", f"Exported {exporter.rows:,} rows to {exporter.files[0] if files == 1 else f'{files} files'}.")
+        
+        self.run_job(self.bulk_worker, work, done, "Export Error", "Export failed", f"Exporting {name}")
+    
+    def export_table(self):
+        """Exports the whole selected table (not just the rows on screen) to a file"""
+        if self.pager is None or not self.connect_args:
+            messagebox.showwarning("Error", "Please select a table and ensure you're connected.")
+            return
+        
+        pager = self.pager
+        path = self.ask_export_path(pager.table)
+        if not path:
+            return
+        
+        # Pick up an export that got cancelled or crashed part way through
+        resume = False
+        if os.path.exists(path + ".progress"):
+            resume = messagebox.askyesno("Resume Export", "An unfinished export to this file was found. Resume it?")
+        
+        rows_per_file = 0
+        if not resume:
+            rows_per_file = self.ask_rows_per_file()
+            if rows_per_file is None:
+                return
+        
+        try:
+            exporter = Exporter(path, rows_per_file=rows_per_file or None)
+        except ValueError as e:
+            messagebox.showerror("Export Error", str(e))
+            return
+        
+        self.run_export(exporter, pager.table,
+                        lambda cursor, job: exporter.export_table(cursor, pager.table, pager.columns,
+                                                                  pager.key_columns, job, resume))
+    
+    def export_query(self):
+        """Runs the query in the SQL box again and streams its full result to a file"""
+        query = self.query_text.get("1.0", tk.END).strip()
+        
+        if not query:
+            messagebox.showwarning("Empty Query", "Please enter an SQL query.")
+            return
+        
+        if not self.connect_args:
+            messagebox.showwarning("No Connection", "Please connect to a database first.")
+            return
+        
+        statements = split_statements(query)
+        if len(statements) > 1:
+            messagebox.showwarning("Export", "Export works on one query at a time - leave just the SELECT in the box.")
+            return
+        if statements:
+            query = statements[0].sql
+        
+        path = self.ask_export_path("query_results")
+        if not path:
+            return
+        
+        rows_per_file = self.ask_rows_per_file()
+        if rows_per_file is None:
+            return
+        
+        try:
+            exporter = Exporter(path, rows_per_file=rows_per_file or None)
+        except ValueError as e:
+            messagebox.showerror("Export Error", str(e))
+            return
+        
+        self.run_export(exporter, "query results", lambda cursor, job: exporter.export_query(cursor, query, job=job))
+    
+    def import_file(self):
+        """Bulk loads a CSV or JSON Lines file into the selected table"""
+        selected_table = self.table_var.get()
+        
+        if not selected_table or not self.connect_args:
+            messagebox.showwarning("Error", "Please select a table and ensure you're connected.")
+            return
+        
+        path = filedialog.askopenfilename(parent=self.root, title=f"Import into {selected_table}",
+                                          filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl")])
+        if not path:
+            return
+        
+        # Need the column types to check and convert the file's values
+        self.with_schema(selected_table, lambda schema: self.show_import_dialog(schema, path),
+                         "Failed to get table structure")
+    
+    def show_import_dialog(self, schema, path):
+        """Options for a bulk import - batch size, what to do with duplicates, and how to send the rows"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"Import into {schema.name}")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        ttk.Label(dialog, text=os.path.basename(path)).grid(row=0, column=0, columnspan=2, padx=10, pady=5, sticky=tk.W)
+        
+        # Bigger batches mean fewer round trips but bigger transactions
+        ttk.Label(dialog, text="Rows per batch:").grid(row=1, column=0, padx=10, pady=5, sticky=tk.W)
+        batch_var = tk.StringVar(value="1000")
+        ttk.Entry(dialog, textvariable=batch_var, width=10).grid(row=1, column=1, padx=10, pady=5, sticky=tk.W)
+        
+        # What to do when a row's key is already in the table
+        ttk.Label(dialog, text="Duplicate keys:").grid(row=2, column=0, padx=10, pady=5, sticky=tk.W)
+        mode_var = tk.StringVar(value=MODES[0])
+        mode_labels = {'insert': "Fail the row", 'upsert': "Update the existing row", 'ignore': "Skip the row"}
+        for i, mode in enumerate(MODES):
+            ttk.Radiobutton(dialog, text=mode_labels[mode], variable=mode_var, value=mode).grid(
+                row=2 + i, column=1, padx=10, sticky=tk.W)
+        
+        # LOAD DATA is fastest but only works when the server has local_infile switched on
+        ttk.Label(dialog, text="Method:").grid(row=5, column=0, padx=10, pady=5, sticky=tk.W)
+        method_var = tk.StringVar(value="insert")
+        ttk.Radiobutton(dialog, text="Batched INSERT", variable=method_var, value="insert").grid(
+            row=5, column=1, padx=10, sticky=tk.W)
+        load_data = ttk.Radiobutton(dialog, text="LOAD DATA LOCAL INFILE", variable=method_var, value="load_data")
+        load_data.grid(row=6, column=1, padx=10, sticky=tk.W)
+        if not path.lower().endswith('.csv') or self.snapshot is not None:
+            load_data.config(state=tk.DISABLED)
+        
+        def start():
+            try:
+                batch_size = int(batch_var.get())
+                if batch_size < 1:
+                    raise ValueError
+            except ValueError:
+                messagebox.showwarning("Batch Size", "Rows per batch has to be a positive number.", parent=dialog)
+                return
+            
+            importer = BulkImporter(schema, path, mode=mode_var.get(), batch_size=batch_size)
+            dialog.destroy()
+            self.run_import(importer, method_var.get() == "load_data")
+        
+        ttk.Button(dialog, text="Start Import", command=start).grid(row=7, column=0, columnspan=2, pady=10)
+    
+    def run_import(self, importer, use_load_data):
+        """Runs an import on the bulk worker and shows rows/s as it goes"""
+        connect_args = self.connect_args
+        table = importer.schema.name
+        
+        def work(cursor, job):
+            if use_load_data:
+                if BulkImporter.local_infile_allowed(cursor):
+                    return importer.run_load_data(connect_args)
+                # Server won't take local files, batched INSERTs still work everywhere
+                job.post(self.status_var.set, "Server has local_infile switched off, using batched INSERTs")
+            
+            importer.on_progress = lambda imp: job.post(self.status_var.set, f"Importing into {table}: {imp.throughput_text()}")
+            return importer.run(job.conn, cursor, job, job.statements)
+        
+        def done(result):
+            self.result_cache.invalidate(table)
+            self.status_var.set(f"Imported into {table}: {importer.throughput_text()}")
+            
+            message = f"Imported {importer.rows_imported:,} rows into {table}."
+            if importer.ignored_columns:
+                message += f"\n\nColumns not in the table (skipped): {', '.join(importer.ignored_columns)}"
+            if importer.rows_failed:
+                message += f"\n\n{importer.rows_failed:,} rows failed - see {importer.error_path}"
+            if importer.warnings:
+                message += f"\n\nThe server reported {importer.warnings:,} warnings."
+            messagebox.showinfo("Import", message)
+            
+            # Refresh the view if we're still looking at that table
+            if self.table_var.get() == table:
+                self.load_table_data()
+        
+        self.run_job(self.bulk_worker, work, done, "Import Error", "Import failed", f"Importing into {table}")
+    
+    def compare_table(self):
+        """Diffs the selected table against another copy of it, e.g. staging against production"""
+        selected_table = self.table_var.get()
+        
+        if not selected_table or not self.connect_args:
+            messagebox.showwarning("Error", "Please select a table and ensure you're connected.")
+            return
+        if self.snapshot is not None:
+            messagebox.showwarning("Compare", "Compare works between two servers - connect to one of them first.")
+            return
+        
+        self.with_schema(selected_table, self.show_compare_dialog, "Failed to get table structure")
+    
+    def show_compare_dialog(self, schema):
+        """Where the other copy is, and which side is the one to match"""
+        if not schema.primary_key:
+            messagebox.showwarning("Compare", f"{schema.name} has no primary key, so its rows can't be lined up.")
+            return
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title(f"Compare {schema.name}")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        # Same settings as this connection to start with - usually only the host or database differs
+        fields = {}
+        for i, (name, label) in enumerate((('host', "Host:"), ('port', "Port:"), ('user', "Username:"),
+                                           ('password', "Password:"), ('database', "Database:"))):
+            ttk.Label(dialog, text=label).grid(row=i, column=0, padx=10, pady=5, sticky=tk.W)
+            fields[name] = tk.StringVar(value=self.connect_args[name])
+            ttk.Entry(dialog, textvariable=fields[name], width=25,
+                      show="*" if name == 'password' else "").grid(row=i, column=1, padx=10, pady=5)
+        
+        # Decides which way the sync statements go
+        ttk.Label(dialog, text="Make match:").grid(row=5, column=0, padx=10, pady=5, sticky=tk.W)
+        source_var = tk.StringVar(value="this")
+        ttk.Radiobutton(dialog, text="The other copy to this one", variable=source_var, value="this").grid(
+            row=5, column=1, padx=10, sticky=tk.W)
+        ttk.Radiobutton(dialog, text="This copy to the other one", variable=source_var, value="other").grid(
+            row=6, column=1, padx=10, sticky=tk.W)
+        
+        def start():
+            other_args = {name: var.get() for name, var in fields.items()}
+            # Same server and database is the same copy, whatever the password or connection options
+            if all(str(other_args[k]) == str(self.connect_args[k]) for k in ('host', 'port', 'user', 'database')):
+                messagebox.showwarning("Compare", "That's this connection - point it at the other copy.", parent=dialog)
+                return
+            dialog.destroy()
+            self.run_compare(schema, other_args, source_var.get() == "this")
+        
+        ttk.Button(dialog, text="Compare", command=start).grid(row=7, column=0, columnspan=2, pady=10)
+    
+    def run_compare(self, schema, other_args, this_is_source):
+        """Runs the diff on the bulk worker, with its own connection to the other copy"""
+        table = schema.name
+        columns = [col[0] for col in schema.columns]
+        diff = TableDiff(table, columns, schema.primary_key)
+        
+        def work(cursor, job):
+            diff.on_progress = lambda d: job.post(self.status_var.set, f"Comparing {table}: {d.summary()}")
+            with other_connection(other_args) as (other_conn, other_cursor):
+                if this_is_source:
+                    return diff.run(cursor, other_cursor, job)
+                return diff.run(other_cursor, cursor, job)
+        
+        def done(diff):
+            self.status_var.set(f"Compared {table}: {diff.summary()}")
+            self.show_diff_results(diff, other_args, this_is_source)
+        
+        self.run_job(self.bulk_worker, work, done, "Compare Error", "Compare failed", f"Comparing {table}")
+    
+    def show_diff_results(self, diff, other_args, this_is_source):
+        """The rows that differ, with buttons to save or run the statements that sync them"""
+        if not len(diff):
+            messagebox.showinfo("Compare", f"{diff.table} is the same on both sides.\n\n{diff.summary()}")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title(f"Differences in {diff.table}")
+        window.geometry("900x500")
+        
+        ttk.Label(window, text=diff.summary()).pack(fill=tk.X, padx=10, pady=5)
+        
+        tree_frame = ttk.Frame(window)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        tree = ttk.Treeview(tree_frame, columns=diff.columns)
+        tree.heading("#0", text="Difference")
+        tree.column("#0", width=160)
+        for col in diff.columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=100)
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(fill=tk.BOTH, expand=True)
+        
+        # Thousands of differences is still a sync job, but it's not something to read row by row
+        shown = 0
+        limit = 2000
+        for label, rows in (("Missing from target", diff.missing), ("Only in target", diff.extra)):
+            for row in rows[:limit - shown]:
+                tree.insert('', 'end', text=label, values=["NULL" if value is None else value for value in row])
+                shown += 1
+        for source_row, target_row in diff.changed[:max(limit - shown, 0)]:
+            # Target's values go underneath, so the two can be read one above the other
+            item = tree.insert('', 'end', text="Changed (source)",
+                               values=["NULL" if value is None else value for value in source_row])
+            tree.insert(item, 'end', text="target", values=["NULL" if value is None else value for value in target_row])
+            shown += 1
+        if shown < len(diff):
+            ttk.Label(window, text=f"Showing the first {shown:,} of {len(diff):,} differences").pack(padx=10)
+        
+        target = f"{other_args['host']}/{other_args['database']}" if this_is_source else "this connection"
+        buttons = ttk.Frame(window)
+        buttons.pack(fill=tk.X, padx=10, pady=5)
+        ttk.Button(buttons, text="Save Sync Script...", command=lambda: self.save_sync_script(diff, window)).pack(
+            side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text=f"Sync {target}",
+                   command=lambda: self.apply_sync(diff, other_args, this_is_source, target, window)).pack(
+            side=tk.LEFT, padx=5)
+    
+    def save_sync_script(self, diff, window):
+        """Writes the sync statements out as a .sql file to look over (or run) later"""
+        path = filedialog.asksaveasfilename(parent=window, title="Save Sync Script", initialfile=f"sync_{diff.table}.sql",
+                                            defaultextension=".sql", filetypes=[("SQL", "*.sql")])
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(diff.sync_script())
+        except OSError as e:
+            messagebox.showerror("Save Error", f"Failed to save the script: {e}", parent=window)
+            return
+        self.status_var.set(f"Saved the sync script for {diff.table} to {path}")
+    
+    def apply_sync(self, diff, other_args, this_is_source, target, window):
+        """Runs the sync statements on the target side, all in one transaction"""
+        if not messagebox.askyesno("Confirm Sync", f"Change {len(diff):,} rows of {diff.table} on {target}?",
+                                   parent=window):
+            return
+        table = diff.table
+        
+        def work(cursor, job):
+            if not this_is_source:
+                return diff.apply(job.conn, cursor)
+            with other_connection(other_args) as (other_conn, other_cursor):
+                return diff.apply(other_conn, other_cursor)
+        
+        def done(affected):
+            window.destroy()
+            self.status_var.set(f"Synced {table} on {target}: {affected:,} rows affected")
+            if not this_is_source:
+                # Our copy just changed under the cache and the view
+                self.result_cache.invalidate(table)
+                if self.table_var.get() == table:
+                    self.load_table_data()
+        
+        self.run_job(self.bulk_worker, work, done, "Sync Error", "Sync failed", f"Syncing {table}")
\ No newline at end of file
@@ -0,0 +1,332 @@
+"""
+exporter.py
+Streams a table or query result straight from the server into CSV, JSON Lines
+or Parquet without ever holding more than one chunk of rows in memory.
+
+Rows come off an unbuffered cursor with fetchmany, so memory stays flat
+whether the table has a thousand rows or fifty million. Big exports can be
+split into several files, and table exports write a small .progress file as
+they go so a cancelled or crashed export can pick up where it left off.
+"""
+
+import csv
+import datetime
+import decimal
+import importlib.util
+import json
+import os
+import time
+
+from statement_cache import quote_identifier
+from table_pager import keyset_condition
+
+# Parquet is optional - only offered when pyarrow is installed. Importing it takes longer than
+# starting the rest of the app, so that waits for the first Parquet export (load_pyarrow)
+HAVE_PYARROW = importlib.util.find_spec("pyarrow") is not None
+pyarrow = None
+
+FORMATS = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.parquet': 'parquet',
+}
+
+
+def format_for_path(path):
+    """Works out the export format from the file extension"""
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Don't know how to export to {path} - use .csv, .jsonl or .parquet")
+    if fmt == 'parquet' and not HAVE_PYARROW:
+        raise ValueError("Parquet export needs pyarrow (pip install pyarrow)")
+    return fmt
+
+
+def load_pyarrow():
+    global pyarrow
+    if pyarrow is None:
+        import pyarrow.parquet  # binds pyarrow, with its parquet module loaded
+    return pyarrow
+
+
+def json_value(value):
+    """Turns MySQL values json can't handle (dates, decimals, bytes) into something it can"""
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return str(value)
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    return value
+
+
+class CsvWriter:
+    def __init__(self, path, columns, append=False):
+        self.file = open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        if not append:
+            self.writer.writerow(columns)
+    
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+    
+    def tell(self):
+        self.file.flush()
+        return self.file.tell()
+    
+    def close(self):
+        self.file.close()
+
+
+class JsonLinesWriter:
+    def __init__(self, path, columns, append=False):
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+        self.columns = columns
+    
+    def write_rows(self, rows):
+        self.file.writelines(
+            json.dumps(dict(zip(self.columns, row)), default=json_value) + "\n" for row in rows
+        )
+    
+    def tell(self):
+        self.file.flush()
+        return self.file.tell()
+    
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    def __init__(self, path, columns, append=False):
+        # Parquet files can't be appended to, so a resumed export rewrites the unfinished part
+        self.path = path
+        self.columns = columns
+        self.writer = None  # created with the first chunk so pyarrow can work out the column types
+        self.schema = None
+        load_pyarrow()
+    
+    def write_rows(self, rows):
+        data = {col: [json_value(row[i]) for row in rows] for i, col in enumerate(self.columns)}
+        if self.writer is None:
+            table = pyarrow.table(data)
+            # A column that's all NULL in the first chunk has no type yet - strings are the safe bet
+            fields = [pyarrow.field(f.name, pyarrow.string()) if pyarrow.types.is_null(f.type) else f
+                      for f in table.schema]
+            self.schema = pyarrow.schema(fields)
+            self.writer = pyarrow.parquet.ParquetWriter(self.path, self.schema)
+        table = pyarrow.table(data, schema=self.schema)
+        self.writer.write_table(table)
+    
+    def tell(self):
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+    
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+WRITERS = {'csv': CsvWriter, 'jsonl': JsonLinesWriter, 'parquet': ParquetWriter}
+
+
+class Exporter:
+    """Streams rows from a cursor into one or more files"""
+    
+    def __init__(self, path, chunk_size=5000, rows_per_file=None, on_progress=None):
+        self.path = path
+        self.fmt = format_for_path(path)
+        self.chunk_size = chunk_size  # rows per fetchmany
+        self.rows_per_file = rows_per_file  # None = everything in one file
+        self.on_progress = on_progress  # on_progress(exporter) after every chunk - called on the worker thread
+        
+        self.rows = 0
+        self.bytes_done = 0  # bytes in files that are already closed
+        self.files = []
+        self.started = None
+        
+        self.writer = None
+        self.part = 0
+        self.rows_in_part = 0
+        
+        # For checkpoints - key of the last row written, and where the current part started
+        self.key_indexes = None
+        self.last_key = None
+        self.part_start_key = None
+        self.rows_before_part = 0
+    
+    @property
+    def checkpoint_path(self):
+        return self.path + ".progress"
+    
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started if self.started else 0.0
+    
+    @property
+    def bytes_written(self):
+        return self.bytes_done + (self.writer.tell() if self.writer else 0)
+    
+    def throughput_text(self):
+        """e.g. '120,000 rows, 45,000 rows/s, 12.3 MB/s'"""
+        elapsed = max(self.elapsed, 1e-6)
+        return (f"{self.rows:,} rows, {self.rows / elapsed:,.0f} rows/s, "
+                f"{self.bytes_written / elapsed / 1_000_000:.1f} MB/s")
+    
+    def part_path(self, part):
+        """File name for a part - only numbered when splitting or resuming"""
+        if part == 0 and not self.rows_per_file:
+            return self.path
+        base, ext = os.path.splitext(self.path)
+        return f"{base}_{part + 1:04d}{ext}"
+    
+    def row_key(self, row):
+        if not self.key_indexes:
+            return None
+        return [json_value(row[i]) for i in self.key_indexes]
+    
+    def open_part(self, columns, append=False):
+        path = self.part_path(self.part)
+        self.writer = WRITERS[self.fmt](path, columns, append=append)
+        if path not in self.files:
+            self.files.append(path)
+        if not append:
+            self.part_start_key = self.last_key
+            self.rows_before_part = self.rows
+    
+    def close_part(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.bytes_done += os.path.getsize(self.part_path(self.part))
+    
+    def write_chunk(self, columns, rows):
+        """Writes a chunk, starting new files whenever the current one is full"""
+        while rows:
+            if self.writer is None:
+                self.open_part(columns)
+            room = len(rows)
+            if self.rows_per_file:
+                room = min(room, self.rows_per_file - self.rows_in_part)
+            self.writer.write_rows(rows[:room])
+            self.rows += room
+            self.rows_in_part += room
+            self.last_key = self.row_key(rows[room - 1])
+            rows = rows[room:]
+            
+            if self.rows_per_file and self.rows_in_part >= self.rows_per_file:
+                self.close_part()
+                self.part += 1
+                self.rows_in_part = 0
+    
+    def stream(self, cursor, job=None, checkpoints=False):
+        """Pulls rows off an already executed cursor chunk by chunk until it runs dry"""
+        columns = [col[0] for col in cursor.description]
+        while True:
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            self.write_chunk(columns, rows)
+            if checkpoints:
+                self.save_checkpoint()
+            if job is not None:
+                job.rows_received = self.rows
+                job.check_cancelled()
+            if self.on_progress:
+                self.on_progress(self)
+    
+    def export_query(self, cursor, query, params=(), job=None):
+        """Exports whatever a query returns (no resume support - we can't tell where it stopped)"""
+        self.started = time.perf_counter()
+        try:
+            cursor.execute(query, params)
+            if not cursor.with_rows:
+                raise ValueError("That statement doesn't return any rows to export")
+            self.stream(cursor, job)
+        finally:
+            self.close_part()
+        return self
+    
+    def export_table(self, cursor, table, columns, key_columns, job=None, resume=False):
+        """
+        Exports a whole table in primary key order.
+        Saves a checkpoint after every chunk, and picks up from it when resume is True.
+        Tables without a primary key can still be exported, just not resumed.
+        """
+        self.started = time.perf_counter()
+        self.key_indexes = [columns.index(col) for col in key_columns]
+        start_key = None
+        append = False
+        
+        checkpoint = self.load_checkpoint() if resume and key_columns else None
+        if checkpoint:
+            self.rows_per_file = checkpoint['rows_per_file']
+            self.part = checkpoint['part']
+            self.files = checkpoint['files']
+            if not checkpoint['rows_in_part']:
+                # Stopped right after finishing a file, just start the next one
+                self.rows = checkpoint['rows']
+                start_key = checkpoint['last_key']
+            elif self.fmt == 'parquet':
+                # A parquet file is only readable once it's closed, so redo the unfinished part from its start
+                self.rows = checkpoint['rows_before_part']
+                start_key = checkpoint['part_start_key']
+            else:
+                # Cut off anything written after the last checkpoint, then keep appending
+                self.rows = checkpoint['rows']
+                self.rows_in_part = checkpoint['rows_in_part']
+                start_key = checkpoint['last_key']
+                self.part_start_key = checkpoint['part_start_key']
+                self.rows_before_part = checkpoint['rows_before_part']
+                with open(self.part_path(self.part), 'r+b') as f:
+                    f.truncate(checkpoint['part_bytes'])
+                append = True
+            self.last_key = start_key
+            current = self.part_path(self.part)
+            self.bytes_done = sum(os.path.getsize(p) for p in self.files if p != current and os.path.exists(p))
+        
+        query = f"SELECT * FROM {quote_identifier(table)}"
+        params = []
+        if start_key is not None:
+            # Same keyset condition the pager uses, so it's an index range scan
+            condition, params = keyset_condition(key_columns, '>', start_key)
+            query += f" WHERE {condition}"
+        if key_columns:
+            query += " ORDER BY " + ", ".join(map(quote_identifier, key_columns))
+        
+        try:
+            cursor.execute(query, params)
+            if append:
+                self.open_part(columns, append=True)
+            self.stream(cursor, job, checkpoints=bool(key_columns))
+        finally:
+            self.close_part()
+        
+        # Finished - nothing left to resume
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        return self
+    
+    def load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, encoding='utf-8') as f:
+            return json.load(f)
+    
+    def save_checkpoint(self):
+        checkpoint = {
+            'rows': self.rows,
+            'rows_per_file': self.rows_per_file,
+            'part': self.part,
+            'rows_in_part': self.rows_in_part,
+            'part_bytes': self.writer.tell() if self.writer else 0,
+            'files': self.files,
+            'last_key': self.last_key,
+            'part_start_key': self.part_start_key,
+            'rows_before_part': self.rows_before_part,
+        }
+        # Write then rename so a crash never leaves a half written checkpoint
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
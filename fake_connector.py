@@ -0,0 +1,395 @@
+"""
+fake_connector.py
+A stand-in for a MySQL server for benchmarks, headless runs and opened
+snapshots (snapshot.py), backed by a SQLite file. Connections and cursors look enough like mysql.connector's
+that TablePager, PendingChanges, SchemaCache, ResultCache and TableGateway
+run on them unchanged.
+
+The SQL the app sends is nearly all plain enough for SQLite as it is. The
+rest is handled here: %s placeholders, SET statements, MySQL's backslash
+LIKE escape, EXPLAIN and CHECKSUM TABLE, and the information_schema tables,
+which are rebuilt from SQLite's pragmas when something asks for them.
+Numbers from it are for comparing runs of the app's own code, not for
+guessing how fast a real server would be - though latency= adds a fixed
+delay per statement to stand in for the network round trip.
+"""
+
+import datetime
+import decimal
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import mysql.connector
+
+from script_runner import split_statements
+
+# SQLite doesn't know what to do with these out of the box
+sqlite3.register_adapter(decimal.Decimal, str)
+sqlite3.register_adapter(datetime.date, datetime.date.isoformat)
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(datetime.timedelta, str)  # TIME columns
+
+PLACEHOLDER = re.compile(r"%(s|%)")
+LIKE_PARAM = re.compile(r"\bLIKE \?", re.IGNORECASE)
+ISNULL_CALL = re.compile(r"\bISNULL\(", re.IGNORECASE)  # ISNULL is an operator keyword in SQLite
+WRITE_TABLE = re.compile(r"^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|REPLACE\s+INTO)\s+(`(?:[^`]|``)+`|[A-Za-z0-9_$]+)",
+                         re.IGNORECASE)
+DDL = re.compile(r"^\s*(?:CREATE|ALTER|DROP|RENAME)\b", re.IGNORECASE)
+FROM_TABLE = re.compile(r"\bFROM\s+(`(?:[^`]|``)+`|[A-Za-z0-9_$]+)", re.IGNORECASE)
+DATETIME_TEXT = re.compile(r"^\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d(\.\d+)?$")
+EXPLAIN_COLUMNS = ('id', 'select_type', 'table', 'partitions', 'type', 'possible_keys', 'key',
+                   'key_len', 'ref', 'rows', 'filtered', 'Extra')
+
+INFORMATION_SCHEMA = [
+    "CREATE TABLE information_schema.TABLES (TABLE_SCHEMA, TABLE_NAME, TABLE_TYPE, ENGINE, TABLE_ROWS, "
+    "AVG_ROW_LENGTH, DATA_LENGTH, INDEX_LENGTH, UPDATE_TIME)",
+    "CREATE TABLE information_schema.COLUMNS (TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION, "
+    "COLUMN_TYPE, DATA_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_DEFAULT, EXTRA)",
+    "CREATE TABLE information_schema.STATISTICS (TABLE_SCHEMA, TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX, "
+    "COLUMN_NAME, NON_UNIQUE)",
+    "CREATE TABLE information_schema.KEY_COLUMN_USAGE (TABLE_SCHEMA, TABLE_NAME, CONSTRAINT_NAME, "
+    "ORDINAL_POSITION, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME)",
+]
+
+
+def unquote(name):
+    """A name as WRITE_TABLE or FROM_TABLE matched it, without MySQL's backquotes"""
+    return name[1:-1].replace('``', '`') if name.startswith('`') else name
+
+
+def sqlite_name(name):
+    """A table or index name quoted for SQLite - snapshots keep MySQL's names, 'order' and 'order-items' included"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+class BitXor:
+    """MySQL's BIT_XOR aggregate"""
+    
+    def __init__(self):
+        self.value = 0
+    
+    def step(self, value):
+        if value is not None:
+            self.value ^= int(value)
+    
+    def finalize(self):
+        return self.value
+
+
+def mysql_error(e):
+    """Same kind of exception the real connector raises, so the app's error handling sees what it expects"""
+    if isinstance(e, sqlite3.IntegrityError):
+        return mysql.connector.errors.IntegrityError(msg=str(e))
+    if isinstance(e, sqlite3.OperationalError):
+        return mysql.connector.errors.ProgrammingError(msg=str(e))
+    return mysql.connector.errors.DatabaseError(msg=str(e))
+
+
+class FakeServer:
+    """One SQLite file playing the part of one MySQL database"""
+    
+    def __init__(self, path, database="clothing_retail_store", latency=0.0, hidden_tables=()):
+        self.path = path
+        self.database = database
+        self.latency = latency  # seconds added to every statement
+        self.hidden_tables = tuple(hidden_tables)  # bookkeeping tables left out of information_schema
+        self.update_times = {}  # table -> when we last wrote to it, for UPDATE_TIME
+        self.lock = threading.Lock()
+        self.statements = 0
+        self.generation = 0  # bumped on every write or DDL, so connections know their information_schema is stale
+        self.threads_running = 1  # what SHOW GLOBAL STATUS says - raise it to see bulk jobs back off
+    
+    def connect(self, **connect_args):
+        """Takes (and ignores) the same arguments as mysql.connector.connect"""
+        return FakeConnection(self)
+    
+    def wrote(self, table=None):
+        with self.lock:
+            if table is not None:
+                self.update_times[table] = datetime.datetime.now().replace(microsecond=0)
+            self.generation += 1
+    
+    def remove(self):
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            try:
+                os.remove(self.path + suffix)
+            except OSError:
+                pass
+
+
+class FakeConnection:
+    def __init__(self, server):
+        self.server = server
+        self.database = server.database
+        # Python's default isolation level starts a transaction before the first write, like autocommit=0
+        self.db = sqlite3.connect(server.path, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = OFF")
+        self.db.execute("ATTACH DATABASE ':memory:' AS information_schema")
+        for ddl in INFORMATION_SCHEMA:
+            self.db.execute(ddl)
+        self.db.create_function("DATABASE", 0, lambda: server.database)
+        self.db.create_function("CHAR_LENGTH", 1, lambda text: None if text is None else len(str(text)))
+        self.db.create_function("NOW", 0, lambda: datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        
+        # What the checksums (Refresh Changed, table diffs) are made of
+        self.db.create_function("CONCAT_WS", -1, lambda sep, *values: sep.join(str(v) for v in values if v is not None))
+        self.db.create_function("MYSQL_ISNULL", 1, lambda value: int(value is None))
+        self.db.create_function("CRC32", 1, lambda text: None if text is None else zlib.crc32(str(text).encode()))
+        self.db.create_function("MD5", 1, lambda text: None if text is None else hashlib.md5(str(text).encode()).hexdigest())
+        self.db.create_function("CONV", 3, lambda text, base, to: None if text is None else str(int(str(text), base)))
+        self.db.create_aggregate("BIT_XOR", 1, BitXor)
+        self.connected = True
+        self.connection_id = None  # no server session to KILL QUERY on
+        self.generation = None  # server generation our information_schema tables were built at
+    
+    @property
+    def autocommit(self):
+        return self.db.isolation_level is None
+    
+    @autocommit.setter
+    def autocommit(self, value):
+        self.db.commit()
+        self.db.isolation_level = None if value else ""
+    
+    @property
+    def in_transaction(self):
+        return self.db.in_transaction
+    
+    def cursor(self, **kwargs):
+        return FakeCursor(self)
+    
+    def start_transaction(self):
+        if not self.db.in_transaction:
+            self.db.execute("BEGIN")
+    
+    def commit(self):
+        self.db.commit()
+    
+    def rollback(self):
+        self.db.rollback()
+    
+    def is_connected(self):
+        return self.connected
+    
+    def ping(self, reconnect=False, attempts=1, delay=0):
+        if not self.connected:
+            raise mysql.connector.errors.InterfaceError(msg="Connection is closed")
+    
+    def reconnect(self, attempts=1, delay=0):
+        self.db.rollback()
+        self.db.isolation_level = ""
+    
+    def consume_results(self):
+        pass  # SQLite cursors don't hold the connection up
+    
+    def close(self):
+        if self.connected:
+            self.db.close()
+            self.connected = False
+    
+    def refresh_information_schema(self):
+        """Rebuilds the information_schema tables from SQLite's own catalogue, if anything changed since last time"""
+        generation = self.server.generation
+        if generation == self.generation:
+            return
+        db = self.db
+        schema = self.database
+        level = db.isolation_level
+        if not db.in_transaction:
+            db.isolation_level = None  # don't leave a transaction open just because we looked something up
+        try:
+            self.fill_information_schema(schema)
+        finally:
+            db.isolation_level = level
+        self.generation = generation
+    
+    def fill_information_schema(self, schema):
+        db = self.db
+        for table in ('TABLES', 'COLUMNS', 'STATISTICS', 'KEY_COLUMN_USAGE'):
+            db.execute(f"DELETE FROM information_schema.{table}")
+        
+        tables = [row[0] for row in db.execute(
+            "SELECT name FROM main.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        ) if row[0] not in self.server.hidden_tables]
+        for table in tables:
+            # max(rowid) is instant and about as good as InnoDB's estimate
+            estimate = db.execute(f"SELECT max(rowid) FROM main.{sqlite_name(table)}").fetchone()[0] or 0
+            updated = self.server.update_times.get(table)
+            # Sizes are left NULL - SQLite can only tell us those with the dbstat extension
+            db.execute("INSERT INTO information_schema.TABLES VALUES (?, ?, 'BASE TABLE', 'SQLite', ?, NULL, NULL, NULL, ?)",
+                       (schema, table, estimate, updated.strftime("%Y-%m-%d %H:%M:%S") if updated else None))
+            
+            columns = db.execute(f"PRAGMA main.table_info({sqlite_name(table)})").fetchall()
+            key = sorted((col for col in columns if col[5]), key=lambda col: col[5])
+            rowid_key = len(key) == 1 and key[0][2].upper() == 'INTEGER'
+            for cid, name, col_type, notnull, default, pk in columns:
+                col_type = 'int' if col_type.upper() == 'INTEGER' else col_type.lower()
+                db.execute(
+                    "INSERT INTO information_schema.COLUMNS VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (schema, table, name, cid + 1, col_type, col_type.split('(')[0],
+                     'NO' if notnull or pk else 'YES', 'PRI' if pk else '', default,
+                     'auto_increment' if pk and rowid_key else '')
+                )
+            for seq, col in enumerate(key, 1):
+                db.execute("INSERT INTO information_schema.STATISTICS VALUES (?, ?, 'PRIMARY', ?, ?, 0)",
+                           (schema, table, seq, col[1]))
+            
+            for _, index, unique, origin, _ in db.execute(f"PRAGMA main.index_list({sqlite_name(table)})").fetchall():
+                if origin == 'pk':
+                    continue
+                for seq, (_, _, name) in enumerate(db.execute(f"PRAGMA main.index_info({sqlite_name(index)})").fetchall(), 1):
+                    db.execute("INSERT INTO information_schema.STATISTICS VALUES (?, ?, ?, ?, ?, ?)",
+                               (schema, table, index, seq, name, 0 if unique else 1))
+            
+            for fk in db.execute(f"PRAGMA main.foreign_key_list({sqlite_name(table)})").fetchall():
+                fk_id, seq, ref_table, column, ref_column = fk[:5]
+                db.execute("INSERT INTO information_schema.KEY_COLUMN_USAGE VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           (schema, table, f"{table}_ibfk_{fk_id + 1}", seq + 1, column, ref_table, ref_column))
+
+
+class FakeCursor:
+    """Just the parts of MySQLCursor the app uses"""
+    
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.db.cursor()
+        self.rows = None  # result made up here instead of by SQLite (EXPLAIN, CHECKSUM TABLE, SET)
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = None
+        self.pending = []  # rest of a multi-statement execute, run one at a time by nextset()
+        self.fix_dates = False
+    
+    @property
+    def with_rows(self):
+        return self.description is not None
+    
+    def execute(self, operation, params=()):
+        if params is None:
+            params = ()
+        statements = [operation]
+        if ";" in operation and not params:
+            statements = [statement.sql for statement in split_statements(operation)] or [operation]
+        self.pending = statements[1:]
+        self.run(statements[0], params)
+    
+    def executemany(self, operation, seq_params):
+        server = self.conn.server
+        sql = self.translate(operation)
+        if server.latency:
+            time.sleep(server.latency)
+        try:
+            self.cursor.executemany(sql, seq_params)
+        except sqlite3.Error as e:
+            raise mysql_error(e) from e
+        self.rows = None
+        self.description = None
+        self.rowcount = self.cursor.rowcount
+        self.note_write(operation)
+    
+    def nextset(self):
+        if not self.pending:
+            return None
+        self.run(self.pending.pop(0), ())
+        return True
+    
+    @staticmethod
+    def translate(sql):
+        sql = PLACEHOLDER.sub(lambda match: "?" if match.group(1) == 's' else "%", sql)
+        sql = ISNULL_CALL.sub("MYSQL_ISNULL(", sql)
+        return LIKE_PARAM.sub(r"LIKE ? ESCAPE '\\'", sql)
+    
+    def note_write(self, sql):
+        match = WRITE_TABLE.match(sql)
+        if match:
+            self.conn.server.wrote(unquote(match.group(1)))
+        elif DDL.match(sql):
+            self.conn.server.wrote()
+    
+    def made_up(self, columns, rows):
+        self.rows = list(rows)
+        self.description = [(name, None, None, None, None, None, True) for name in columns] if columns else None
+        self.rowcount = len(self.rows) if columns else 0
+    
+    def run(self, operation, params):
+        server = self.conn.server
+        server.statements += 1
+        if server.latency:
+            time.sleep(server.latency)
+        
+        self.rows = None
+        self.fix_dates = False
+        words = operation.lstrip().split(None, 2)
+        keyword = words[0].upper() if words else ""
+        
+        if keyword == 'SET':
+            match = re.match(r"\s*SET\s+(?:SESSION\s+)?autocommit\s*=\s*(\d)", operation, re.IGNORECASE)
+            if match:
+                self.conn.autocommit = bool(int(match.group(1)))
+            self.made_up(None, [])
+            return
+        if keyword == 'SHOW' and 'Threads_running' in operation:
+            self.made_up(('Variable_name', 'Value'), [('Threads_running', str(server.threads_running))])
+            return
+        if keyword == 'CHECKSUM':
+            # Returning NULL is what MySQL does for tables it can't checksum - callers fall back on UPDATE_TIME
+            self.made_up(('Table', 'Checksum'), [(words[2].strip('`; '), None)])
+            return
+        if keyword == 'EXPLAIN' and len(words) > 1 and words[1].upper() == 'SELECT':
+            match = FROM_TABLE.search(operation)
+            table = unquote(match.group(1)) if match else None
+            estimate = self.cursor.execute(f"SELECT max(rowid) FROM {sqlite_name(table)}").fetchone()[0] if table else 0
+            self.made_up(EXPLAIN_COLUMNS, [(1, 'SIMPLE', table, None, 'ALL', None, None, None, None,
+                                            estimate or 0, 10.0, 'Using where')])
+            return
+        
+        if 'information_schema' in operation:
+            self.conn.refresh_information_schema()
+            self.fix_dates = True  # MySQL hands back datetimes here, SQLite hands back text
+        try:
+            self.cursor.execute(self.translate(operation), params)
+        except sqlite3.Error as e:
+            raise mysql_error(e) from e
+        self.description = self.cursor.description
+        self.rowcount = self.cursor.rowcount
+        self.lastrowid = self.cursor.lastrowid
+        self.note_write(operation)
+    
+    def convert(self, rows):
+        if not self.fix_dates:
+            return rows
+        return [tuple(datetime.datetime.fromisoformat(value)
+                      if isinstance(value, str) and DATETIME_TEXT.match(value) else value
+                      for value in row) for row in rows]
+    
+    def fetchall(self):
+        if self.rows is not None:
+            rows, self.rows = self.rows, []
+            return rows
+        if self.description is None:
+            return []
+        return self.convert(self.cursor.fetchall())
+    
+    def fetchmany(self, size=1):
+        if self.rows is not None:
+            rows, self.rows = self.rows[:size], self.rows[size:]
+            return rows
+        if self.description is None:
+            return []
+        return self.convert(self.cursor.fetchmany(size))
+    
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+    
+    def __iter__(self):
+        return iter(self.fetchone, None)
+    
+    def close(self):
+        self.cursor.close()
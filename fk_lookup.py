@@ -0,0 +1,118 @@
+"""
+fk_lookup.py
+Type-ahead lookups for foreign key fields in the Add and Edit dialogs, so
+nobody has to go and look a customer_id up in the SQL Query tab first.
+
+Which columns are foreign keys comes from the schema cache, which reads
+information_schema.KEY_COLUMN_USAGE along with everything else. A lookup
+searches the referenced table with prefix matches on the key and on its
+indexed text columns - LIKE 'text%' on an indexed column is a range scan of
+the index, and LIMIT stops it after a screenful - and the answers are kept
+in a small LRU for the rest of the session, so typing the same prefix again,
+or opening the next dialog, doesn't go back to the server.
+"""
+
+import collections
+import threading
+import time
+
+from importer import converter_for
+from statement_cache import quote_identifier
+from table_pager import like_escape
+
+TEXT_TYPES = ('char', 'varchar', 'tinytext', 'text', 'mediumtext', 'longtext', 'enum', 'set')
+
+
+def single_column_keys(schema):
+    """{column: foreign key} for the table's foreign keys - composite ones are left out, one field can't fill them"""
+    sizes = collections.Counter(fk['name'] for fk in schema.foreign_keys)
+    return {fk['column']: fk for fk in schema.foreign_keys if sizes[fk['name']] == 1}
+
+
+def text_columns(schema, key_column):
+    """A table's text columns other than key_column - the first couple get shown next to each key"""
+    return [col[0] for col in schema.columns
+            if col[0] != key_column and col[1].split('(')[0].split()[0].lower() in TEXT_TYPES]
+
+
+class ReferenceLookup:
+    """Searches the tables foreign keys point at, remembering recent answers"""
+    
+    def __init__(self, schema_cache, limit=20, max_entries=256, ttl=120):
+        self.schema_cache = schema_cache
+        self.limit = limit  # matches shown in the dropdown
+        self.max_entries = max_entries
+        self.ttl = ttl  # seconds before an answer is looked up again, so new rows turn up eventually
+        self.entries = collections.OrderedDict()  # (table, column, text) -> (when, matches), least recently used first
+        self.lock = threading.Lock()  # searched on worker threads, read from the Tk thread
+        self.hits = 0
+        self.misses = 0
+    
+    def cached(self, table, column, text):
+        """Matches from the cache, or None - never touches the database"""
+        key = (table, column, text)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def search(self, cursor, table, column, text):
+        """
+        [(key value, label), ...] for rows of table whose column or indexed text columns start with text.
+        Each search is a few LIMITed index range scans - only when the table has no indexed text
+        column at all does it fall back on a prefix match of its first one, which stops at the LIMIT.
+        """
+        matches = self.cached(table, column, text)
+        if matches is not None:
+            return matches
+        
+        schema = self.schema_cache.get(cursor, table)
+        texts = text_columns(schema, column)
+        labels = texts[:2]  # enough to tell the rows apart
+        select = ", ".join(quote_identifier(col) for col in [column] + labels)
+        
+        searches = []  # (condition, params, column to order by)
+        if not text:
+            searches.append(("", [], column))
+        else:
+            col_type = next(col[1] for col in schema.columns if col[0] == column)
+            try:
+                value = converter_for(col_type)(text)
+            except ValueError:
+                value = None
+            if isinstance(value, str):
+                searches.append((f"{quote_identifier(column)} LIKE %s", [like_escape(text) + "%"], column))
+            elif value is not None:
+                # Numbers don't have prefixes an index can use - start at the number typed and carry on up
+                searches.append((f"{quote_identifier(column)} >= %s", [value], column))
+            
+            indexed = schema.indexed_prefixes()
+            searchable = [col for col in texts if col in indexed] or texts[:1]
+            for col in searchable:
+                searches.append((f"{quote_identifier(col)} LIKE %s", [like_escape(text) + "%"], col))
+        
+        found = {}
+        for condition, params, order_column in searches:
+            where = f" WHERE {condition}" if condition else ""
+            cursor.execute(f"SELECT {select} FROM {quote_identifier(table)}{where} "
+                           f"ORDER BY {quote_identifier(order_column)} LIMIT %s", params + [self.limit])
+            for row in cursor.fetchall():
+                found.setdefault(row[0], " ".join(str(value) for value in row[1:] if value is not None))
+            if len(found) >= self.limit:
+                break
+        matches = list(found.items())[:self.limit]
+        
+        with self.lock:
+            self.misses += 1
+            self.entries[(table, column, text)] = (time.monotonic(), matches)
+            self.entries.move_to_end((table, column, text))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return matches
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
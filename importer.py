@@ -0,0 +1,345 @@
+"""
+importer.py
+Bulk loads CSV or JSON Lines files into a table.
+
+Rows are read and converted a batch at a time, one column at a time, using
+the column types from the schema cache. Each batch goes to the server as a
+single multi-row INSERT and is committed on its own, so a 100k row file is
+100 round trips instead of 100k. Rows that fail conversion (or that the
+server rejects) are written to a side file instead of stopping the import.
+LOAD DATA LOCAL INFILE is also supported for CSV when the server allows it.
+"""
+
+import csv
+import datetime
+import decimal
+import json
+import os
+import re
+import time
+
+import mysql.connector
+
+from connection_pool import open_connection
+from statement_cache import quote_identifier
+
+MODES = ('insert', 'upsert', 'ignore')
+
+
+def read_batches(path, batch_size):
+    """Yields lists of dicts (source column -> text/value) from a CSV or JSON Lines file"""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8') as f:
+        if ext == '.csv':
+            records = csv.DictReader(f)
+        elif ext == '.jsonl':
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            raise ValueError(f"Can't import {path} - use a .csv or .jsonl file")
+        
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def converter_for(column_type):
+    """Returns a function that turns a text value into the right Python type for a MySQL column type"""
+    base = column_type.split('(')[0].split()[0].lower()
+    
+    if base in ('tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint', 'year', 'bit', 'bool', 'boolean'):
+        return int
+    if base in ('decimal', 'numeric'):
+        return decimal.Decimal
+    if base in ('float', 'double', 'real'):
+        return float
+    if base == 'date':
+        return datetime.date.fromisoformat
+    if base in ('datetime', 'timestamp'):
+        return datetime.datetime.fromisoformat
+    if base == 'enum':
+        allowed = set(re.findall(r"'((?:[^']|'')*)'", column_type))
+        
+        def enum_value(value):
+            if value not in allowed:
+                raise ValueError(value)
+            return value
+        return enum_value
+    return str
+
+
+class BulkImporter:
+    """Validates rows against a table's schema and inserts them in batches"""
+    
+    def __init__(self, schema, path, mode='insert', batch_size=1000, on_progress=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown import mode {mode}")
+        self.schema = schema  # TableSchema from the schema cache
+        self.path = path
+        self.mode = mode  # insert (fail on duplicates), upsert (ON DUPLICATE KEY UPDATE) or ignore (INSERT IGNORE)
+        self.batch_size = batch_size
+        self.on_progress = on_progress  # on_progress(importer) after every batch - called on the worker thread
+        
+        self.error_path = os.path.splitext(path)[0] + ".errors.csv"
+        self.error_file = None
+        self.error_writer = None
+        
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.rows_failed = 0
+        self.warnings = 0  # LOAD DATA reports problems as warnings instead of failed rows
+        self.started = None
+        
+        self.mapping = None  # source column -> table column
+        self.statements = None  # StatementCache for the connection run() is using
+        self.ignored_columns = []  # source columns with no matching table column
+    
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started if self.started else 0.0
+    
+    def throughput_text(self):
+        elapsed = max(self.elapsed, 1e-6)
+        text = f"{self.rows_imported:,} rows imported, {self.rows_imported / elapsed:,.0f} rows/s"
+        if self.rows_failed:
+            text += f", {self.rows_failed:,} failed"
+        if self.warnings:
+            text += f", {self.warnings:,} warnings"
+        return text
+    
+    def map_columns(self, source_columns):
+        """Matches file columns to table columns by name (ignoring case)"""
+        by_name = {name.lower(): name for name in self.schema.column_names}
+        self.mapping = {}
+        self.ignored_columns = []
+        for source in source_columns:
+            target = by_name.get(source.strip().lower())
+            if target is None:
+                self.ignored_columns.append(source)
+            else:
+                self.mapping[source] = target
+        if not self.mapping:
+            raise ValueError("None of the columns in the file match the table")
+    
+    def convert_batch(self, records):
+        """
+        Converts a batch column by column.
+        Returns (rows ready to insert, [(record, error message), ...] for the bad ones).
+        """
+        columns = {col[0]: col for col in self.schema.columns}
+        errors = {}  # position in batch -> message
+        converted = []
+        
+        for source, target in self.mapping.items():
+            _, col_type, nullable, _, _, extra = columns[target]
+            convert = converter_for(col_type)
+            values = []
+            for i, record in enumerate(records):
+                value = record.get(source)
+                if value is None or value == '':
+                    # Empty means NULL - fine if the column allows it or fills itself in
+                    if nullable == 'NO' and 'auto_increment' not in extra:
+                        errors.setdefault(i, f"{target} can't be empty")
+                    values.append(None)
+                    continue
+                try:
+                    values.append(convert(value) if isinstance(value, str) else value)
+                except (ValueError, decimal.InvalidOperation):
+                    errors.setdefault(i, f"{target}: {value!r} isn't a valid {col_type}")
+                    values.append(None)
+            converted.append(values)
+        
+        # Flip the columns back into rows, skipping the ones that failed
+        rows = [row for i, row in enumerate(zip(*converted)) if i not in errors]
+        failed = [(records[i], message) for i, message in sorted(errors.items())]
+        return rows, failed
+    
+    def insert_statement(self, row_count):
+        """Multi-row INSERT for row_count rows in the chosen mode"""
+        columns = list(self.mapping.values())
+        row_placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        verb = "INSERT IGNORE" if self.mode == 'ignore' else "INSERT"
+        query = (f"{verb} INTO {quote_identifier(self.schema.name)} ({', '.join(map(quote_identifier, columns))}) "
+                 f"VALUES {', '.join([row_placeholder] * row_count)}")
+        
+        if self.mode == 'upsert':
+            query += self.upsert_clause(columns)
+        return query
+    
+    def upsert_clause(self, columns):
+        """ON DUPLICATE KEY UPDATE for upsert mode - the key columns stay as they are"""
+        updates = [col for col in columns if col not in self.schema.primary_key] or columns[:1]
+        return " ON DUPLICATE KEY UPDATE " + ", ".join(
+            f"{quote_identifier(col)} = VALUES({quote_identifier(col)})" for col in updates
+        )
+    
+    def execute_insert(self, cursor, row_count, params):
+        """Runs the INSERT for row_count rows - prepared once and reused when there's a StatementCache"""
+        if self.statements is None:
+            cursor.execute(self.insert_statement(row_count), params)
+            return
+        key = ('import', self.schema.name, self.mode, tuple(self.mapping.values()), row_count)
+        self.statements.execute(key, lambda: self.insert_statement(row_count), params, cursor)
+    
+    def insert_rows(self, conn, cursor, rows):
+        """
+        Inserts a batch in one statement and one transaction.
+        If the server rejects the batch, retries row by row so only the bad rows get skipped.
+        """
+        try:
+            self.execute_insert(cursor, len(rows), [value for row in rows for value in row])
+            conn.commit()
+            self.rows_imported += len(rows)
+            return []
+        except (mysql.connector.IntegrityError, mysql.connector.DataError):
+            conn.rollback()
+        
+        failed = []
+        for row in rows:
+            try:
+                self.execute_insert(cursor, 1, row)
+                self.rows_imported += 1
+            except (mysql.connector.IntegrityError, mysql.connector.DataError) as e:
+                failed.append((dict(zip(self.mapping.values(), row)), str(e)))
+        conn.commit()
+        return failed
+    
+    def write_errors(self, failed):
+        """Appends rejected rows to the side file along with why they failed"""
+        if not failed:
+            return
+        if self.error_writer is None:
+            self.error_file = open(self.error_path, 'w', newline='', encoding='utf-8')
+            self.error_writer = csv.writer(self.error_file)
+            self.error_writer.writerow(['error', 'row'])
+        for record, message in failed:
+            self.error_writer.writerow([message, json.dumps(record, default=str)])
+        self.rows_failed += len(failed)
+    
+    def run(self, conn, cursor, job=None, statements=None):
+        """Imports the whole file with batched INSERTs (prepared, when given conn's StatementCache)"""
+        self.statements = statements
+        self.started = time.perf_counter()
+        try:
+            for records in read_batches(self.path, self.batch_size):
+                if self.mapping is None:
+                    self.map_columns(list(records[0].keys()))
+                self.rows_read += len(records)
+                
+                rows, failed = self.convert_batch(records)
+                if rows:
+                    failed += self.insert_rows(conn, cursor, rows)
+                self.write_errors(failed)
+                
+                if job is not None:
+                    job.rows_received = self.rows_imported
+                    job.check_cancelled()
+                if self.on_progress:
+                    self.on_progress(self)
+        finally:
+            if self.error_file is not None:
+                self.error_file.close()
+        return self
+    
+    @staticmethod
+    def local_infile_allowed(cursor):
+        """True when the server lets clients send files with LOAD DATA LOCAL INFILE"""
+        cursor.execute("SELECT @@GLOBAL.local_infile")
+        return bool(int(cursor.fetchall()[0][0]))
+    
+    def run_load_data(self, connect_args):
+        """
+        Imports a CSV with LOAD DATA LOCAL INFILE - the server does all the parsing, so it's the fastest
+        option, but conversion errors become server warnings instead of rows in the error file.
+        Needs its own connection since local infile has to be switched on when connecting.
+        
+        The file goes into a temporary table first and is merged from there with INSERT ... SELECT, so
+        the modes mean what they do for batched imports. LOAD DATA's own REPLACE deletes and re-inserts
+        rows (cascading to their child rows), and with LOCAL duplicates never fail, only warn.
+        """
+        if not self.path.lower().endswith('.csv'):
+            raise ValueError("LOAD DATA only works with CSV files")
+        
+        self.started = time.perf_counter()
+        with open(self.path, newline='', encoding='utf-8') as f:
+            first_line = f.readline()
+        header = next(csv.reader([first_line]))
+        self.map_columns(header)
+        # Files saved on Windows end their lines with \r\n
+        line_end = "\\r\\n" if first_line.endswith("\r\n") else "\\n"
+        
+        # Every field goes through a user variable so empty ones can become NULL, like they do in
+        # convert_batch - columns we don't have just never get used
+        variables = []
+        assignments = []
+        for i, source in enumerate(header):
+            variables.append(f"@c{i}")
+            if source in self.mapping:
+                assignments.append(f"{quote_identifier(self.mapping[source])} = NULLIF(@c{i}, '')")
+        
+        columns = list(self.mapping.values())
+        names = ", ".join(map(quote_identifier, columns))
+        types = {col[0]: col[1] for col in self.schema.columns}
+        staging = quote_identifier("_import_rows")
+        table = quote_identifier(self.schema.name)
+        
+        conn = open_connection(dict(connect_args, allow_local_infile=True))
+        try:
+            cursor = conn.cursor()
+            # Same column types, but no keys and everything nullable - the checks happen in merge_staged
+            cursor.execute(f"CREATE TEMPORARY TABLE {staging} ("
+                           + ", ".join(f"{quote_identifier(col)} {types[col]} NULL" for col in columns) + ")")
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {staging} "
+                "CHARACTER SET utf8mb4 FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+                f"LINES TERMINATED BY '{line_end}' IGNORE 1 LINES ({', '.join(variables)}) "
+                f"SET {', '.join(assignments)}",
+                (os.path.abspath(self.path),)
+            )
+            self.warnings = cursor.warning_count or 0
+            try:
+                self.merge_staged(cursor, staging, table, columns, names)
+                conn.commit()
+            except mysql.connector.Error:
+                conn.rollback()
+                raise
+            cursor.execute(f"DROP TEMPORARY TABLE {staging}")
+            cursor.close()
+        finally:
+            if self.error_file is not None:
+                self.error_file.close()
+            conn.close()
+        return self
+    
+    def merge_staged(self, cursor, staging, table, columns, names):
+        """Moves the LOAD DATA rows into the table in the chosen mode, with the same rejects as convert_batch"""
+        cursor.execute(f"SELECT COUNT(*) FROM {staging}")
+        self.rows_read = cursor.fetchall()[0][0]
+        
+        # (condition on a staged row, why it's rejected) - those rows go to the error file instead
+        checks = []
+        for name, _, nullable, _, _, extra in self.schema.columns:
+            if name in columns and nullable == 'NO' and 'auto_increment' not in extra:
+                checks.append((f"{quote_identifier(name)} IS NULL", f"{name} can't be empty"))
+        key = self.schema.primary_key
+        if self.mode == 'insert' and key and all(col in columns for col in key):
+            match = " AND ".join(f"t.{quote_identifier(col)} = {staging}.{quote_identifier(col)}" for col in key)
+            checks.append((f"EXISTS (SELECT 1 FROM {table} AS t WHERE {match})", "Duplicate entry for the primary key"))
+        
+        for condition, message in checks:
+            cursor.execute(f"SELECT {names} FROM {staging} WHERE {condition}")
+            self.write_errors([(dict(zip(columns, row)), message) for row in cursor.fetchall()])
+            cursor.execute(f"DELETE FROM {staging} WHERE {condition}")
+        
+        # A key repeated inside the file itself still fails the whole merge, which then rolls back
+        verb = "INSERT IGNORE" if self.mode == 'ignore' else "INSERT"
+        query = f"{verb} INTO {table} ({names}) SELECT {names} FROM {staging}"
+        if self.mode == 'upsert':
+            query += self.upsert_clause(columns)
+        cursor.execute(query)
+        # Counted the way run() counts them - rowcount would count every updated row twice
+        self.rows_imported = self.rows_read - self.rows_failed
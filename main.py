@@ -2,10 +2,14 @@
 Main application entry point for Clothing Store DB Manager
 """
 
+import time
+
+started = time.perf_counter()  # before the imports, so the startup time in the status bar includes them
+
 import tkinter as tk
 from db_manager import ClothingStoreDBApp
 
 if __name__ == "__main__":
     root = tk.Tk()
-    app = ClothingStoreDBApp(root)
+    app = ClothingStoreDBApp(root, started)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""
+pending_changes.py
+Collects edits and deletes made in the Tables tab so they can be sent
+together instead of one statement and one commit per row.
+
+Everything is keyed by primary key. apply() turns the buffer into a handful
+of statements - one DELETE ... WHERE pk IN (...) and one CASE based UPDATE
+per chunk of rows - and runs them in a single transaction.
+"""
+
+from statement_cache import quote_identifier
+from table_pager import key_in_condition
+
+_MISSING = object()  # a row that doesn't change a given column
+
+
+class PendingChanges:
+    """Unsent edits and deletes for one table"""
+    
+    def __init__(self, table, key_columns, chunk_size=500):
+        self.table = table
+        self.key_columns = list(key_columns)
+        self.chunk_size = chunk_size  # rows per statement, keeps the statements a sane size
+        
+        self.updates = {}  # key tuple -> {column: new value}
+        self.deletes = set()  # key tuples
+    
+    def __len__(self):
+        return len(self.updates) + len(self.deletes)
+    
+    def set_value(self, key, column, value):
+        """Records a new value for one cell"""
+        if key in self.deletes:
+            return  # no point updating a row that's going away
+        self.updates.setdefault(key, {})[column] = value
+    
+    def delete(self, key):
+        """Marks a row for deletion (and forgets any edits to it)"""
+        self.updates.pop(key, None)
+        self.deletes.add(key)
+    
+    def discard(self):
+        self.updates.clear()
+        self.deletes.clear()
+    
+    def copy(self):
+        """Snapshot to send to the server, so edits made while it's applying aren't lost"""
+        changes = PendingChanges(self.table, self.key_columns, self.chunk_size)
+        changes.updates = {key: dict(edits) for key, edits in self.updates.items()}
+        changes.deletes = set(self.deletes)
+        return changes
+    
+    def forget(self, applied):
+        """Drops changes that have been applied, keeping anything edited again since the snapshot"""
+        self.deletes -= applied.deletes
+        for key, edits in applied.updates.items():
+            current = self.updates.get(key)
+            if current is None:
+                continue
+            for col, value in edits.items():
+                if current.get(col, _MISSING) == value:
+                    del current[col]
+            if not current:
+                del self.updates[key]
+    
+    def _chunks(self, keys):
+        keys = list(keys)
+        for start in range(0, len(keys), self.chunk_size):
+            yield keys[start:start + self.chunk_size]
+    
+    def _key_match(self):
+        """WHEN condition for one key inside a CASE"""
+        return " AND ".join(f"{quote_identifier(col)} = %s" for col in self.key_columns)
+    
+    def statements(self):
+        """Returns the (query, params) pairs that apply the whole buffer"""
+        statements = []
+        table = quote_identifier(self.table)
+        
+        for keys in self._chunks(self.deletes):
+            condition, params = key_in_condition(self.key_columns, keys)
+            statements.append((f"DELETE FROM {table} WHERE {condition}", params))
+        
+        for keys in self._chunks(self.updates):
+            # One CASE per edited column: SET col = CASE WHEN pk = 1 THEN 'a' WHEN pk = 2 THEN 'b' ELSE col END
+            columns = sorted({col for key in keys for col in self.updates[key]})
+            set_clauses = []
+            params = []
+            for col in columns:
+                name = quote_identifier(col)
+                values = [self.updates[key].get(col, _MISSING) for key in keys]
+                if len(set(map(repr, values))) == 1 and values[0] is not _MISSING:
+                    # Every row gets the same value (e.g. a bulk edit) - no CASE needed
+                    set_clauses.append(f"{name} = %s")
+                    params.append(values[0])
+                    continue
+                
+                whens = []
+                for key in keys:
+                    if col in self.updates[key]:
+                        whens.append(f"WHEN {self._key_match()} THEN %s")
+                        params.extend(key)
+                        params.append(self.updates[key][col])
+                set_clauses.append(f"{name} = CASE {' '.join(whens)} ELSE {name} END")
+            
+            condition, key_params = key_in_condition(self.key_columns, keys)
+            statements.append((f"UPDATE {table} SET {', '.join(set_clauses)} WHERE {condition}",
+                               params + key_params))
+        
+        return statements
+    
+    def apply(self, conn, cursor, execute=None):
+        """
+        Runs every pending change in one transaction - all of it goes through or none of it does.
+        execute(query, params) can run the statements instead of cursor (it returns the cursor it used).
+        """
+        affected = 0
+        try:
+            for query, params in self.statements():
+                if execute is None:
+                    cursor.execute(query, params)
+                    affected += cursor.rowcount
+                else:
+                    affected += execute(query, params).rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return affected
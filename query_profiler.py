@@ -0,0 +1,259 @@
+"""
+query_profiler.py
+Times every statement the app sends so it's clear whether a slow screen is
+waiting on the server, on the network or on drawing the treeview.
+
+The workers wrap their cursor in a ProfiledCursor, which records how long
+execute() took (server time plus the round trip), how long the fetches took,
+and how many rows and roughly how many bytes came back. The GUI adds how long
+it spent rendering the result. Statements over the slow threshold are also
+kept in a separate slow-query log that survives the normal ring buffer.
+
+Also turns EXPLAIN FORMAT=JSON and EXPLAIN ANALYZE output into nested
+(label, detail, children) tuples so the plan can be shown as a tree.
+"""
+
+import collections
+import itertools
+import json
+import re
+import threading
+import time
+
+SQL_PREVIEW = 2000  # characters of each statement we keep
+BYTES_SAMPLE_ROWS = 1000  # rows measured exactly before we start extrapolating
+
+
+def value_bytes(value):
+    """Rough wire size of one value - text length for strings and blobs, 8 for numbers and dates"""
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    return 8
+
+
+class StatementStats:
+    """Timings and sizes for one statement"""
+    
+    def __init__(self, stats_id, source, sql):
+        self.id = stats_id
+        self.source = source  # what the app was doing, e.g. "Loading orders"
+        self.sql = sql[:SQL_PREVIEW]
+        self.started = time.time()
+        self.execute_time = 0.0  # cursor.execute - server work plus the round trip
+        self.fetch_time = 0.0  # pulling the rows over
+        self.render_time = 0.0  # filled in by the GUI afterwards
+        self.rows = 0
+        self.bytes = 0  # estimated, see ProfiledCursor.count_rows
+        self.error = None
+    
+    @property
+    def total_time(self):
+        return self.execute_time + self.fetch_time + self.render_time
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'source': self.source,
+            'sql': self.sql,
+            'started': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+            'execute_ms': round(self.execute_time * 1000, 3),
+            'fetch_ms': round(self.fetch_time * 1000, 3),
+            'render_ms': round(self.render_time * 1000, 3),
+            'total_ms': round(self.total_time * 1000, 3),
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'error': self.error,
+        }
+
+
+class QueryProfiler:
+    """Collects StatementStats from every worker thread"""
+    
+    def __init__(self, max_records=1000, slow_threshold=0.2):
+        self.slow_threshold = slow_threshold  # seconds
+        self.records = collections.deque(maxlen=max_records)
+        self.slow_log = collections.deque(maxlen=max_records)
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.version = 0  # bumped on every change so the GUI knows when to redraw
+    
+    def start(self, source, sql):
+        return StatementStats(next(self.ids), source, sql)
+    
+    def add(self, stats):
+        with self.lock:
+            self.records.append(stats)
+            self.check_slow(stats)
+            self.version += 1
+    
+    def add_render_time(self, stats, seconds):
+        """Called on the Tk thread once the result of a statement has been drawn"""
+        with self.lock:
+            stats.render_time += seconds
+            self.check_slow(stats)
+            self.version += 1
+    
+    def check_slow(self, stats):
+        if stats.total_time >= self.slow_threshold and stats not in self.slow_log:
+            self.slow_log.append(stats)
+    
+    def snapshot(self, slow_only=False):
+        with self.lock:
+            return list(self.slow_log if slow_only else self.records)
+    
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+            self.slow_log.clear()
+            self.version += 1
+    
+    def export_json(self, path):
+        """Writes the log and the slow-query log to a JSON file for offline digging"""
+        with self.lock:
+            data = {
+                'slow_threshold_ms': self.slow_threshold * 1000,
+                'statements': [stats.to_dict() for stats in self.records],
+                'slow_queries': [stats.to_dict() for stats in self.slow_log],
+            }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+
+class ProfiledCursor:
+    """Wraps a MySQL cursor and records a StatementStats for each statement run through it"""
+    
+    def __init__(self, cursor, profiler, source, job=None):
+        self.cursor = cursor
+        self.profiler = profiler
+        self.source = source
+        self.job = job  # the QueryJob, so the GUI can find the stats for its result
+        self.current = None
+        self.sampled_rows = 0
+        self.sampled_bytes = 0
+    
+    def __getattr__(self, name):
+        # description, rowcount, with_rows, lastrowid... all come straight from the real cursor
+        return getattr(self.cursor, name)
+    
+    def __iter__(self):
+        return iter(self.fetchone, None)
+    
+    def finish(self):
+        """Files the current statement's stats - happens on the next execute or on close"""
+        if self.current is not None:
+            self.profiler.add(self.current)
+            # The statement with the most rows is the result the GUI is about to draw
+            if self.job is not None and (self.job.stats is None or self.current.rows > self.job.stats.rows):
+                self.job.stats = self.current
+            self.current = None
+    
+    def execute(self, operation, *args, **kwargs):
+        self.finish()
+        self.current = self.profiler.start(self.source, operation)
+        self.sampled_rows = 0
+        self.sampled_bytes = 0
+        started = time.perf_counter()
+        try:
+            return self.cursor.execute(operation, *args, **kwargs)
+        except Exception as e:
+            self.current.error = str(e)
+            raise
+        finally:
+            self.current.execute_time = time.perf_counter() - started
+            if not getattr(self.cursor, 'with_rows', False) and self.cursor.rowcount and self.cursor.rowcount > 0:
+                self.current.rows = self.cursor.rowcount  # rows changed by INSERT/UPDATE/DELETE
+    
+    def count_rows(self, rows):
+        """
+        Adds fetched rows to the stats. Bytes are measured exactly for the first rows and
+        extrapolated after that, so profiling a 50 million row export doesn't slow it down.
+        """
+        stats = self.current
+        if stats is None or not rows:
+            return
+        stats.rows += len(rows)
+        if self.sampled_rows < BYTES_SAMPLE_ROWS:
+            self.sampled_rows += len(rows)
+            self.sampled_bytes += sum(value_bytes(value) for row in rows for value in row)
+        stats.bytes = round(self.sampled_bytes / self.sampled_rows * stats.rows)
+    
+    def timed_fetch(self, fetch, *args):
+        started = time.perf_counter()
+        rows = fetch(*args)
+        if self.current is not None:
+            self.current.fetch_time += time.perf_counter() - started
+        return rows
+    
+    def fetchall(self):
+        rows = self.timed_fetch(self.cursor.fetchall)
+        self.count_rows(rows)
+        return rows
+    
+    def fetchmany(self, size=1):
+        rows = self.timed_fetch(self.cursor.fetchmany, size)
+        self.count_rows(rows)
+        return rows
+    
+    def fetchone(self):
+        row = self.timed_fetch(self.cursor.fetchone)
+        if row is not None:
+            self.count_rows([row])
+        return row
+    
+    def close(self):
+        self.finish()
+        return self.cursor.close()
+
+
+def json_plan_tree(plan, label="EXPLAIN"):
+    """
+    Turns EXPLAIN FORMAT=JSON output into (label, detail, children) tuples.
+    Plain values become the detail text, nested objects and lists become children.
+    """
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    
+    details = []
+    children = []
+    for key, value in plan.items():
+        if isinstance(value, dict):
+            children.append(json_plan_tree(value, key))
+        elif isinstance(value, list) and any(isinstance(item, dict) for item in value):
+            for i, item in enumerate(value):
+                if isinstance(item, dict):
+                    children.append(json_plan_tree(item, f"{key}[{i}]"))
+        else:
+            details.append(f"{key}={value}")
+    
+    # Name table nodes after their table so the tree reads like the plan
+    if 'table_name' in plan:
+        label = f"{label}: {plan['table_name']}"
+    return label, ", ".join(details), children
+
+
+ANALYZE_LINE = re.compile(r"^(\s*)-> (.*)$")
+
+
+def analyze_plan_tree(text):
+    """
+    Turns EXPLAIN ANALYZE's indented TREE output into (label, detail, children) tuples.
+    Each '-> ...' line is a node, the actual timing in parentheses becomes the detail.
+    """
+    root = ("EXPLAIN ANALYZE", "", [])
+    stack = [(-1, root)]
+    for line in text.splitlines():
+        match = ANALYZE_LINE.match(line)
+        if not match:
+            continue
+        indent = len(match.group(1))
+        step = match.group(2)
+        label, _, detail = step.partition("  (")
+        node = (label, "(" + detail if detail else "", [])
+        
+        while stack[-1][0] >= indent:
+            stack.pop()
+        stack[-1][1][2].append(node)
+        stack.append((indent, node))
+    return root
@@ -0,0 +1,213 @@
+"""
+query_worker.py
+Runs database work on background threads so the Tk window never freezes
+while MySQL is busy.
+
+Each QueryWorker borrows a connection from the shared ConnectionPool for every
+job, so the Tables tab and the SQL Query tab can run queries at the same time. Tk widgets can only be touched from the
+main thread, so workers never call back into the GUI directly - they put
+(callback, args) pairs on a queue that the GUI drains with root.after.
+"""
+
+import queue
+import threading
+import time
+
+import mysql.connector
+
+from connection_pool import open_connection
+from query_profiler import ProfiledCursor
+
+# MySQL error code for "Query execution was interrupted" - what KILL QUERY causes
+ER_QUERY_INTERRUPTED = 1317
+
+
+class QueryCancelled(Exception):
+    """Passed to on_error when the user cancelled the job"""
+    
+    def __init__(self):
+        super().__init__("Query cancelled")
+
+
+class QueryJob:
+    """One piece of database work plus the GUI callbacks for its results"""
+    
+    def __init__(self, work, on_done=None, on_error=None, on_rows=None, description=""):
+        self.work = work  # work(cursor, job) - runs on the worker thread, must not touch Tk
+        self.on_done = on_done  # on_done(result) - runs on the Tk thread
+        self.on_error = on_error  # on_error(exception) - runs on the Tk thread
+        self.on_rows = on_rows  # on_rows(chunk) - for results streamed with emit_rows
+        self.description = description  # shown next to the progress info
+        
+        self.cancelled = False
+        self.rows_received = 0
+        self.started = None
+        self.paused = False  # waiting in pause() for the GUI to call resume()
+        self.paused_time = 0.0  # seconds spent paused, so timings only count real work
+        self.resumed = threading.Event()
+        self.worker = None  # set by QueryWorker.submit
+        self.conn = None  # the pooled connection while the job runs, for commit()
+        self.connection_id = None  # server thread id of that connection, needed for KILL QUERY
+        self.statements = None  # that connection's StatementCache, for repeated writes
+        self.stats = None  # StatementStats of the last statement the job ran, when profiling
+    
+    @property
+    def elapsed(self):
+        """Seconds since the job started running (0 while still queued)"""
+        if self.started is None:
+            return 0.0
+        return time.perf_counter() - self.started
+    
+    def check_cancelled(self):
+        """Call this between chunks of work so Cancel stops long loops too"""
+        if self.cancelled:
+            raise QueryCancelled()
+    
+    def pause(self):
+        """
+        Blocks the job until resume() (or Cancel) - lets a job keep its cursor open
+        between user actions, e.g. waiting for Fetch More on a capped result.
+        """
+        self.resumed.clear()
+        self.paused = True
+        paused_at = time.perf_counter()
+        try:
+            while not self.resumed.wait(0.1):
+                self.check_cancelled()
+        finally:
+            self.paused = False
+            self.paused_time += time.perf_counter() - paused_at
+    
+    def resume(self):
+        """Lets a paused job carry on - safe to call from the Tk thread"""
+        self.resumed.set()
+    
+    def post(self, callback, *args):
+        """Runs callback(*args) on the Tk thread"""
+        self.worker.post(callback, *args)
+    
+    def emit_rows(self, rows):
+        """Streams a chunk of result rows back to on_rows"""
+        self.check_cancelled()
+        self.rows_received += len(rows)
+        self.post(self.on_rows, rows)
+
+
+class QueryWorker:
+    """A background thread that runs QueryJobs one at a time on pooled connections"""
+    
+    def __init__(self, name, pool, results, profiler=None):
+        self.name = name
+        self.pool = pool  # ConnectionPool shared by all the workers
+        self.results = results  # queue the GUI polls for callbacks
+        self.profiler = profiler  # QueryProfiler that times every statement, optional
+        self.jobs = queue.Queue()
+        self.current_job = None
+        
+        self.thread = threading.Thread(target=self.run, name=f"query-worker-{name}", daemon=True)
+        self.thread.start()
+    
+    @property
+    def busy(self):
+        """True while a job is running or waiting"""
+        return self.current_job is not None or not self.jobs.empty()
+    
+    def submit(self, job):
+        """Queues a job to run after anything already queued"""
+        job.worker = self
+        self.jobs.put(job)
+        return job
+    
+    def post(self, callback, *args):
+        if callback is not None:
+            self.results.put((callback, args))
+    
+    def cancel(self):
+        """Cancels the running job and anything still queued behind it"""
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                # Keep the stop signal around
+                self.jobs.put(None)
+                break
+            job.cancelled = True
+            self.post(job.on_error, QueryCancelled())
+        
+        job = self.current_job
+        if job is None or job.cancelled:
+            return
+        job.cancelled = True
+        
+        # The running query only stops if the server kills it.
+        # Do it off the Tk thread since it needs a fresh connection.
+        if job.connection_id is not None:
+            threading.Thread(target=self.kill_query, args=(job.connection_id,), daemon=True).start()
+    
+    def kill_query(self, connection_id):
+        """
+        KILL QUERY has to come from a different connection - ours is stuck waiting on the result.
+        Doesn't go through the pool since every pooled connection might be busy.
+        """
+        try:
+            conn = open_connection(self.pool.connect_args, self.pool.use_pure)
+            try:
+                cursor = conn.cursor()
+                cursor.execute(f"KILL QUERY {int(connection_id)}")
+                cursor.close()
+            finally:
+                conn.close()
+        except mysql.connector.Error:
+            pass  # the query most likely finished on its own already
+    
+    def stop(self):
+        """Cancels everything and lets the thread finish"""
+        self.cancel()
+        self.jobs.put(None)
+    
+    def run(self):
+        """Thread main loop - takes jobs off the queue until stop() is called"""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            if job.cancelled:
+                continue  # on_error was already posted by cancel()
+            
+            self.current_job = job
+            job.started = time.perf_counter()
+            try:
+                # Fresh connection and cursor per job - checkin() cleans up whatever the job leaves behind
+                with self.pool.connection() as conn:
+                    job.conn = conn
+                    job.connection_id = conn.connection_id
+                    job.statements = self.pool.statements(conn)
+                    cursor = conn.cursor()
+                    if self.profiler is not None:
+                        cursor = ProfiledCursor(cursor, self.profiler, job.description, job)
+                    try:
+                        result = job.work(cursor, job)
+                    finally:
+                        try:
+                            cursor.close()
+                        except mysql.connector.Error:
+                            pass  # unread rows after a cancel, checkin() throws them away
+                job.check_cancelled()
+                self.post(job.on_done, result)
+            
+            except QueryCancelled as e:
+                self.post(job.on_error, e)
+            except mysql.connector.Error as e:
+                if job.cancelled or e.errno == ER_QUERY_INTERRUPTED:
+                    self.post(job.on_error, QueryCancelled())
+                else:
+                    self.post(job.on_error, e)
+            except Exception as e:
+                # Anything else is a bug in the job, but it mustn't kill the worker thread
+                self.post(job.on_error, e)
+            finally:
+                job.conn = None
+                job.connection_id = None
+                self.current_job = None
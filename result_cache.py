@@ -0,0 +1,299 @@
+"""
+result_cache.py
+Keeps recently fetched pages of table data in memory so going back to a table
+you just looked at redraws straight away instead of running the same SELECT
+again.
+
+Pages are stored a column at a time - integer and float columns go into typed
+arrays, everything else into one tuple per column - which takes a lot less
+memory than a list of row tuples. The cache is an LRU with a byte budget.
+
+Cached pages belong to a table and are only used while the table's version
+(UPDATE_TIME from information_schema, or CHECKSUM TABLE for small tables
+where that's empty) is the same as when they were fetched. The app's own
+writes drop a table's pages straight away. The cache can also be saved to a
+file on exit; on the next start the file is memory-mapped and each page is
+only unpickled when it's first used.
+"""
+
+import collections
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+from array import array
+
+import mysql.connector
+
+from statement_cache import quote_identifier
+
+FILE_MAGIC = b"DBMSRC01"
+CHECKSUM_MAX_ROWS = 100_000  # CHECKSUM TABLE reads the whole table, so only for small ones
+
+
+def table_version(cursor, table):
+    """
+    Something that changes whenever the table's data does, or None when we can't tell cheaply.
+    UPDATE_TIME only has whole seconds, so a table written in the last couple of seconds counts as unknown.
+    """
+    try:
+        # MySQL 8 caches information_schema stats for a day by default, we want the real value
+        cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+    except mysql.connector.Error:
+        pass  # older servers don't cache them in the first place
+    
+    cursor.execute(
+        "SELECT UPDATE_TIME, TABLE_ROWS, NOW() FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,)
+    )
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+    update_time, table_rows, now = rows[0]
+    
+    if update_time is not None:
+        if (now - update_time).total_seconds() < 2:
+            return None
+        return ('updated', update_time)
+    
+    # InnoDB forgets UPDATE_TIME when the server restarts
+    if table_rows is not None and table_rows <= CHECKSUM_MAX_ROWS:
+        cursor.execute(f"CHECKSUM TABLE {quote_identifier(table)}")
+        checksum = cursor.fetchall()[0][1]
+        return ('checksum', checksum) if checksum is not None else None
+    return None
+
+
+class ColumnarRows:
+    """A page of rows stored one column at a time"""
+    
+    def __init__(self, rows):
+        self.count = len(rows)
+        self.columns = [self.pack(values) for values in zip(*rows)]
+        self.nbytes = sys.getsizeof(self.columns) + sum(self.column_bytes(column) for column in self.columns)
+    
+    @staticmethod
+    def pack(values):
+        """Typed array for all-int or all-float columns, the plain tuple for anything else"""
+        types = set(map(type, values))
+        try:
+            if types == {int}:
+                return array('q', values)
+            if types == {float}:
+                return array('d', values)
+        except OverflowError:
+            pass  # BIGINT UNSIGNED past 2**63 doesn't fit
+        return values
+    
+    @staticmethod
+    def column_bytes(column):
+        if isinstance(column, array):
+            return sys.getsizeof(column)
+        return sys.getsizeof(column) + sum(sys.getsizeof(value) for value in column)
+    
+    def rows(self):
+        """The page as a fresh list of row tuples"""
+        return list(zip(*self.columns))
+
+
+class CacheEntry:
+    def __init__(self, table_key, version, data=None, span=None):
+        self.table_key = table_key  # (scope, table)
+        self.version = version  # table version the page was fetched at
+        self.data = data  # ColumnarRows, or None while it's still sitting in the mapped file
+        self.span = span  # (offset, length) of the pickled page in the mapped file
+        self.nbytes = data.nbytes if data is not None else span[1]
+
+
+class ResultCache:
+    """LRU of table pages keyed by table, query text and params, with a memory cap"""
+    
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()  # key -> CacheEntry, least recently used first
+        self.versions = {}  # (scope, table) -> version the cached pages are good for
+        self.scope = None  # (host, port, database) so pages from another server never match
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # pages are fetched on the workers, invalidated on the Tk thread
+        
+        self.mapped = None  # mmap of the file loaded at startup
+        self.mapped_file = None
+    
+    def table_key(self, table):
+        return (self.scope, table)
+    
+    def key(self, table, query, params):
+        return (self.scope, table, query, tuple(params))
+    
+    def get(self, table, query, params=()):
+        """The cached rows for a page, or None if there aren't any (or they're for an old version)"""
+        key = self.key(table, query, params)
+        with self.lock:
+            entry = self.entries.get(key)
+            version = self.versions.get(self.table_key(table))
+            if entry is None or version is None or entry.version != version:
+                self.misses += 1
+                return None
+            if entry.data is None:
+                self.load_entry(entry)
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry.data.rows()
+    
+    def put(self, table, query, params, rows):
+        """Caches a page - only for tables we have a version for, otherwise we couldn't tell when it's stale"""
+        with self.lock:
+            version = self.versions.get(self.table_key(table))
+        if version is None:
+            return
+        data = ColumnarRows(rows)
+        if data.nbytes > self.max_bytes:
+            return
+        
+        key = self.key(table, query, params)
+        with self.lock:
+            if self.versions.get(self.table_key(table)) != version:
+                return  # invalidated while we were packing it
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self.entries[key] = CacheEntry(self.table_key(table), version, data)
+            self.nbytes += data.nbytes
+            self.evict()
+    
+    def fetch(self, cursor, table, query, params=()):
+        """Runs a page query, or skips it when the page is cached"""
+        rows = self.get(table, query, params)
+        if rows is None:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            self.put(table, query, params, rows)
+        return rows
+    
+    def validate(self, cursor, table):
+        """
+        Checks the table's version on the server. Returns True if the cached pages are still good,
+        otherwise drops them and starts caching again at the new version.
+        """
+        version = table_version(cursor, table)
+        table_key = self.table_key(table)
+        with self.lock:
+            if version is not None and self.versions.get(table_key) == version:
+                return True
+            self.drop(table_key)
+            if version is not None:
+                self.versions[table_key] = version
+            return False
+    
+    def invalidate(self, table=None):
+        """Forgets one table's pages (after we wrote to it), or every table in the current scope"""
+        with self.lock:
+            if table is not None:
+                self.drop(self.table_key(table))
+                return
+            for table_key in [k for k in self.versions if k[0] == self.scope]:
+                self.drop(table_key)
+    
+    def drop(self, table_key):
+        """Removes a table's pages and version - caller holds the lock"""
+        self.versions.pop(table_key, None)
+        for key in [key for key, entry in self.entries.items() if entry.table_key == table_key]:
+            self.nbytes -= self.entries.pop(key).nbytes
+    
+    def evict(self):
+        """Throws out least recently used pages until we're under the cap - caller holds the lock"""
+        while self.nbytes > self.max_bytes and self.entries:
+            _, entry = self.entries.popitem(last=False)
+            self.nbytes -= entry.nbytes
+    
+    def load_entry(self, entry):
+        """Unpickles a page that's still in the mapped file - caller holds the lock"""
+        offset, length = entry.span
+        entry.data = pickle.loads(self.mapped[offset:offset + length])
+        entry.span = None
+        self.nbytes += entry.data.nbytes - entry.nbytes
+        entry.nbytes = entry.data.nbytes
+    
+    def stats_text(self):
+        """Short summary for the status bar"""
+        lookups = self.hits + self.misses
+        hit_rate = f", {self.hits / lookups:.0%} hits" if lookups else ""
+        return f"Cache {self.nbytes / 1_000_000:.1f} MB{hit_rate}"
+    
+    def save(self, path):
+        """
+        Writes every current page to path so the next run can map it back in.
+        Layout: magic, length of the pickled index, the index, then the pickled pages back to back.
+        """
+        with self.lock:
+            index = []
+            blobs = []
+            offset = 0
+            for key, entry in self.entries.items():
+                if self.versions.get(entry.table_key) != entry.version:
+                    continue
+                if entry.data is None:
+                    start, length = entry.span
+                    blob = self.mapped[start:start + length]  # still pickled, just copy it over
+                else:
+                    blob = pickle.dumps(entry.data, pickle.HIGHEST_PROTOCOL)
+                index.append((key, entry.table_key, entry.version, offset, len(blob)))
+                blobs.append(blob)
+                offset += len(blob)
+            header = pickle.dumps({'versions': self.versions, 'entries': index}, pickle.HIGHEST_PROTOCOL)
+            self.close()  # Windows won't replace a file that's still mapped
+        
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(FILE_MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            f.writelines(blobs)
+        os.replace(tmp_path, path)
+    
+    def load(self, path):
+        """Maps a file written by save() - the pages stay on disk until they're asked for. Returns True if it loaded."""
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            return False
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if mapped[:len(FILE_MAGIC)] != FILE_MAGIC:
+                raise ValueError("not a result cache file")
+            start = len(FILE_MAGIC) + 8
+            (header_length,) = struct.unpack("<Q", mapped[len(FILE_MAGIC):start])
+            header = pickle.loads(mapped[start:start + header_length])
+        except (OSError, ValueError, EOFError, struct.error, pickle.UnpicklingError):
+            f.close()
+            return False  # empty, old or damaged file - just start with an empty cache
+        
+        blobs_start = start + header_length
+        with self.lock:
+            self.close()
+            self.mapped = mapped
+            self.mapped_file = f
+            self.versions.update(header['versions'])
+            for key, table_key, version, offset, length in header['entries']:
+                entry = CacheEntry(table_key, version, span=(blobs_start + offset, length))
+                self.entries[key] = entry
+                self.nbytes += entry.nbytes
+            self.evict()
+        return True
+    
+    def close(self):
+        """Lets go of the mapped file - any pages still in it are dropped"""
+        if self.mapped is None:
+            return
+        for key in [key for key, entry in self.entries.items() if entry.data is None]:
+            self.nbytes -= self.entries.pop(key).nbytes
+        self.mapped.close()
+        self.mapped_file.close()
+        self.mapped = None
+        self.mapped_file = None
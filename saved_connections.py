@@ -0,0 +1,102 @@
+"""
+saved_connections.py
+Saved connections - host, port, user, database and connection options under
+a name, so switching between servers doesn't mean retyping them.
+
+They live in a small JSON file next to the app's other per-user files. The
+password is kept in the system keyring when the keyring package is installed
+and isn't saved at all otherwise. One saved connection can be marked to
+connect at startup: the app opens it in the background as soon as the window
+is up, loading every table's structure and the stats sidebar while the user
+is still looking at the screen.
+"""
+
+import json
+import os
+
+# The keyring is optional - without it passwords just aren't remembered
+try:
+    import keyring
+except ImportError:
+    keyring = None
+
+KEYRING_SERVICE = "dbms_interface"
+SAVED_CONNECTIONS_PATH = os.path.join(os.path.expanduser("~"), ".dbms_interface", "connections.json")
+SETTINGS = ('host', 'port', 'user', 'database', 'compress')
+
+
+class SavedConnections:
+    """Named connection settings, read from and written back to one JSON file"""
+    
+    def __init__(self, path=SAVED_CONNECTIONS_PATH):
+        self.path = path
+        self.connections = {}  # name -> {'host', 'port', 'user', 'database', 'compress'}
+        self.startup = None  # name of the one to connect to at startup, if any
+    
+    def load(self):
+        """Reads the file - a missing or damaged one just means nothing's saved yet"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+            self.connections = dict(saved['connections'])
+            self.startup = saved.get('startup')
+        except (OSError, ValueError, TypeError, KeyError):
+            self.connections = {}
+            self.startup = None
+        if self.startup not in self.connections:
+            self.startup = None
+        return self
+    
+    def save(self):
+        # Written next to the real file and swapped in, same as the bulk job checkpoints
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({'connections': self.connections, 'startup': self.startup}, f, indent=2)
+        os.replace(self.path + ".tmp", self.path)
+    
+    def names(self):
+        return sorted(self.connections, key=str.lower)
+    
+    def get(self, name):
+        return self.connections.get(name)
+    
+    def put(self, name, settings, password=None, startup=False):
+        """Saves (or overwrites) a connection - returns whether the password could be kept too"""
+        self.connections[name] = {key: settings.get(key) for key in SETTINGS}
+        if startup:
+            self.startup = name
+        elif self.startup == name:
+            self.startup = None
+        self.save()
+        if password is None or keyring is None:
+            return False
+        try:
+            keyring.set_password(KEYRING_SERVICE, self.keyring_user(name), password)
+        except keyring.errors.KeyringError:
+            return False
+        return True
+    
+    def remove(self, name):
+        keyring_user = self.keyring_user(name)
+        self.connections.pop(name, None)
+        if self.startup == name:
+            self.startup = None
+        self.save()
+        if keyring is not None:
+            try:
+                keyring.delete_password(KEYRING_SERVICE, keyring_user)
+            except keyring.errors.KeyringError:
+                pass  # there wasn't one
+    
+    def password(self, name):
+        """The saved password, or None if there isn't one (or no keyring to keep it in)"""
+        if keyring is None:
+            return None
+        try:
+            return keyring.get_password(KEYRING_SERVICE, self.keyring_user(name))
+        except keyring.errors.KeyringError:
+            return None
+    
+    def keyring_user(self, name):
+        settings = self.connections.get(name) or {}
+        return f"{name}:{settings.get('user')}@{settings.get('host')}:{settings.get('port')}"
@@ -0,0 +1,157 @@
+"""
+schema_cache.py
+Keeps the structure of every table in memory so the CRUD screens don't have
+to run DESCRIBE before every click.
+
+The whole database is loaded with a few information_schema queries when we
+connect. Entries get thrown away when DDL goes through the SQL Query tab,
+when the user hits Refresh, or once they're older than the TTL.
+"""
+
+import re
+import threading
+import time
+
+# Statements that can change table structure
+DDL_PATTERN = re.compile(r"^\s*(CREATE|ALTER|DROP|RENAME|TRUNCATE)\b", re.IGNORECASE)
+
+
+def is_ddl(query):
+    """True if the query could change the schema"""
+    return bool(DDL_PATTERN.match(query))
+
+
+class TableSchema:
+    """Columns, keys and indexes of one table"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.columns = []  # one row per column, same layout as DESCRIBE (Field, Type, Null, Key, Default, Extra)
+        self.primary_key = []  # primary key column names in key order (can be more than one)
+        self.indexes = {}  # index name -> {'columns': [...], 'unique': bool}
+        self.foreign_keys = []  # {'name', 'column', 'ref_table', 'ref_column'} per key column
+        self.profile = None  # TableProfile from the Profile window, kept as long as the structure is
+        self.loaded_at = time.monotonic()
+    
+    @property
+    def column_names(self):
+        return [col[0] for col in self.columns]
+    
+    def describe_rows(self):
+        """Rows in the same shape DESCRIBE returns, so code written for DESCRIBE still works"""
+        return list(self.columns)
+    
+    def change_column(self):
+        """A column that records when each row last changed (ON UPDATE CURRENT_TIMESTAMP or updated_at), or None"""
+        for name, col_type, _, _, _, extra in self.columns:
+            if 'on update current_timestamp' in (extra or '').lower():
+                return name
+        for name, col_type, _, _, _, _ in self.columns:
+            if name.lower() == 'updated_at' and col_type.lower().startswith(('timestamp', 'datetime')):
+                return name
+        return None
+    
+    def indexed_prefixes(self):
+        """Column names that are the first column of some index - these can be searched quickly"""
+        return {index['columns'][0] for index in self.indexes.values() if index['columns']}
+
+
+class SchemaCache:
+    """Table structures for the whole database, with a TTL"""
+    
+    def __init__(self, ttl=600):
+        self.ttl = ttl  # seconds before an entry is considered stale
+        self.tables = {}  # table name -> TableSchema
+        self.table_order = []  # names in the order information_schema gave them
+        self.lock = threading.Lock()  # loaded on worker threads, invalidated from the Tk thread
+    
+    def load(self, cursor, table=None):
+        """
+        Loads the structure of one table, or all of them when table is None.
+        Three queries no matter how many tables there are, instead of a DESCRIBE each.
+        """
+        where = "TABLE_SCHEMA = DATABASE()"
+        params = ()
+        if table is not None:
+            where += " AND TABLE_NAME = %s"
+            params = (table,)
+        
+        schemas = {}
+        
+        cursor.execute(
+            "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY, COLUMN_DEFAULT, EXTRA "
+            f"FROM information_schema.COLUMNS WHERE {where} ORDER BY TABLE_NAME, ORDINAL_POSITION",
+            params
+        )
+        for table_name, *column in cursor.fetchall():
+            schemas.setdefault(table_name, TableSchema(table_name)).columns.append(tuple(column))
+        
+        cursor.execute(
+            "SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME, NON_UNIQUE "
+            f"FROM information_schema.STATISTICS WHERE {where} ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX",
+            params
+        )
+        for table_name, index_name, column_name, non_unique in cursor.fetchall():
+            schema = schemas.get(table_name)
+            if schema is None:
+                continue
+            index = schema.indexes.setdefault(index_name, {'columns': [], 'unique': not int(non_unique)})
+            index['columns'].append(column_name)
+            if index_name == 'PRIMARY':
+                schema.primary_key.append(column_name)
+        
+        cursor.execute(
+            "SELECT TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME "
+            f"FROM information_schema.KEY_COLUMN_USAGE WHERE {where} AND REFERENCED_TABLE_NAME IS NOT NULL "
+            "ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION",
+            params
+        )
+        for table_name, name, column_name, ref_table, ref_column in cursor.fetchall():
+            schema = schemas.get(table_name)
+            if schema is not None:
+                schema.foreign_keys.append(
+                    {'name': name, 'column': column_name, 'ref_table': ref_table, 'ref_column': ref_column}
+                )
+        
+        with self.lock:
+            if table is None:
+                self.tables = schemas
+                self.table_order = list(schemas)
+            elif table in schemas:
+                self.tables[table] = schemas[table]
+                if table not in self.table_order:
+                    self.table_order.append(table)
+            else:
+                # Table doesn't exist (any more)
+                self.tables.pop(table, None)
+        return schemas
+    
+    def peek(self, table):
+        """Returns the cached schema if it's still fresh, otherwise None - never touches the database"""
+        with self.lock:
+            schema = self.tables.get(table)
+        if schema is None or time.monotonic() - schema.loaded_at > self.ttl:
+            return None
+        return schema
+    
+    def get(self, cursor, table):
+        """Returns the schema for a table, loading it if it's missing or stale"""
+        schema = self.peek(table)
+        if schema is None:
+            schema = self.load(cursor, table).get(table)
+        if schema is None:
+            raise KeyError(f"Table '{table}' doesn't exist")
+        return schema
+    
+    def table_names(self):
+        with self.lock:
+            return [name for name in self.table_order if name in self.tables]
+    
+    def invalidate(self, table=None):
+        """Forgets one table, or everything when table is None"""
+        with self.lock:
+            if table is None:
+                self.tables = {}
+                self.table_order = []
+            else:
+                self.tables.pop(table, None)
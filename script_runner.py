@@ -0,0 +1,345 @@
+"""
+script_runner.py
+Runs a whole SQL script from the SQL Query tab over one connection.
+
+split_statements() cuts the script up the way the mysql command line client
+does - semicolons inside strings, quoted names and comments don't count, and
+DELIMITER lines switch the terminator for stored procedure bodies. Runs of
+statements that don't return rows are sent to the server several at a time
+as one multi-statement packet, so a migration with thousands of statements
+is a few dozen round trips instead of thousands, and nothing is committed
+statement by statement - either autocommit does it on the server, or the
+whole script is one transaction that's committed or rolled back once.
+"""
+
+import re
+import time
+
+import mysql.connector
+
+DELIMITER_LINE = re.compile(r"[ \t]*delimiter[ \t]+(\S+)[ \t]*(?:\r?\n|$)", re.IGNORECASE)
+FIRST_KEYWORD = re.compile(r"[\s(]*([A-Za-z]+)")
+
+# Statements that can send back a result set - these run one at a time so each gets its own result
+ROW_KEYWORDS = {'SELECT', 'WITH', 'SHOW', 'EXPLAIN', 'DESCRIBE', 'DESC', 'TABLE', 'VALUES', 'CALL',
+                'HANDLER', 'CHECK', 'ANALYZE', 'OPTIMIZE', 'REPAIR', 'CHECKSUM', 'HELP'}
+
+
+class ScriptError(Exception):
+    """A statement in the script failed and the script was stopped"""
+
+
+class Statement:
+    """One statement from a script"""
+    
+    def __init__(self, sql, line, delimiter):
+        self.sql = sql
+        self.line = line  # line number it starts on, for error messages
+        self.delimiter = delimiter  # what ended it - anything but ';' means a procedure body or similar
+    
+    @property
+    def keyword(self):
+        match = FIRST_KEYWORD.match(self.sql)
+        return match.group(1).upper() if match else ""
+    
+    @property
+    def may_return_rows(self):
+        return self.keyword in ROW_KEYWORDS
+    
+    @property
+    def batchable(self):
+        """Safe to send together with its neighbours in one multi-statement packet"""
+        return not self.may_return_rows and self.delimiter == ';'
+
+
+def _quoted_end(text, start):
+    """Index just past the string or quoted name starting at start (handles \\' and '' escapes)"""
+    quote = text[start]
+    i = start + 1
+    while i < len(text):
+        c = text[i]
+        if c == '\\' and quote != '`':
+            i += 2
+            continue
+        if c == quote:
+            if text.startswith(quote * 2, i):
+                i += 2  # doubled quote is an escaped quote
+                continue
+            return i + 1
+        i += 1
+    return len(text)  # unterminated - let the server complain about it
+
+
+def split_statements(text):
+    """Splits a script into Statements, respecting strings, comments and DELIMITER"""
+    statements = []
+    delimiter = ';'
+    plain = None
+    buf = []
+    blank = True  # nothing but whitespace and comments in buf so far
+    line = 1
+    start_line = 1
+    at_line_start = True
+    i = 0
+    
+    while i < len(text):
+        # DELIMITER is a client command, so it only counts at the start of a line between statements
+        if at_line_start and blank:
+            match = DELIMITER_LINE.match(text, i)
+            if match:
+                delimiter = match.group(1)
+                plain = None
+                line += match.group(0).count("\n")
+                i = match.end()
+                buf.clear()
+                continue
+        
+        if plain is None:
+            # Runs of characters that can't start anything interesting get copied in one go
+            plain = re.compile(f"[^'\"`#/\\-\\n{re.escape(delimiter[0])}]+")
+        match = plain.match(text, i)
+        if match:
+            chunk = match.group(0)
+            if chunk.strip():
+                if blank:
+                    start_line = line
+                    blank = False
+                at_line_start = False
+            buf.append(chunk)
+            i = match.end()
+            continue
+        
+        c = text[i]
+        if text.startswith(delimiter, i):
+            if not blank:
+                statements.append(Statement("".join(buf).strip(), start_line, delimiter))
+            buf.clear()
+            blank = True
+            i += len(delimiter)
+            at_line_start = False
+            continue
+        
+        if c in "'\"`":
+            end = _quoted_end(text, i)
+            if blank:
+                start_line = line
+                blank = False
+            buf.append(text[i:end])
+            line += text.count("\n", i, end)
+            at_line_start = False
+            i = end
+        elif c == '#' or (text.startswith('--', i) and (i + 2 == len(text) or text[i + 2] in ' \t\r\n')):
+            # Line comment - skip to the end of the line but keep the newline
+            end = text.find("\n", i)
+            i = len(text) if end < 0 else end
+        elif text.startswith('/*', i) and not text.startswith(('/*!', '/*+'), i):
+            # Block comment (versioned /*! */ and optimizer hint /*+ */ comments are real SQL, so they stay)
+            end = text.find("*/", i + 2)
+            end = len(text) if end < 0 else end + 2
+            line += text.count("\n", i, end)
+            buf.append(" ")
+            i = end
+        elif text.startswith(('/*!', '/*+'), i):
+            end = text.find("*/", i + 3)
+            end = len(text) if end < 0 else end + 2
+            if blank:
+                start_line = line
+                blank = False
+            buf.append(text[i:end])
+            line += text.count("\n", i, end)
+            at_line_start = False
+            i = end
+        else:
+            buf.append(c)
+            if c == "\n":
+                line += 1
+                at_line_start = True
+            else:
+                if blank:
+                    start_line = line
+                    blank = False
+                at_line_start = False
+            i += 1
+    
+    if not blank:
+        statements.append(Statement("".join(buf).strip(), start_line, delimiter))
+    return statements
+
+
+class StatementResult:
+    """What one statement did - rows for queries, a row count for everything else"""
+    
+    def __init__(self, index, statement):
+        self.index = index
+        self.statement = statement
+        self.columns = None  # set when the statement returned a result set
+        self.rows = []  # first max_rows rows of it
+        self.total_rows = 0
+        self.rowcount = None  # affected rows for INSERT/UPDATE/DELETE
+        self.elapsed = 0.0
+        self.batched = False  # elapsed is this statement's share of a multi-statement batch
+        self.error = None
+
+
+class ScriptRunner:
+    """Runs a list of Statements on one connection, batching the ones that don't return rows"""
+    
+    def __init__(self, statements, transaction=False, stop_on_error=True, batch_size=200, max_rows=1000):
+        self.statements = statements
+        self.transaction = transaction  # True = everything commits or rolls back together
+        self.stop_on_error = stop_on_error or transaction  # a failed transaction always stops
+        self.batch_size = batch_size  # statements per multi-statement packet
+        self.max_rows = max_rows  # rows kept per result set, the rest are only counted
+        
+        self.results = []
+        self.executed = 0
+        self.failed = 0
+        self.committed = False
+        self.started = None
+    
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started if self.started else 0.0
+    
+    def groups(self):
+        """Batches of neighbouring batchable statements, everything else on its own"""
+        group = []
+        for index, statement in enumerate(self.statements):
+            if statement.batchable:
+                group.append((index, statement))
+                if len(group) == self.batch_size:
+                    yield group
+                    group = []
+                continue
+            if group:
+                yield group
+                group = []
+            yield [(index, statement)]
+        if group:
+            yield group
+    
+    def run(self, conn, cursor, job=None, on_results=None):
+        """
+        Runs the script. on_results(list of StatementResult) is called after each batch (on this thread).
+        Returns self; raises if the script was stopped by an error.
+        """
+        self.started = time.perf_counter()
+        autocommit = conn.autocommit
+        try:
+            if self.transaction:
+                conn.start_transaction()
+            else:
+                # Let the server commit each statement itself instead of a COMMIT round trip after each one.
+                # Done with SET since the pooled connection wrapper doesn't pass attribute writes through.
+                cursor.execute("SET autocommit = 1")
+            
+            for group in self.groups():
+                if job is not None:
+                    job.check_cancelled()
+                results = self.run_group(cursor, group)
+                self.results.extend(results)
+                if on_results:
+                    on_results(results)
+                
+                failed = [result for result in results if result.error]
+                if failed and self.stop_on_error:
+                    result = failed[0]
+                    raise ScriptError(f"Statement {result.index + 1} (line {result.statement.line}) failed: {result.error}")
+            
+            if self.transaction:
+                conn.commit()
+                self.committed = True
+        except Exception:
+            if self.transaction:
+                try:
+                    conn.rollback()
+                except mysql.connector.Error:
+                    pass  # connection is broken, the server rolls back on its own
+            raise
+        finally:
+            if not self.transaction:
+                self.restore_autocommit(conn, cursor, autocommit)
+        return self
+    
+    @staticmethod
+    def restore_autocommit(conn, cursor, autocommit):
+        """Puts the pooled connection back how we found it - later jobs rely on autocommit being off"""
+        try:
+            conn.consume_results()
+            cursor.execute(f"SET autocommit = {int(autocommit)}")
+        except mysql.connector.Error:
+            # A fresh session starts with the default again - and if the server's gone, this runs from a
+            # finally so it mustn't hide the script's own error; the pool's checkin throws the connection away
+            try:
+                conn.reconnect()
+            except mysql.connector.Error:
+                pass
+    
+    def run_group(self, cursor, group):
+        if len(group) == 1:
+            return [self.run_single(cursor, *group[0])]
+        return self.run_batch(cursor, group)
+    
+    def run_single(self, cursor, index, statement):
+        result = StatementResult(index, statement)
+        started = time.perf_counter()
+        try:
+            cursor.execute(statement.sql)
+            if cursor.with_rows:
+                result.columns = [col[0] for col in cursor.description]
+                while True:
+                    rows = cursor.fetchmany(500)
+                    if not rows:
+                        break
+                    room = self.max_rows - len(result.rows)
+                    if room > 0:
+                        result.rows.extend(rows[:room])
+                    result.total_rows += len(rows)
+                # CALL can send extra result sets (and always ends with a status one) - skip past them
+                while cursor.nextset():
+                    if cursor.with_rows:
+                        cursor.fetchall()
+            else:
+                result.rowcount = cursor.rowcount
+            self.executed += 1
+        except mysql.connector.Error as e:
+            if e.errno == 1317:  # query interrupted - the user cancelled
+                raise
+            result.error = e
+            self.failed += 1
+        result.elapsed = time.perf_counter() - started
+        return result
+    
+    def run_batch(self, cursor, group):
+        """
+        Sends a run of statements as one packet and walks through their results.
+        The server stops at the first failing statement, so the ones after it are sent again
+        (one batch further on) if we're carrying on past errors.
+        """
+        results = [StatementResult(index, statement) for index, statement in group]
+        started = time.perf_counter()
+        done = 0
+        try:
+            cursor.execute(";\n".join(statement.sql for _, statement in group))
+            while True:
+                results[done].rowcount = cursor.rowcount
+                done += 1
+                if done == len(results) or not cursor.nextset():
+                    break
+        except mysql.connector.Error as e:
+            if e.errno == 1317:
+                raise
+            results[done].error = e
+            self.failed += 1
+        
+        elapsed = time.perf_counter() - started
+        ran = results[:done + 1]  # everything that succeeded, plus the one that failed if any did
+        for result in ran:
+            result.elapsed = elapsed / len(ran)
+            result.batched = True
+        self.executed += done
+        
+        if done + 1 < len(results) and not self.stop_on_error:
+            # Pick up after the failed statement
+            return ran + self.run_group(cursor, group[done + 1:])
+        return ran
@@ -0,0 +1,185 @@
+"""
+snapshot.py
+Snapshots - local copies of some of the database's tables in a single SQLite
+file, so reports and poking around the data don't have to go back to the
+production server every time.
+
+Taking one streams each table across once (one SELECT per table, read in
+chunks, the same way exports do) into a file with the same columns, primary
+keys, indexes and foreign keys. The indexes are built after the rows are in
+and ANALYZE is run at the end, so SQLite's planner knows what it's got.
+Opening one points the app at the file through the SQLite stand-in for a
+server (fake_connector.py), so the Tables and SQL Query tabs - paging,
+filters, sorting, GROUP BYs - work on it the same as online, with no
+connection at all.
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+import time
+
+from fake_connector import FakeServer
+from importer import converter_for
+from statement_cache import quote_identifier
+
+SNAPSHOT_INFO = "_snapshot_info"  # where the snapshot keeps what it's a copy of
+
+
+def sqlite_type(col_type):
+    """A column type SQLite will take - MySQL's as it is, unless it has a value list (enum, set)"""
+    if "'" in col_type:
+        return "TEXT"
+    return col_type
+
+
+def create_statements(schema, tables):
+    """CREATE TABLE, then CREATE INDEXes, for a copy of schema - foreign keys only to tables in the snapshot"""
+    key = schema.primary_key
+    rowid_key = len(key) == 1 and converter_for(next(col[1] for col in schema.columns if col[0] == key[0])) is int
+    lines = []
+    for name, col_type, nullable, _, _, _ in schema.columns:
+        line = f"{quote_identifier(name)} {sqlite_type(col_type)}"
+        if rowid_key and name == key[0]:
+            line = f"{quote_identifier(name)} INTEGER PRIMARY KEY"  # SQLite's rowid, the fastest key it has
+        elif nullable == 'NO':
+            line += " NOT NULL"
+        lines.append(line)
+    if key and not rowid_key:
+        lines.append(f"PRIMARY KEY ({', '.join(map(quote_identifier, key))})")
+    
+    references = {}
+    for fk in schema.foreign_keys:
+        if fk['ref_table'] in tables:
+            references.setdefault(fk['name'], (fk['ref_table'], []))[1].append((fk['column'], fk['ref_column']))
+    for ref_table, pairs in references.values():
+        lines.append(f"FOREIGN KEY ({', '.join(quote_identifier(col) for col, _ in pairs)}) "
+                     f"REFERENCES {quote_identifier(ref_table)} ({', '.join(quote_identifier(ref) for _, ref in pairs)})")
+    
+    statements = [f"CREATE TABLE {quote_identifier(schema.name)} (\n    " + ",\n    ".join(lines) + "\n)"]
+    for index_name, index in schema.indexes.items():
+        if index_name == 'PRIMARY' or not index['columns']:
+            continue
+        # Index names are per table in MySQL but per file in SQLite
+        statements.append(f"CREATE {'UNIQUE ' if index['unique'] else ''}INDEX "
+                          f"{quote_identifier(f'{schema.name}__{index_name}')} ON {quote_identifier(schema.name)} "
+                          f"({', '.join(map(quote_identifier, index['columns']))})")
+    return statements
+
+
+def read_info(path):
+    """What a snapshot file is a copy of - {'source', 'database', 'taken_at', 'tables': {name: rows}}"""
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = db.execute(f"SELECT name, value FROM {SNAPSHOT_INFO}").fetchall()
+    except sqlite3.Error as e:
+        raise ValueError(f"{os.path.basename(path)} isn't a snapshot: {e}") from e
+    finally:
+        db.close()
+    return {name: json.loads(value) for name, value in rows}
+
+
+class Snapshot:
+    """An opened snapshot file - server stands in for the MySQL server it was taken from"""
+    
+    def __init__(self, path):
+        self.path = path
+        self.info = read_info(path)
+        self.database = self.info['database']
+        self.server = FakeServer(path, self.database, hidden_tables=(SNAPSHOT_INFO,))
+    
+    def describe(self):
+        """e.g. 'clothing_retail_store from db1:3306, 4 tables, taken 2025-03-28 14:02'"""
+        tables = len(self.info['tables'])
+        return (f"{self.database} from {self.info['source']}, {tables} table{'s' if tables != 1 else ''}, "
+                f"taken {self.info['taken_at']}")
+
+
+class SnapshotWriter:
+    """Copies tables from a live cursor into a new snapshot file"""
+    
+    def __init__(self, path, chunk_size=5000):
+        self.path = path
+        self.chunk_size = chunk_size  # rows per fetchmany, and per executemany on the SQLite side
+        self.on_progress = None  # on_progress(writer) after every chunk - called on the worker thread
+        self.table = None  # the table being copied right now
+        self.rows = 0
+        self.table_rows = {}  # rows copied per finished table
+        self.started = None
+    
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started if self.started else 0.0
+    
+    def throughput_text(self):
+        """e.g. 'orders: 120,000 rows, 45,000 rows/s'"""
+        text = f"{self.rows:,} rows, {self.rows / max(self.elapsed, 1e-6):,.0f} rows/s"
+        return f"{self.table}: {text}" if self.table else text
+    
+    def take(self, cursor, schemas, source, database, job=None):
+        """
+        Copies each TableSchema's table into the file. Written under a temporary name
+        and only moved into place once it's all there, so a cancelled snapshot doesn't
+        leave a half finished file behind (or replace a good one).
+        """
+        self.started = time.perf_counter()
+        tables = {schema.name for schema in schemas}
+        partial = self.path + ".partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        
+        db = sqlite3.connect(partial)
+        try:
+            # Nothing needs to survive a crash until it's finished, so skip the journal
+            db.execute("PRAGMA journal_mode = OFF")
+            db.execute("PRAGMA synchronous = OFF")
+            indexes = []
+            for schema in schemas:
+                create_table, *create_indexes = create_statements(schema, tables)
+                db.execute(create_table)
+                indexes.extend(create_indexes)
+                self.copy_table(cursor, db, schema, job)
+            
+            # Indexes are quicker to build in one go than to keep up to date row by row
+            for statement in indexes:
+                db.execute(statement)
+            db.execute("ANALYZE")
+            
+            info = {'source': source, 'database': database, 'tables': self.table_rows,
+                    'taken_at': datetime.datetime.now().strftime("%Y-%m-%d %H:%M")}
+            db.execute(f"CREATE TABLE {SNAPSHOT_INFO} (name TEXT PRIMARY KEY, value TEXT)")
+            db.executemany(f"INSERT INTO {SNAPSHOT_INFO} VALUES (?, ?)",
+                           [(name, json.dumps(value)) for name, value in info.items()])
+            db.commit()
+        except Exception:
+            db.close()
+            os.remove(partial)
+            raise
+        db.close()
+        os.replace(partial, self.path)
+        return self
+    
+    def copy_table(self, cursor, db, schema, job=None):
+        self.table = schema.name
+        columns = schema.column_names
+        names = ", ".join(map(quote_identifier, columns))
+        insert = f"INSERT INTO {quote_identifier(schema.name)} VALUES ({', '.join(['?'] * len(columns))})"
+        
+        # Primary key order means SQLite appends to its b-trees rather than inserting all over them
+        order = f" ORDER BY {', '.join(map(quote_identifier, schema.primary_key))}" if schema.primary_key else ""
+        cursor.execute(f"SELECT {names} FROM {quote_identifier(schema.name)}{order}")
+        copied = 0
+        while True:
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            db.executemany(insert, rows)
+            copied += len(rows)
+            self.rows += len(rows)
+            if job is not None:
+                job.rows_received = self.rows
+                job.check_cancelled()
+            if self.on_progress:
+                self.on_progress(self)
+        self.table_rows[schema.name] = copied
@@ -0,0 +1,123 @@
+"""
+statement_cache.py
+Server-side prepared statements for the INSERT/UPDATE/DELETE statements the
+app sends over and over - the Add/Edit/Delete buttons, Apply Changes and
+bulk imports all repeat a handful of statement shapes.
+
+Each shape gets its own prepared cursor, keyed by something like
+(table, operation, columns), so the SQL is built and parsed by the server
+once per connection and every later run only sends the values. Preparing
+is an extra round trip, so a shape is only prepared the second time it's
+used - one-off statements still go as plain text. Connector/Python resets
+a prepared statement before every run, so the saving is the server's
+parsing and the client's escaping rather than round trips, which is why
+the multi-row INSERTs of imports and bulk writes gain the most. The cache
+belongs to one connection, keeps the most recently used statements up to
+a limit (closing a cursor deallocates its statement on the server), and
+throws everything away when the connection reconnects, since prepared
+statements don't survive a new session.
+
+Also has quote_identifier() for putting table and column names into SQL.
+"""
+
+import collections
+
+import mysql.connector
+
+UNKNOWN_STATEMENT = 1243  # ER_UNKNOWN_STMT_HANDLER - the server forgot our statement (e.g. it restarted)
+
+
+def quote_identifier(name):
+    """`name` with any backticks in it doubled, so it's always read as a single table or column name"""
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+class StatementCache:
+    """LRU of prepared cursors for one connection"""
+    
+    def __init__(self, conn, max_statements=64, prepare_after=2):
+        self.conn = conn
+        self.max_statements = max_statements
+        self.prepare_after = prepare_after  # uses of a statement before it's worth preparing
+        self.entries = collections.OrderedDict()  # key -> (sql, prepared cursor), least recently used first
+        self.uses = collections.OrderedDict()  # key -> times seen, for statements not prepared yet
+        self.connection_id = None  # server session the cursors were prepared on
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def prepare(self, key, build):
+        """(sql, prepared cursor) for key - build is the SQL text, or a function making it, used on a miss"""
+        connection_id = getattr(self.conn, 'connection_id', None)
+        if connection_id != self.connection_id:
+            self.clear(close=False)  # reconnected since we prepared these, they died with the old session
+            self.connection_id = connection_id
+        
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        
+        self.misses += 1
+        sql = build() if callable(build) else build
+        entry = self.entries[key] = (sql, self.conn.cursor(prepared=True))
+        while len(self.entries) > self.max_statements:
+            _, (_, cursor) = self.entries.popitem(last=False)
+            self.close_cursor(cursor)
+        return entry
+    
+    def worth_preparing(self, key):
+        """Counts a use of key - True once it's been used prepare_after times"""
+        if key in self.entries:
+            return True
+        uses = self.uses.pop(key, 0) + 1
+        if uses >= self.prepare_after:
+            return True
+        self.uses[key] = uses
+        while len(self.uses) > self.max_statements * 4:
+            self.uses.popitem(last=False)
+        return False
+    
+    def execute(self, key, build, params=(), cursor=None, wrap=None):
+        """
+        Runs the statement cached under key with params and returns the cursor it ran on.
+        Until the statement has been used prepare_after times it runs as text on cursor (when given).
+        wrap(cursor) can swap in a wrapper (e.g. a ProfiledCursor) around the prepared cursor.
+        """
+        if cursor is not None and not self.worth_preparing(key):
+            cursor.execute(build() if callable(build) else build, params)
+            return cursor
+        
+        sql, cursor = self.prepare(key, build)
+        if wrap is not None:
+            cursor = wrap(cursor)
+        try:
+            cursor.execute(sql, params)
+        except mysql.connector.Error as e:
+            if e.errno != UNKNOWN_STATEMENT:
+                raise
+            # Prepared on a session that's gone - prepare it again and retry once
+            self.clear(close=False)
+            sql, cursor = self.prepare(key, sql)
+            if wrap is not None:
+                cursor = wrap(cursor)
+            cursor.execute(sql, params)
+        return cursor
+    
+    @staticmethod
+    def close_cursor(cursor):
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass  # connection's already gone, and the statement with it
+    
+    def clear(self, close=True):
+        """Forgets every statement - close=False when the session they were prepared on is already gone"""
+        self.uses.clear()
+        while self.entries:
+            _, (_, cursor) = self.entries.popitem()
+            if close:
+                self.close_cursor(cursor)
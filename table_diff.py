@@ -0,0 +1,214 @@
+"""
+table_diff.py
+Compares one table on two connections - production and the staging copy,
+say - without pulling either of them over the network.
+
+Both sides get cut into the same primary key ranges, and the server boils
+each range down to a row count and a checksum (BIT_XOR of 60 bits of each
+row's MD5), so a couple of numbers per range come back instead of rows.
+Ranges that match are done with. Ranges that don't get cut into smaller
+ones, and only when one is down to a few hundred rows are its rows fetched
+from both sides and compared. The cut points are found by nibbling the
+index on the server (LIMIT 1 OFFSET n), so finding them doesn't move the
+table either.
+
+The differences can be turned into the statements that make one side match
+the other - batched DELETEs and CASE UPDATEs from PendingChanges, and
+multi-row INSERTs - which are run in one transaction or written out as a
+script to look over first.
+"""
+
+from contextlib import contextmanager
+
+from mysql.connector.conversion import MySQLConverter
+
+from connection_pool import open_connection
+from pending_changes import PendingChanges
+from statement_cache import quote_identifier
+from table_gateway import insert_statement
+from table_pager import key_range_condition, row_concat
+
+CONVERTER = MySQLConverter('utf8mb4')
+
+
+def sql_literal(value):
+    """A value written out as SQL, for sync scripts"""
+    if isinstance(value, (bytes, bytearray)):
+        return "X'" + bytes(value).hex() + "'"
+    return CONVERTER.quote(CONVERTER.escape(CONVERTER.to_mysql(value))).decode('utf-8')
+
+
+@contextmanager
+def other_connection(connect_args):
+    """(connection, cursor) of our own to the other copy - the pool only talks to the one we're connected to"""
+    conn = open_connection(connect_args)
+    try:
+        cursor = conn.cursor()
+        try:
+            yield conn, cursor
+        finally:
+            cursor.close()
+    finally:
+        conn.close()
+
+
+def render_statement(query, params):
+    """query with its %s placeholders filled in, so it can go in a .sql file"""
+    parts = query.split("%s")
+    if len(parts) != len(params) + 1:
+        raise ValueError("Placeholder count doesn't match the parameters")
+    text = parts[0]
+    for value, part in zip(params, parts[1:]):
+        text += sql_literal(value) + part
+    return text + ";"
+
+
+class TableDiff:
+    """Differences in one table between a source and a target connection"""
+    
+    def __init__(self, table, columns, key_columns, fanout=16, leaf_rows=500, on_progress=None):
+        if not key_columns:
+            raise ValueError(f"{table} has no primary key, so there's nothing to line its rows up by")
+        self.table = table
+        self.quoted_table = quote_identifier(table)
+        self.columns = list(columns)
+        self.key_columns = list(key_columns)
+        self.key_indexes = [self.columns.index(col) for col in self.key_columns]
+        self.fanout = fanout  # ranges a mismatched range is cut into
+        self.leaf_rows = leaf_rows  # ranges this small get their rows compared
+        self.on_progress = on_progress  # on_progress(diff) after every range - called on the worker thread
+        
+        self.missing = []  # rows only the source has
+        self.extra = []  # rows only the target has
+        self.changed = []  # (source row, target row) with the same key but different values
+        self.ranges_checked = 0
+        self.rows_fetched = 0  # rows that actually came over the network, from both sides
+    
+    def __len__(self):
+        return len(self.missing) + len(self.extra) + len(self.changed)
+    
+    def row_key(self, row):
+        return tuple(row[i] for i in self.key_indexes)
+    
+    def summary(self):
+        return (f"{len(self.missing):,} missing, {len(self.extra):,} extra, {len(self.changed):,} changed - "
+                f"{self.ranges_checked:,} ranges checked, {self.rows_fetched:,} rows fetched")
+    
+    def range_condition(self, lower, upper):
+        """WHERE for keys in (lower, upper] - None for no bound"""
+        condition, params = key_range_condition(self.key_columns, lower, upper)
+        return (f" WHERE {condition}" if condition else ""), params
+    
+    def checksum(self, cursor, lower, upper):
+        """(row count, checksum) of a key range, both worked out on the server"""
+        where, params = self.range_condition(lower, upper)
+        cursor.execute(
+            f"SELECT COUNT(*), COALESCE(BIT_XOR(CAST(CONV(SUBSTRING(MD5({row_concat(self.columns)}), 1, 15), 16, 10) "
+            f"AS UNSIGNED)), 0) FROM {self.quoted_table}{where}",
+            params
+        )
+        count, checksum = cursor.fetchall()[0]
+        return count, int(checksum)
+    
+    def split_points(self, cursor, lower, upper, count):
+        """Keys that cut (lower, upper] into about fanout ranges of equal size, found on the server"""
+        stride = max(-(-count // self.fanout), 1)
+        names = ", ".join(quote_identifier(col) for col in self.key_columns)
+        points = []
+        after = lower
+        for _ in range(self.fanout - 1):
+            where, params = self.range_condition(after, upper)
+            cursor.execute(f"SELECT {names} FROM {self.quoted_table}{where} ORDER BY {names} LIMIT 1 OFFSET %s",
+                           params + [stride - 1])
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            after = tuple(rows[0])
+            points.append(after)
+        return points
+    
+    def fetch(self, cursor, lower, upper):
+        where, params = self.range_condition(lower, upper)
+        order = ", ".join(quote_identifier(col) for col in self.key_columns)
+        cursor.execute(f"SELECT {', '.join(map(quote_identifier, self.columns))} FROM {self.quoted_table}{where} "
+                       f"ORDER BY {order}", params)
+        rows = cursor.fetchall()
+        self.rows_fetched += len(rows)
+        return rows
+    
+    def compare_rows(self, source_rows, target_rows):
+        target = {self.row_key(row): row for row in target_rows}
+        for row in source_rows:
+            other = target.pop(self.row_key(row), None)
+            if other is None:
+                self.missing.append(row)
+            elif tuple(other) != tuple(row):
+                self.changed.append((row, other))
+        self.extra.extend(target.values())
+    
+    def run(self, source, target, job=None):
+        """
+        Finds every difference between the source and target cursors' copies of the table.
+        Works down from the whole table, one range at a time, so job can cancel it in between.
+        """
+        ranges = [(None, None)]
+        while ranges:
+            if job is not None:
+                job.check_cancelled()
+            lower, upper = ranges.pop()
+            source_count, source_sum = self.checksum(source, lower, upper)
+            target_count, target_sum = self.checksum(target, lower, upper)
+            self.ranges_checked += 1
+            
+            if (source_count, source_sum) != (target_count, target_sum):
+                count = max(source_count, target_count)
+                points = []
+                if count > self.leaf_rows:
+                    # Cut where the side with more rows has them, the cuts cover the other side all the same
+                    points = self.split_points(source if source_count >= target_count else target, lower, upper, count)
+                if points:
+                    bounds = [lower] + points + [upper]
+                    # Backwards onto the stack so the ranges get checked in key order
+                    ranges.extend(reversed(list(zip(bounds, bounds[1:]))))
+                else:
+                    self.compare_rows(self.fetch(source, lower, upper), self.fetch(target, lower, upper))
+            
+            if self.on_progress:
+                self.on_progress(self)
+        return self
+    
+    def sync_statements(self, chunk_size=500):
+        """(query, params) pairs that make the target match the source - deletes, then updates, then inserts"""
+        changes = PendingChanges(self.table, self.key_columns, chunk_size)
+        changes.deletes = {self.row_key(row) for row in self.extra}
+        for source_row, target_row in self.changed:
+            changes.updates[self.row_key(source_row)] = {
+                col: new for col, new, old in zip(self.columns, source_row, target_row) if new != old
+            }
+        statements = changes.statements()
+        
+        for start in range(0, len(self.missing), chunk_size):
+            rows = self.missing[start:start + chunk_size]
+            statements.append((insert_statement(self.table, self.columns, len(rows)),
+                               [value for row in rows for value in row]))
+        return statements
+    
+    def sync_script(self, chunk_size=500):
+        """The sync statements as SQL text, in a transaction"""
+        lines = [f"-- Makes {self.table} match the source: {self.summary()}", "START TRANSACTION;"]
+        lines.extend(render_statement(query, params) for query, params in self.sync_statements(chunk_size))
+        lines.append("COMMIT;")
+        return "\n".join(lines) + "\n"
+    
+    def apply(self, conn, cursor, chunk_size=500):
+        """Runs the sync statements on the target in one transaction - returns rows affected"""
+        affected = 0
+        try:
+            for query, params in self.sync_statements(chunk_size):
+                cursor.execute(query, params)
+                affected += cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return affected
@@ -0,0 +1,201 @@
+"""
+table_gateway.py
+Everything the app does to table data, with no Tk anywhere - listing tables,
+reading their structure, paging through rows, and the INSERT/UPDATE/DELETE
+statements behind the Add, Edit and Delete buttons.
+
+A TableGateway works on one connection and cursor. The GUI makes one inside
+each worker job; cli.py, batch jobs and benchmarks make one on a connection
+of their own, so the same code paths can be run and profiled without a
+display.
+
+Writes go through a StatementCache when there is one, so repeating an
+insert, edit or delete only sends the values to an already prepared
+statement.
+"""
+
+from pending_changes import PendingChanges
+from query_profiler import ProfiledCursor
+from schema_cache import SchemaCache
+from script_runner import ScriptRunner, split_statements
+from statement_cache import quote_identifier
+from table_pager import TablePager
+from table_stats import count_table, load_table_stats
+
+
+def insert_statement(table, columns, row_count):
+    """Multi-row INSERT for row_count rows of columns"""
+    row_placeholder = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    return (f"INSERT INTO {quote_identifier(table)} ({', '.join(map(quote_identifier, columns))}) "
+            f"VALUES {', '.join([row_placeholder] * row_count)}")
+
+
+def inserted_key(schema, values, lastrowid):
+    """Primary key of a row we just inserted - from the values, or lastrowid for an auto_increment column"""
+    extras = {col[0]: col[5] for col in schema.columns}
+    key = []
+    for col in schema.primary_key:
+        if col in values:
+            key.append(values[col])
+        elif 'auto_increment' in extras[col] and lastrowid:
+            key.append(lastrowid)
+        else:
+            return None
+    return tuple(key)
+
+
+class TableGateway:
+    """Browsing and CRUD for the tables of one database, over one connection"""
+    
+    def __init__(self, conn, cursor, schema_cache=None, statements=None):
+        self.conn = conn
+        self.cursor = cursor
+        self.schema_cache = schema_cache if schema_cache is not None else SchemaCache()
+        self.statements = statements  # StatementCache for conn, None = plain text statements on cursor
+    
+    def execute(self, key, build, params):
+        """
+        Runs a write statement - prepared and cached under key when we have a StatementCache,
+        otherwise as text on the cursor. build is the SQL or a function making it. Returns the cursor it ran on.
+        """
+        if self.statements is None:
+            self.cursor.execute(build() if callable(build) else build, params)
+            return self.cursor
+        
+        # Keep the Performance tab's record of every statement the job sends
+        wrap = None
+        if isinstance(self.cursor, ProfiledCursor):
+            profiled = self.cursor
+            
+            def profiled_wrap(prepared):
+                return ProfiledCursor(prepared, profiled.profiler, profiled.source, profiled.job)
+            wrap = profiled_wrap
+        cursor = self.statements.execute(key, build, params, self.cursor, wrap)
+        if cursor is not self.cursor and wrap is not None:
+            cursor.finish()
+        return cursor
+    
+    def list_tables(self, reload=False):
+        """Table names in the current database"""
+        if reload or not self.schema_cache.table_names():
+            self.schema_cache.load(self.cursor)
+        return self.schema_cache.table_names()
+    
+    def table_stats(self):
+        """{table name: TableStats} - estimated rows, sizes, engine and last update, from one query"""
+        return load_table_stats(self.cursor)
+    
+    def count(self, table):
+        """Exact COUNT(*) of a whole table"""
+        return count_table(self.cursor, table)
+    
+    def describe(self, table):
+        """TableSchema of a table - columns in DESCRIBE's layout, primary key, indexes and foreign keys"""
+        return self.schema_cache.get(self.cursor, table)
+    
+    def primary_key(self, table):
+        key = self.describe(table).primary_key
+        if not key:
+            raise ValueError(f"{table} has no primary key, so its rows can't be edited one by one")
+        return key
+    
+    def pager(self, table, page_size=200, **view):
+        """TablePager for a table - view is sort_column, descending and filters"""
+        schema = self.describe(table)
+        return TablePager(table, schema.column_names, schema.primary_key, page_size, **view)
+    
+    def page(self, table, after=None, offset=0, page_size=200, cache=None, **view):
+        """
+        One page of rows - the first, or the one after the row `after`
+        (offset is its position, only needed for tables without a primary key).
+        """
+        pager = self.pager(table, page_size, **view)
+        if after is None:
+            return pager.fetch_first(self.cursor, cache)
+        return pager.fetch_after(self.cursor, after, offset, cache)
+    
+    def fetch_rows(self, table, keys, **view):
+        """Specific rows by primary key"""
+        return self.pager(table, **view).fetch_by_keys(self.cursor, keys)
+    
+    def insert(self, table, values):
+        """Inserts one row from {column: value} and commits. Returns its primary key, or None if we can't tell"""
+        columns = tuple(values)
+        cursor = self.execute(('insert', table, columns), lambda: insert_statement(table, columns, 1),
+                              list(values.values()))
+        self.conn.commit()
+        return inserted_key(self.describe(table), values, cursor.lastrowid)
+    
+    def insert_many(self, table, rows, chunk_size=1000):
+        """
+        Inserts a list of {column: value} dicts with multi-row INSERTs, all in one transaction.
+        Rows with the same columns go together. Returns the number of rows inserted.
+        """
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(row), []).append(tuple(row.values()))
+        
+        inserted = 0
+        try:
+            for columns, values in groups.items():
+                for start in range(0, len(values), chunk_size):
+                    chunk = values[start:start + chunk_size]
+                    # Every full chunk is the same statement, so only the last one needs preparing again
+                    cursor = self.execute(('insert', table, columns, len(chunk)),
+                                          lambda: insert_statement(table, columns, len(chunk)),
+                                          [value for row in chunk for value in row])
+                    inserted += cursor.rowcount
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return inserted
+    
+    def update(self, table, key, values):
+        """Sets {column: value} on the row with primary key `key` and commits. Returns affected rows"""
+        key_columns = self.primary_key(table)
+        columns = tuple(values)
+        
+        def build():
+            set_clause = ", ".join(f"{quote_identifier(col)} = %s" for col in columns)
+            where = " AND ".join(f"{quote_identifier(col)} = %s" for col in key_columns)
+            return f"UPDATE {quote_identifier(table)} SET {set_clause} WHERE {where}"
+        
+        try:
+            cursor = self.execute(('update', table, columns), build, list(values.values()) + list(key))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return cursor.rowcount
+    
+    def update_many(self, table, updates):
+        """{key tuple: {column: value}} - a CASE based UPDATE per chunk of rows, all in one transaction"""
+        changes = PendingChanges(table, self.primary_key(table))
+        for key, values in updates.items():
+            for col, value in values.items():
+                changes.set_value(tuple(key), col, value)
+        return self.apply(changes)
+    
+    def delete_many(self, table, keys):
+        """Deletes rows by primary key with DELETE ... WHERE pk IN (...), in one transaction"""
+        changes = PendingChanges(table, self.primary_key(table))
+        for key in keys:
+            changes.delete(tuple(key))
+        return self.apply(changes)
+    
+    def apply(self, changes):
+        """Runs a PendingChanges buffer in one transaction, returns affected rows"""
+        # Statements of the same shape (e.g. every full chunk of a big delete) share a prepared statement
+        return changes.apply(self.conn, self.cursor,
+                             lambda query, params: self.execute(('apply', changes.table, query), query, params))
+    
+    def run_script(self, script, transaction=False, stop_on_error=True, job=None, on_results=None):
+        """
+        Runs a multi-statement script (text or a list of Statements) and returns the ScriptRunner.
+        on_results(runner, results) is called after each batch.
+        """
+        statements = split_statements(script) if isinstance(script, str) else script
+        runner = ScriptRunner(statements, transaction=transaction, stop_on_error=stop_on_error)
+        callback = (lambda results: on_results(runner, results)) if on_results else None
+        return runner.run(self.conn, self.cursor, job, callback)
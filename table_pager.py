@@ -0,0 +1,389 @@
+"""
+table_pager.py
+Pages through a table in primary key order so the Tables tab never has to
+pull the whole table into memory. Only one page is fetched per query.
+
+Uses keyset paging (WHERE pk > last_pk ORDER BY pk LIMIT n) when the table
+has a primary key, since that stays fast no matter how deep you scroll.
+Tables without a primary key fall back to LIMIT/OFFSET.
+
+Filters and sorting from the Tables tab are also done here, on the server:
+the filters become a parameterized WHERE and a sort column is put in front
+of the primary key in the keyset, so a sorted or filtered view pages just
+like the plain one.
+"""
+
+from statement_cache import quote_identifier
+
+# Filter operators offered in the filter bar: name -> (SQL, can an index seek on it)
+FILTER_OPS = {
+    '=': ("{col} = %s", True),
+    '!=': ("{col} <> %s", False),
+    '<': ("{col} < %s", True),
+    '<=': ("{col} <= %s", True),
+    '>': ("{col} > %s", True),
+    '>=': ("{col} >= %s", True),
+    'starts with': ("{col} LIKE %s", True),
+    'contains': ("{col} LIKE %s", False),
+    'is null': ("{col} IS NULL", True),
+    'is not null': ("{col} IS NOT NULL", False),
+}
+
+
+def like_escape(text):
+    """Escapes LIKE wildcards so the user's text is matched literally"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def filter_condition(filters):
+    """Turns [(column, op, value), ...] into a WHERE condition and its params - every filter has to match"""
+    clauses = []
+    params = []
+    for col, op, value in filters:
+        clauses.append(FILTER_OPS[op][0].format(col=quote_identifier(col)))
+        if op == 'starts with':
+            params.append(like_escape(value) + "%")
+        elif op == 'contains':
+            params.append("%" + like_escape(value) + "%")
+        elif op not in ('is null', 'is not null'):
+            params.append(value)
+    return " AND ".join(clauses), params
+
+
+def row_concat(columns):
+    """
+    SQL that strings a row's columns together for checksumming.
+    The ISNULL flags are there because CONCAT_WS skips NULLs, so 'a', NULL and NULL, 'a' would match.
+    """
+    names = [quote_identifier(col) for col in columns]
+    return f"CONCAT_WS('|', {', '.join(names + [f'ISNULL({name})' for name in names])})"
+
+
+def scan_warnings(indexes, filters, sort_column):
+    """
+    Warnings for filters and sorts that no index can help with, from the schema cache's indexes.
+    A column can use an index when it's the first column of it, or comes right after columns
+    that are all filtered with = (like a phone book: surname first, then first name).
+    """
+    equal = {col for col, op, _ in filters if op in ('=', 'is null')}
+    usable = set()
+    for index in indexes.values():
+        for col in index['columns']:
+            usable.add(col)
+            if col not in equal:
+                break
+    
+    warnings = []
+    seekable = [col for col, op, _ in filters if FILTER_OPS[op][1] and col in usable]
+    if filters and not seekable:
+        columns = ", ".join(sorted({col for col, _, _ in filters}))
+        warnings.append(f"No index can be used for the filter on {columns} - every row gets read")
+    if sort_column and sort_column not in usable and not seekable:
+        warnings.append(f"{sort_column} isn't indexed - sorting reads and sorts the whole table")
+    return warnings
+
+
+def keyset_condition(key_columns, op, key, nullable=()):
+    """
+    Builds the keyset WHERE condition and its params for (possibly composite) keys.
+    (a, b) > (x, y) is spelled out as a > x OR (a = x AND b > y) so MySQL
+    can use the primary key index as a range scan.
+    NULL sorts before everything in MySQL, so a NULL in the key (only possible for
+    a sort column) and NULLs in the nullable columns are treated as the smallest value.
+    """
+    names = [quote_identifier(col) for col in key_columns]
+    clauses = []
+    params = []
+    for i, col in enumerate(key_columns):
+        value = key[i]
+        name = names[i]
+        if value is None and op == '<':
+            continue  # nothing comes before NULL
+        
+        # Each OR branch repeats the leading key values, so the params do too
+        parts = []
+        branch_params = []
+        for prev, prev_value in zip(names[:i], key):
+            if prev_value is None:
+                parts.append(f"{prev} IS NULL")
+            else:
+                parts.append(f"{prev} = %s")
+                branch_params.append(prev_value)
+        
+        if value is None:
+            parts.append(f"{name} IS NOT NULL")
+        elif op == '<' and col in nullable:
+            parts.append(f"({name} < %s OR {name} IS NULL)")
+            branch_params.append(value)
+        else:
+            parts.append(f"{name} {op} %s")
+            branch_params.append(value)
+        clauses.append("(" + " AND ".join(parts) + ")")
+        params.extend(branch_params)
+    return " OR ".join(clauses), params
+
+
+def key_range_condition(key_columns, lower, upper):
+    """Condition and params for keys in (lower, upper] - None for no bound, "" when there are no bounds at all"""
+    clauses, params = [], []
+    if lower is not None:
+        sql, values = keyset_condition(key_columns, '>', lower)
+        clauses.append(f"({sql})")
+        params.extend(values)
+    if upper is not None:
+        # key <= upper, spelled NOT key > upper since keyset_condition already knows how to write that
+        sql, values = keyset_condition(key_columns, '>', upper)
+        clauses.append(f"NOT ({sql})")
+        params.extend(values)
+    return " AND ".join(clauses), params
+
+
+def key_in_condition(key_columns, keys):
+    """pk IN (...) for a list of keys, using row constructors for composite keys"""
+    params = [value for key in keys for value in key]
+    names = [quote_identifier(col) for col in key_columns]
+    if len(names) == 1:
+        return f"{names[0]} IN ({', '.join(['%s'] * len(keys))})", params
+    row = "(" + ", ".join(["%s"] * len(names)) + ")"
+    return f"({', '.join(names)}) IN ({', '.join([row] * len(keys))})", params
+
+
+class TablePager:
+    """Builds and runs the paging queries for one table"""
+    
+    def __init__(self, table, columns, key_columns, page_size=200, sort_column=None, descending=False, filters=()):
+        self.table = table
+        self.quoted_table = quote_identifier(table)  # what goes into the SQL
+        self.columns = list(columns)  # column names in DESCRIBE order
+        self.key_columns = list(key_columns)  # primary key column(s), can be empty
+        self.page_size = page_size
+        self.sort_column = sort_column  # None = primary key order
+        self.descending = descending
+        self.filters = list(filters)  # (column, op, value) - op is one of FILTER_OPS
+        for col in [sort_column] + [f[0] for f in self.filters]:
+            if col is not None and col not in self.columns:
+                raise ValueError(f"{table} has no column {col}")
+        
+        # Where the key columns sit inside a row so we can pull the key back out
+        self.key_indexes = [self.columns.index(col) for col in self.key_columns]
+        
+        # Rows are ordered by the sort column then the primary key, so ties still have a fixed order
+        self.order_columns = list(self.key_columns)
+        if sort_column and self.key_columns[:1] != [sort_column]:
+            self.order_columns.insert(0, sort_column)
+        self.order_indexes = [self.columns.index(col) for col in self.order_columns]
+        self.nullable = {sort_column} - set(self.key_columns)  # primary key columns are never NULL
+    
+    @classmethod
+    def from_describe(cls, table, describe_rows, page_size=200):
+        """Makes a pager straight from the rows DESCRIBE gives back"""
+        columns = [col[0] for col in describe_rows]
+        key_columns = [col[0] for col in describe_rows if col[3] == 'PRI']  # PRI = part of the primary key
+        return cls(table, columns, key_columns, page_size)
+    
+    @property
+    def uses_keyset(self):
+        """True when we can page by primary key instead of OFFSET"""
+        return bool(self.key_columns)
+    
+    @property
+    def custom_view(self):
+        """True when the view is filtered or sorted by something other than the primary key"""
+        return bool(self.filters or self.sort_column)
+    
+    def row_key(self, row):
+        """Returns the primary key values of a row as a tuple"""
+        return tuple(row[i] for i in self.key_indexes)
+    
+    def order_key(self, row):
+        """The values the view is ordered by - sort column (if any) then primary key"""
+        return tuple(row[i] for i in self.order_indexes)
+    
+    def sort_key(self, row):
+        """order_key that Python can compare the way MySQL does, with NULLs first"""
+        return tuple((value is not None, value) for value in self.order_key(row))
+    
+    def _order_by(self, reverse=False):
+        direction = " DESC" if self.descending != reverse else ""
+        return ", ".join(f"{quote_identifier(col)}{direction}" for col in self.order_columns)
+    
+    def _where(self, condition=None, params=()):
+        """WHERE clause for the filters plus an optional extra condition (e.g. the keyset)"""
+        where, all_params = filter_condition(self.filters)
+        clauses = [where] if where else []
+        if condition:
+            clauses.append(f"({condition})")
+            all_params += list(params)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), all_params
+    
+    def _page_query(self, condition=None, params=(), reverse=False):
+        """SELECT for one page in view order (or backwards), params still missing the LIMIT"""
+        where, params = self._where(condition, params)
+        query = f"SELECT * FROM {self.quoted_table}{where}"
+        if self.order_columns:
+            query += f" ORDER BY {self._order_by(reverse)}"
+        return query + " LIMIT %s", params
+    
+    def _fetch(self, cursor, query, params, cache=None):
+        """Runs a page query - through the ResultCache when one is given, so a cached page skips the server"""
+        if cache is not None:
+            return cache.fetch(cursor, self.table, query, params)
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    
+    def first_query(self):
+        """(query, params) for the first page - also what the result cache files it under"""
+        query, params = self._page_query()
+        return query, tuple(params + [self.page_size])
+    
+    def fetch_first(self, cursor, cache=None):
+        """Gets the first page of the table"""
+        return self._fetch(cursor, *self.first_query(), cache)
+    
+    def fetch_after(self, cursor, last_row, offset, cache=None):
+        """
+        Gets the page that comes right after last_row.
+        offset is the position of the row after last_row and is only used for tables without a primary key.
+        """
+        if not self.uses_keyset:
+            query, params = self._page_query()
+            return self._fetch(cursor, query + " OFFSET %s", params + [self.page_size, offset], cache)
+        
+        op = '<' if self.descending else '>'
+        condition, params = keyset_condition(self.order_columns, op, self.order_key(last_row), self.nullable)
+        query, params = self._page_query(condition, params)
+        return self._fetch(cursor, query, params + [self.page_size], cache)
+    
+    def fetch_from(self, cursor, key, cache=None):
+        """
+        The page starting at the row with primary key `key` - for opening a table at one row.
+        Only for the plain primary key order, which is what the view is reset to before jumping.
+        """
+        condition, params = keyset_condition(self.key_columns, '>', key)
+        equal, equal_params = key_in_condition(self.key_columns, [key])
+        query, params = self._page_query(f"{equal} OR {condition}", equal_params + params)
+        return self._fetch(cursor, query, params + [self.page_size], cache)
+    
+    def count_before(self, cursor, key):
+        """How many rows come before the row with primary key `key` - a range scan of the primary key index"""
+        condition, params = keyset_condition(self.key_columns, '<', key)
+        where, params = self._where(condition, params)
+        cursor.execute(f"SELECT COUNT(*) FROM {self.quoted_table}{where}", params)
+        return cursor.fetchall()[0][0]
+    
+    def fetch_before(self, cursor, first_row, offset, cache=None):
+        """
+        Gets the page that comes right before first_row, in normal (ascending) order.
+        offset is the position of first_row and is only used for tables without a primary key.
+        """
+        if not self.uses_keyset:
+            start = max(offset - self.page_size, 0)
+            query, params = self._page_query()
+            return self._fetch(cursor, query + " OFFSET %s", params + [offset - start, start], cache)
+        
+        # Walk backwards from the first row then flip the page around
+        op = '>' if self.descending else '<'
+        condition, params = keyset_condition(self.order_columns, op, self.order_key(first_row), self.nullable)
+        query, params = self._page_query(condition, params, reverse=True)
+        rows = self._fetch(cursor, query, params + [self.page_size], cache)
+        rows.reverse()
+        return rows
+    
+    def estimate_rows(self, cursor):
+        """
+        Cheap row count from information_schema - no table scan.
+        For InnoDB this is only an estimate, use exact_count() when you really need it.
+        A filtered view uses the optimizer's guess from EXPLAIN instead.
+        """
+        if self.filters:
+            where, params = self._where()
+            cursor.execute(f"EXPLAIN SELECT * FROM {self.quoted_table}{where}", params)
+            plan = dict(zip([col[0] for col in cursor.description], cursor.fetchall()[0]))
+            if plan.get('rows') is None:
+                return None
+            return round(plan['rows'] * float(plan.get('filtered') or 100) / 100)
+        
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (self.table,)
+        )
+        # fetchall even for one row - fetchone leaves the result "unread" on a plain cursor
+        rows = cursor.fetchall()
+        return rows[0][0] if rows and rows[0][0] is not None else None
+    
+    def exact_count(self, cursor):
+        """Real COUNT(*) - can be slow on big tables so only run it when asked"""
+        where, params = self._where()
+        cursor.execute(f"SELECT COUNT(*) FROM {self.quoted_table}{where}", params)
+        return cursor.fetchall()[0][0]
+    
+    def fetch_by_keys(self, cursor, keys):
+        """
+        Gets specific rows by primary key - used to refresh just the rows a write touched.
+        Rows that no longer match the filters don't come back, so they drop out of the view.
+        """
+        if not keys:
+            return []
+        condition, params = key_in_condition(self.key_columns, list(keys))
+        where, params = self._where(condition, params)
+        cursor.execute(f"SELECT * FROM {self.quoted_table}{where}", params)
+        return cursor.fetchall()
+    
+    def _range_condition(self, first_key, last_key):
+        """first_key <= pk <= last_key - row constructors so composite keys compare as a whole"""
+        cols = ", ".join(map(quote_identifier, self.key_columns))
+        row = ", ".join(["%s"] * len(self.key_columns))
+        return f"({cols}) >= ({row}) AND ({cols}) <= ({row})", list(first_key) + list(last_key)
+    
+    def count_range(self, cursor, first_key, last_key):
+        """Number of rows with a key between first_key and last_key (inclusive)"""
+        condition, params = self._range_condition(first_key, last_key)
+        cursor.execute(f"SELECT COUNT(*) FROM {self.quoted_table} WHERE {condition}", params)
+        return cursor.fetchall()[0][0]
+    
+    def fetch_range(self, cursor, first_key, last_key):
+        """Every row with a key between first_key and last_key (inclusive)"""
+        condition, params = self._range_condition(first_key, last_key)
+        cursor.execute(f"SELECT * FROM {self.quoted_table} WHERE {condition} ORDER BY {self._order_by()}", params)
+        return cursor.fetchall()
+    
+    def fetch_changed_since(self, cursor, column, since, first_key, last_key):
+        """Rows in a key range whose timestamp column (e.g. updated_at) is newer than since"""
+        condition, params = self._range_condition(first_key, last_key)
+        cursor.execute(
+            f"SELECT * FROM {self.quoted_table} WHERE {condition} AND {quote_identifier(column)} > %s ORDER BY {self._order_by()}",
+            params + [since]
+        )
+        return cursor.fetchall()
+    
+    def fetch_newer(self, cursor, columns, mark, limit):
+        """
+        Rows that come after mark in columns order, oldest first, with the view's filters - e.g.
+        columns=[order_id] for rows inserted since mark, [updated_at, order_id] for rows changed since.
+        A None in mark counts as smaller than everything, so (None,) gets every row.
+        """
+        condition, params = keyset_condition(columns, '>', mark)
+        where, params = self._where(condition, params)
+        order = ", ".join(quote_identifier(col) for col in columns)
+        cursor.execute(f"SELECT * FROM {self.quoted_table}{where} ORDER BY {order} LIMIT %s", params + [limit])
+        return cursor.fetchall()
+    
+    def last_mark(self, cursor, columns):
+        """Values of columns for the row that comes last in that order (one index lookup), or Nones when empty"""
+        names = [quote_identifier(col) for col in columns]
+        cursor.execute(f"SELECT {', '.join(names)} FROM {self.quoted_table} "
+                       f"ORDER BY {', '.join(name + ' DESC' for name in names)} LIMIT 1")
+        rows = cursor.fetchall()
+        return tuple(rows[0]) if rows else (None,) * len(columns)
+    
+    def range_checksum(self, cursor, first_key, last_key):
+        """(row count, checksum) for a key range, worked out on the server so only two numbers come back"""
+        condition, params = self._range_condition(first_key, last_key)
+        cursor.execute(
+            f"SELECT COUNT(*), COALESCE(BIT_XOR(CRC32({row_concat(self.columns)})), 0) "
+            f"FROM {self.quoted_table} WHERE {condition}",
+            params
+        )
+        count, checksum = cursor.fetchall()[0]
+        return count, int(checksum)
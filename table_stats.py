@@ -0,0 +1,180 @@
+"""
+table_stats.py
+Row counts and sizes for every table in the database, for the Table Stats
+sidebar on the Tables tab.
+
+One information_schema.TABLES query gets the lot - estimated rows, data and
+index size, average row length, last update and engine - so the sidebar
+costs a single round trip however many tables there are, and it's cheap
+enough to refresh on a timer. InnoDB's TABLE_ROWS is only an estimate, so
+exact COUNT(*)s are run when the user asks for them, for just the tables
+they picked, several at a time on their own pooled connections.
+"""
+
+import concurrent.futures
+import time
+
+import mysql.connector
+
+from query_profiler import ProfiledCursor
+from statement_cache import quote_identifier
+
+STATS_QUERY = (
+    "SELECT TABLE_NAME, ENGINE, TABLE_ROWS, AVG_ROW_LENGTH, DATA_LENGTH, INDEX_LENGTH, UPDATE_TIME "
+    "FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE' "
+    "ORDER BY TABLE_NAME"
+)
+
+
+def format_size(size):
+    """Bytes as something readable, e.g. 12.3 MB"""
+    if size is None:
+        return ""
+    size = float(size)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+class TableStats:
+    """One row of information_schema.TABLES, plus an exact count once somebody's asked for one"""
+    
+    def __init__(self, name, engine, rows, avg_row_length, data_length, index_length, update_time):
+        self.name = name
+        self.engine = engine
+        self.rows = rows  # estimate for InnoDB
+        self.avg_row_length = avg_row_length
+        self.data_length = data_length
+        self.index_length = index_length
+        self.update_time = update_time  # None when the server doesn't know (e.g. InnoDB since a restart)
+        self.exact_rows = None  # from COUNT(*)
+        self.counted_in = None  # seconds the COUNT(*) took
+    
+    @property
+    def total_length(self):
+        return (self.data_length or 0) + (self.index_length or 0)
+    
+    def row_text(self):
+        """Exact count when we have one, otherwise the estimate marked with ~"""
+        if self.exact_rows is not None:
+            return f"{self.exact_rows:,}"
+        return "" if self.rows is None else f"~{self.rows:,}"
+    
+    def keep_count(self, old):
+        """Carries old's exact count over, as long as the table hasn't changed since it was counted"""
+        if old is not None and old.exact_rows is not None and old.update_time == self.update_time:
+            self.exact_rows = old.exact_rows
+            self.counted_in = old.counted_in
+
+
+def load_table_stats(cursor, fresh=True):
+    """
+    {table name: TableStats} for every table in the current database, from one query.
+    fresh asks MySQL 8 for up to date numbers - by default it serves information_schema
+    statistics from a cache that's only updated once a day.
+    """
+    if fresh:
+        try:
+            cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+        except mysql.connector.Error:
+            pass  # servers before 8.0 don't have the variable, and don't cache the numbers either
+    cursor.execute(STATS_QUERY)
+    return {row[0]: TableStats(*row) for row in cursor.fetchall()}
+
+
+def count_table(cursor, table):
+    """Exact COUNT(*) of the whole table"""
+    cursor.execute(f"SELECT COUNT(*) FROM {quote_identifier(table)}")
+    return cursor.fetchall()[0][0]
+
+
+class StatsLoader:
+    """
+    Refreshes the stats and runs exact counts on threads of its own, so they never
+    wait behind whatever the Tables tab is running. Each one borrows a connection from
+    the shared pool, and the callbacks come back through the same results queue the
+    QueryWorkers use.
+    """
+    
+    def __init__(self, pool, results, profiler=None, max_parallel=3):
+        self.pool = pool
+        self.results = results
+        self.profiler = profiler
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_parallel, thread_name_prefix="table-stats")
+        self.refreshing = False  # stops the timer from stacking up refreshes behind a slow one
+        self.counting = set()  # tables with a COUNT(*) queued or running
+        self.stopped = False
+    
+    def post(self, callback, *args):
+        self.results.put((callback, args))
+    
+    def submit(self, source, work, on_done, on_error):
+        """Runs work(cursor) on a pooled connection, then posts on_done(result) or on_error(e)"""
+        def run():
+            if self.stopped:
+                return
+            try:
+                with self.pool.cursor() as cursor:
+                    if self.profiler is not None:
+                        cursor = ProfiledCursor(cursor, self.profiler, source)
+                    try:
+                        result = work(cursor)
+                    finally:
+                        if self.profiler is not None:
+                            cursor.finish()
+            except Exception as e:
+                self.post(on_error, e)
+            else:
+                self.post(on_done, result)
+        
+        self.executor.submit(run)
+    
+    def refresh(self, on_done, on_error):
+        """Reloads every table's stats - does nothing if a refresh is already running"""
+        if self.refreshing:
+            return
+        self.refreshing = True
+        
+        def done(stats):
+            self.refreshing = False
+            on_done(stats)
+        
+        def failed(e):
+            self.refreshing = False
+            on_error(e)
+        
+        self.submit("Table stats", load_table_stats, done, failed)
+    
+    def count(self, tables, on_count, on_error):
+        """
+        Exact COUNT(*) for each table, up to max_parallel at once.
+        on_count(table, rows, seconds) is called as each one finishes, on_error(table, e) if it fails.
+        """
+        for table in tables:
+            if table in self.counting:
+                continue  # already on its way
+            self.counting.add(table)
+            self.submit(f"Counting {table}", lambda cursor, table=table: self.timed_count(cursor, table),
+                        lambda result, table=table: self.counted(table, on_count, *result),
+                        lambda e, table=table: self.count_failed(table, on_error, e))
+    
+    @staticmethod
+    def timed_count(cursor, table):
+        started = time.perf_counter()
+        rows = count_table(cursor, table)
+        return rows, time.perf_counter() - started
+    
+    def counted(self, table, on_count, rows, seconds):
+        self.counting.discard(table)
+        on_count(table, rows, seconds)
+    
+    def count_failed(self, table, on_error, e):
+        self.counting.discard(table)
+        on_error(table, e)
+    
+    def stop(self):
+        """Drops anything still queued - counts already running finish on their own and are ignored"""
+        self.stopped = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,213 @@
+"""
+table_watcher.py
+Watch mode for the Tables tab - finds the rows of the open table that were
+inserted or changed since the last look, so the view can be patched every
+few seconds instead of reloaded.
+
+Two ways of finding them:
+  * polling high-water marks - rows whose primary key is past the biggest
+    one seen (for an auto_increment style key) and rows whose updated_at
+    column is past the newest one seen. Both are LIMITed keyset range scans,
+    so a quiet table costs two index lookups per check. Polling can't see
+    deletes, and a transaction that commits after a later-stamped one can
+    slip past the updated_at mark.
+  * tailing the binary log through python-mysql-replication, when it's
+    installed and the server has row-based binlogging the user is allowed to
+    read. That sees every insert, update and delete; the rows themselves are
+    then read back by primary key so the view's filters still apply.
+
+Only the marks (or binlog position) are kept between checks, so watching
+for hours doesn't grow anything.
+"""
+
+import random
+
+import mysql.connector
+
+from importer import converter_for
+
+# Reading the binlog is optional - polling works without it
+try:
+    from pymysqlreplication import BinLogStreamReader
+    from pymysqlreplication.row_event import DeleteRowsEvent, UpdateRowsEvent, WriteRowsEvent
+except ImportError:
+    BinLogStreamReader = None
+
+
+class WatchUnavailable(Exception):
+    """The table can't be watched incrementally - no usable key, timestamp or binlog"""
+
+
+def monotonic_key(schema):
+    """The primary key column if it's a single integer column (new rows get bigger keys), else None"""
+    if len(schema.primary_key) != 1:
+        return None
+    column = schema.primary_key[0]
+    col_type = next(col[1] for col in schema.columns if col[0] == column)
+    return column if converter_for(col_type) is int else None
+
+
+class BinlogTail:
+    """Reads row events for one table from the binary log, picking up where the last read stopped"""
+    
+    def __init__(self, connect_args, table, key_columns, columns, max_keys=5000):
+        self.settings = dict(host=connect_args['host'], port=int(connect_args['port']),
+                             user=connect_args['user'], passwd=connect_args['password'])
+        self.database = connect_args['database']
+        self.table = table
+        self.key_columns = key_columns
+        self.columns = columns
+        self.max_keys = max_keys  # more changes than this in one read and it's quicker to reload the table
+        self.server_id = random.randrange(2 ** 16, 2 ** 31)  # has to differ from every real replica's
+        self.log_file = None
+        self.log_pos = None
+    
+    def start(self, cursor):
+        """Remembers the current end of the binlog - raises WatchUnavailable if we can't read it"""
+        try:
+            cursor.execute("SELECT @@binlog_format")
+            if str(cursor.fetchall()[0][0]).upper() != 'ROW':
+                raise WatchUnavailable("binlog_format isn't ROW")
+            try:
+                cursor.execute("SHOW BINARY LOG STATUS")  # 8.4 and later
+            except mysql.connector.Error:
+                cursor.execute("SHOW MASTER STATUS")
+            rows = cursor.fetchall()
+        except mysql.connector.Error as e:
+            raise WatchUnavailable(f"can't read the binlog position: {e}") from e
+        if not rows:
+            raise WatchUnavailable("binary logging is off")
+        self.log_file, self.log_pos = rows[0][0], int(rows[0][1])
+    
+    def row_key(self, values):
+        # Without binlog_row_metadata=FULL newer versions of the library only know column positions
+        return tuple(values.get(col, values.get(f"UNKNOWN_COL{self.columns.index(col)}"))
+                     for col in self.key_columns)
+    
+    def read(self):
+        """(keys inserted or updated, keys deleted) since the last read, or None if there were too many"""
+        stream = BinLogStreamReader(
+            connection_settings=self.settings, server_id=self.server_id,
+            log_file=self.log_file, log_pos=self.log_pos, resume_stream=True, blocking=False,
+            only_events=[WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent],
+            only_schemas=[self.database], only_tables=[self.table],
+        )
+        changed, deleted = set(), set()
+        try:
+            for event in stream:
+                for row in event.rows:
+                    if isinstance(event, DeleteRowsEvent):
+                        key = self.row_key(row['values'])
+                        deleted.add(key)
+                        changed.discard(key)
+                        continue
+                    if isinstance(event, UpdateRowsEvent):
+                        before = self.row_key(row['before_values'])
+                        key = self.row_key(row['after_values'])
+                        if before != key:
+                            deleted.add(before)  # its primary key changed
+                    else:
+                        key = self.row_key(row['values'])
+                    changed.add(key)
+                    deleted.discard(key)
+                if len(changed) + len(deleted) > self.max_keys:
+                    return None
+        finally:
+            self.log_file, self.log_pos = stream.log_file, stream.log_pos
+            stream.close()
+        return changed, deleted
+
+
+class TableWatcher:
+    """
+    Finds what changed in one TablePager's table since the last poll().
+    start() has to be called once first, on the same kind of worker cursor.
+    """
+    
+    def __init__(self, pager, schema, connect_args=None, batch_size=500):
+        self.pager = pager
+        self.batch_size = batch_size  # rows fetched per mark per poll
+        self.key_column = monotonic_key(schema)
+        self.change_column = schema.change_column()
+        self.change_indexed = self.change_column in schema.indexed_prefixes()
+        self.key_mark = None  # (biggest key seen,)
+        self.change_mark = None  # (newest updated_at seen, its key...) - ties on the timestamp are broken by key
+        self.binlog = None
+        self.binlog_error = None  # why we fell back on polling, if we did
+        self.connect_args = connect_args  # for the binlog, None to always poll
+        self.started = False
+    
+    @property
+    def change_columns(self):
+        return [self.change_column] + self.pager.key_columns
+    
+    def start(self, cursor):
+        """Sets the marks to where the table is now - raises WatchUnavailable if there's nothing to watch by"""
+        if not self.pager.uses_keyset:
+            raise WatchUnavailable(f"{self.pager.table} has no primary key")
+        
+        if self.connect_args is not None and BinLogStreamReader is not None:
+            binlog = BinlogTail(self.connect_args, self.pager.table, self.pager.key_columns, self.pager.columns)
+            try:
+                binlog.start(cursor)
+                self.binlog = binlog
+            except WatchUnavailable as e:
+                self.binlog_error = str(e)
+        
+        if self.binlog is None:
+            if self.key_column is None and self.change_column is None:
+                raise WatchUnavailable(f"{self.pager.table} has no auto_increment style key or updated_at column")
+            if self.key_column is not None:
+                self.key_mark = self.pager.last_mark(cursor, [self.key_column])
+            if self.change_column is not None:
+                self.change_mark = self.pager.last_mark(cursor, self.change_columns)
+        self.started = True
+    
+    def poll(self, cursor):
+        """
+        (rows inserted or changed, keys of rows gone, more waiting) since the last poll.
+        Returns None when so much changed that reloading the table is quicker.
+        """
+        if self.binlog is not None:
+            keys = self.binlog.read()
+            if keys is None:
+                return None
+            changed, deleted = keys
+            changed = list(changed)
+            rows = []
+            for i in range(0, len(changed), self.batch_size):
+                rows.extend(self.pager.fetch_by_keys(cursor, changed[i:i + self.batch_size]))
+            # Changed rows that didn't come back don't match the view's filters any more
+            gone = deleted | (set(changed) - {self.pager.row_key(row) for row in rows})
+            return rows, gone, False
+        
+        rows = []
+        more = False
+        if self.key_mark is not None:
+            new_rows = self.pager.fetch_newer(cursor, [self.key_column], self.key_mark, self.batch_size)
+            if new_rows:
+                self.key_mark = (new_rows[-1][self.pager.columns.index(self.key_column)],)
+            rows.extend(new_rows)
+            more = len(new_rows) == self.batch_size
+        if self.change_mark is not None:
+            changed = self.pager.fetch_newer(cursor, self.change_columns, self.change_mark, self.batch_size)
+            if changed:
+                indexes = [self.pager.columns.index(col) for col in self.change_columns]
+                self.change_mark = tuple(changed[-1][i] for i in indexes)
+            rows.extend(changed)
+            more = more or len(changed) == self.batch_size
+        # A new row can turn up under both marks
+        unique = {self.pager.row_key(row): row for row in rows}
+        return list(unique.values()), set(), more
+    
+    def describe(self):
+        """How the table is being watched, for the status label"""
+        if self.binlog is not None:
+            return f"{self.pager.table} via the binlog"
+        marks = [col for col in (self.key_column, self.change_column) if col is not None]
+        text = f"{self.pager.table} by {' and '.join(marks)}"
+        if self.change_column is None:
+            text += " (new rows only, no updated_at column)"
+        elif not self.change_indexed:
+            text += f" ({self.change_column} isn't indexed - every check reads the whole table)"
+        return text